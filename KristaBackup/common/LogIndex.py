@@ -0,0 +1,209 @@
+# -*- encoding: utf-8 -*-
+
+"""Индекс логов директории.
+
+Результат разбора логов (наличие ошибок и предупреждений, первое
+сообщение об ошибке, имя задания, время первой и последней записи)
+хранится в файле INDEX_FILENAME рядом с логами. Файл разбирается
+заново только при изменении его размера или mtime, причём дописанный
+в конец лог разбирается начиная с уже обработанного места.
+
+"""
+
+import datetime
+import json
+import os
+import stat
+import tempfile
+import time
+
+from common.YamlConfig import AppConfig
+
+INDEX_FILENAME = '.index.json'
+INDEX_VERSION = 1
+
+# Сообщение, с которым Runner записывает в лог имя задания.
+TASK_MESSAGE = 'Запускается задание '
+
+_ERROR_MARKERS = (b'ERROR', b'CRITICAL')
+_WARNING_MARKER = b'WARNING'
+_TASK_MARKER = TASK_MESSAGE.encode()
+
+_TIME_LENGTH = len(
+    datetime.datetime(2000, 1, 1).strftime(AppConfig.get_log_dateformat()),
+)
+
+
+def new_entry():
+    """Возвращает запись индекса для ещё не разобранного файла."""
+    return {
+        'mtime': None,
+        'size': None,
+        'offset': 0,
+        'error': False,
+        'warning': False,
+        'msg': '',
+        'task': None,
+        'start': None,
+        'end': None,
+    }
+
+
+def _parse_time(line):
+    try:
+        dtime = datetime.datetime.strptime(
+            line[:_TIME_LENGTH].decode(),
+            AppConfig.get_log_dateformat(),
+        )
+    except (UnicodeDecodeError, ValueError):
+        return None
+    return time.mktime(dtime.timetuple())
+
+
+def scan_log_file(filepath, entry=None):
+    """Разбирает лог, продолжая с entry['offset'].
+
+    Ошибка - первая строка с ERROR или CRITICAL, иначе
+    предупреждение - последняя строка с WARNING.
+
+    Args:
+        filepath: Строка, путь к логу.
+        entry: Словарь, запись индекса из new_entry() или результат
+            предыдущего разбора этого же файла.
+
+    Returns:
+        Словарь, обновлённую запись индекса.
+
+    Raises:
+        OSError, если файл не удалось прочитать.
+
+    """
+    entry = dict(entry or new_entry())
+    with open(filepath, 'rb') as log:
+        statres = os.fstat(log.fileno())
+        if statres.st_size < entry['offset']:
+            # Файл перезаписан, разбирается заново.
+            entry = new_entry()
+        log.seek(entry['offset'])
+        offset = entry['offset']
+        for line in log:
+            if not line.endswith(b'\n'):
+                # Строка дописывается, она будет разобрана повторно.
+                break
+            offset += len(line)
+            line_time = _parse_time(line)
+            if line_time is not None:
+                if entry['start'] is None:
+                    entry['start'] = line_time
+                entry['end'] = line_time
+            if entry['task'] is None and _TASK_MARKER in line:
+                task = line.split(_TASK_MARKER, 1)[1]
+                entry['task'] = task.decode(errors='replace').strip()
+            if entry['error']:
+                continue
+            if any(marker in line for marker in _ERROR_MARKERS):
+                entry['error'] = True
+                entry['msg'] = line.decode(errors='replace')
+            elif _WARNING_MARKER in line:
+                entry['warning'] = True
+                entry['msg'] = line.decode(errors='replace')
+    entry['offset'] = offset
+    entry['mtime'] = statres.st_mtime
+    entry['size'] = statres.st_size
+    return entry
+
+
+class LogIndex:
+    """Индекс логов одной директории.
+
+    Attributes:
+        dirpath: Строка, путь к директории с логами.
+        entries: Словарь {имя файла: запись индекса}.
+
+    """
+
+    def __init__(self, dirpath):
+        self.dirpath = dirpath
+        self.entries = {}
+        self._changed = False
+
+    @property
+    def index_path(self):
+        return os.path.join(self.dirpath, INDEX_FILENAME)
+
+    def load(self):
+        """Читает индекс, повреждённый или устаревший индекс игнорируется."""
+        try:
+            with open(self.index_path) as index_file:
+                index = json.load(index_file)
+        except (OSError, ValueError):
+            index = {}
+        if not isinstance(index, dict) or (
+            index.get('version') != INDEX_VERSION
+        ):
+            index = {}
+        self.entries = index.get('entries', {})
+        self._changed = False
+
+    def save(self):
+        """Атомарно записывает индекс, если он изменился.
+
+        Отсутствие прав на запись не считается ошибкой: индекс
+        будет построен заново при следующем обращении.
+
+        """
+        if not self._changed:
+            return
+        index = {'version': INDEX_VERSION, 'entries': self.entries}
+        try:
+            fd, tmp_path = tempfile.mkstemp(
+                prefix=INDEX_FILENAME,
+                dir=self.dirpath,
+            )
+        except OSError:
+            return
+        try:
+            with os.fdopen(fd, 'w') as index_file:
+                json.dump(index, index_file, ensure_ascii=False)
+            os.replace(tmp_path, self.index_path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        else:
+            self._changed = False
+
+    def update(self):
+        """Обновляет индекс по текущему содержимому директории.
+
+        Returns:
+            Словарь {имя файла: запись индекса}.
+
+        """
+        self.load()
+        entries = {}
+        for filename in os.listdir(self.dirpath):
+            if filename.startswith(INDEX_FILENAME):
+                continue
+            filepath = os.path.join(self.dirpath, filename)
+            try:
+                statres = os.stat(filepath)
+            except OSError:
+                continue
+            if not stat.S_ISREG(statres.st_mode):
+                continue
+            entry = self.entries.get(filename)
+            if entry is None or (
+                entry['mtime'] != statres.st_mtime
+                or entry['size'] != statres.st_size
+            ):
+                try:
+                    entry = scan_log_file(filepath, entry)
+                except OSError:
+                    continue
+                self._changed = True
+            entries[filename] = entry
+        if len(entries) != len(self.entries):
+            self._changed = True
+        self.entries = entries
+        self.save()
+        return self.entries
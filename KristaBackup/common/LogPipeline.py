@@ -0,0 +1,280 @@
+# -*- encoding: utf-8 -*-
+
+"""Асинхронная запись логов через очередь.
+
+Логгеры кладут записи в ограниченную очередь (QueueHandler), а
+отдельный поток LogPipeline забирает их пачками, передаёт
+хэндлерам и сбрасывает файлы один раз на пачку. Поэтому поток
+архивации не ждёт форматирования и записи на диск.
+
+При заполнении очереди политика block ждёт места, политика drop
+отбрасывает записи ниже WARNING и пишет, сколько записей пропущено.
+Ошибки хэндлеров передаются в их handleError и не останавливают
+поток записи.
+
+"""
+
+import atexit
+import logging
+import os
+import queue
+import threading
+from logging.handlers import QueueHandler
+
+POLICIES = ('block', 'drop')
+
+# Сколько секунд flush и stop ждут поток записи.
+WAIT_TIMEOUT = 30
+
+# Запись, по которой поток записи завершается.
+_STOP = object()
+
+
+class BatchFileHandler(logging.FileHandler):
+    """FileHandler, который не сбрасывает буфер после каждой записи.
+
+    Буфер сбрасывает LogPipeline после пачки записей. Если batched
+    равно False, то поведение как у FileHandler.
+
+    """
+
+    def __init__(self, filename, mode='a', encoding=None, delay=False):
+        super().__init__(filename, mode, encoding, delay)
+        self.batched = True
+
+    def emit(self, record):
+        if not self.batched:
+            super().emit(record)
+            return
+        if self.stream is None:
+            self.stream = self._open()
+        try:
+            self.stream.write(self.format(record) + self.terminator)
+        except Exception:
+            self.handleError(record)
+
+
+class _PipelineHandler(QueueHandler):
+    """Кладёт записи в очередь LogPipeline по её политике."""
+
+    def __init__(self, pipeline):
+        super().__init__(pipeline.queue)
+        self.pipeline = pipeline
+
+    def prepare(self, record):
+        # Сообщение формируется сразу: аргументы могут измениться
+        # до того, как запись обработает поток записи.
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        if self.pipeline.policy == 'drop' and record.levelno < logging.WARNING:
+            try:
+                self.queue.put_nowait(record)
+            except queue.Full:
+                self.pipeline.count_dropped()
+            return
+        self.queue.put(record)
+
+
+class LogPipeline:
+    """Очередь записей лога и поток, который их пишет.
+
+    Attributes:
+        handlers: Список хэндлеров, в которые пишутся записи.
+        policy: Строка, поведение при заполненной очереди: block или drop.
+        batch_size: Целое число, максимальный размер пачки записей.
+        queue: queue.Queue с записями.
+        handler: QueueHandler, который добавляется к логгеру.
+        dropped: Целое число, пропущенные записи с последнего отчёта.
+
+    """
+
+    def __init__(
+        self,
+        handlers,
+        queue_size=10000,
+        policy='block',
+        batch_size=512,
+    ):
+        if policy not in POLICIES:
+            raise ValueError(
+                'Неизвестная политика очереди: {0}'.format(policy),
+            )
+        self.handlers = list(handlers)
+        self.policy = policy
+        self.batch_size = max(int(batch_size), 1)
+        self.queue = queue.Queue(max(int(queue_size), 1))
+        self.handler = _PipelineHandler(self)
+        self.dropped = 0
+        self._dropped_lock = threading.Lock()
+        self._thread = None
+        self._logger = None
+
+    def start(self, logger):
+        """Подключает очередь к logger и запускает поток записи."""
+        self._logger = logger
+        logger.addHandler(self.handler)
+        self._thread = threading.Thread(
+            target=self._run,
+            name='log-pipeline',
+            daemon=True,
+        )
+        self._thread.start()
+
+    def _run(self):
+        log_queue = self.queue
+        while True:
+            batch = [log_queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(log_queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = False
+            flushed = []
+            for record in batch:
+                if record is _STOP:
+                    stop = True
+                elif isinstance(record, threading.Event):
+                    flushed.append(record)
+                else:
+                    self.handle(record)
+            self.report_dropped()
+            self._flush_handlers()
+            for event in flushed:
+                event.set()
+            if stop:
+                return
+
+    def handle(self, record):
+        """Передаёт запись хэндлерам с подходящим уровнем."""
+        for handler in self.handlers:
+            if record.levelno < handler.level:
+                continue
+            try:
+                handler.handle(record)
+            except Exception:
+                handler.handleError(record)
+
+    def _flush_handlers(self):
+        for handler in self.handlers:
+            try:
+                handler.flush()
+            except Exception:
+                pass
+
+    def flush(self, timeout=WAIT_TIMEOUT):
+        """Дожидается записи всех записей из очереди.
+
+        Returns:
+            False, если поток записи не успел за timeout секунд.
+
+        """
+        if self._thread is None or not self._thread.is_alive():
+            self._flush_handlers()
+            return True
+        flushed = threading.Event()
+        try:
+            self.queue.put(flushed, timeout=timeout)
+        except queue.Full:
+            return False
+        return flushed.wait(timeout)
+
+    def stop(self, timeout=WAIT_TIMEOUT):
+        """Записывает оставшиеся записи и останавливает поток."""
+        if self._thread is not None and self._thread.is_alive():
+            try:
+                self.queue.put(_STOP, timeout=timeout)
+            except queue.Full:
+                pass
+            else:
+                self._thread.join(timeout)
+        self._thread = None
+        self._flush_handlers()
+
+    def detach(self):
+        """Переключает логгер на синхронную запись без очереди.
+
+        Используется в дочернем процессе после fork: потока записи
+        в нём нет, а процесс может завершиться через os._exit.
+
+        """
+        if self._logger is None:
+            return
+        self._logger.removeHandler(self.handler)
+        self._thread = None
+        for handler in self.handlers:
+            if isinstance(handler, BatchFileHandler):
+                handler.batched = False
+            self._logger.addHandler(handler)
+        self._logger = None
+
+    def count_dropped(self):
+        with self._dropped_lock:
+            self.dropped += 1
+
+    def report_dropped(self):
+        with self._dropped_lock:
+            dropped, self.dropped = self.dropped, 0
+        if dropped:
+            record = logging.makeLogRecord({
+                'name': __name__,
+                'levelno': logging.WARNING,
+                'levelname': logging.getLevelName(logging.WARNING),
+                'msg': 'Очередь лога заполнена, пропущено записей: %s',
+                'args': (dropped,),
+            })
+            self.handle(record)
+
+
+_pipeline = None
+
+
+def start_pipeline(handlers, logger, **kwargs):
+    """Запускает асинхронную запись логов для logger.
+
+    Очередь сбрасывается при выходе из процесса и перед fork,
+    в дочернем процессе запись становится синхронной.
+
+    Returns:
+        LogPipeline.
+
+    """
+    global _pipeline
+    stop_pipeline()
+    _pipeline = LogPipeline(handlers, **kwargs)
+    _pipeline.start(logger)
+    return _pipeline
+
+
+def flush_pipeline():
+    """Дожидается записи логов из очереди, если она используется."""
+    if _pipeline is not None:
+        _pipeline.flush()
+
+
+def stop_pipeline():
+    """Записывает логи из очереди и останавливает поток записи."""
+    global _pipeline
+    if _pipeline is not None:
+        _pipeline.stop()
+        _pipeline = None
+
+
+def _after_fork_in_child():
+    global _pipeline
+    if _pipeline is not None:
+        _pipeline.detach()
+        _pipeline = None
+
+
+# Обработчики atexit выполняются в обратном порядке, поэтому очередь
+# записывается раньше, чем logging.shutdown закроет хэндлеры.
+atexit.register(stop_pipeline)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(
+        before=flush_pipeline,
+        after_in_child=_after_fork_in_child,
+    )
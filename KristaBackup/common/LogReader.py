@@ -0,0 +1,194 @@
+# -*- encoding: utf-8 -*-
+
+"""Постраничное чтение логов.
+
+Лог читается страницами по limit строк: вперёд от байтового смещения
+offset либо назад от смещения before (по умолчанию - от конца файла,
+то есть последние limit строк). Назад файл читается блоками, поэтому
+в память попадает только страница, а не весь лог.
+
+При фильтрации по уровню строки без уровня (например, traceback)
+относятся к предыдущей записи.
+
+"""
+
+import logging
+import os
+
+PAGE_LINES = 1000
+MAX_PAGE_LINES = 10000
+BLOCK_SIZE = 64 * 1024
+
+# Номер поля с уровнем в записи: дата, время, имя сервера, уровень.
+_LEVEL_FIELD = 3
+
+
+def get_level(level):
+    """Возвращает числовой уровень логирования.
+
+    Args:
+        level: Строка с именем или числом, число или None.
+
+    Returns:
+        Целое число или None, если level не указан.
+
+    Raises:
+        ValueError, если уровень неизвестен.
+
+    """
+    if level is None or level == '':
+        return None
+    if isinstance(level, int):
+        return level
+    if level.isdigit():
+        return int(level)
+    levelno = logging.getLevelName(level.upper())
+    if not isinstance(levelno, int):
+        raise ValueError('Неизвестный уровень: {0}'.format(level))
+    return levelno
+
+
+def get_record_level(line):
+    """Возвращает уровень записи или None для строки-продолжения."""
+    fields = line.split(None, _LEVEL_FIELD + 1)
+    if len(fields) <= _LEVEL_FIELD:
+        return None
+    levelno = logging.getLevelName(
+        fields[_LEVEL_FIELD].decode(errors='replace'),
+    )
+    if isinstance(levelno, int):
+        return levelno
+    return None
+
+
+def _iter_lines_forward(log, offset):
+    log.seek(offset)
+    for line in log:
+        yield offset, line
+        offset += len(line)
+
+
+def _iter_lines_backward(log, end):
+    pos = end
+    head = b''
+    while pos > 0:
+        size = min(BLOCK_SIZE, pos)
+        pos -= size
+        log.seek(pos)
+        data = log.read(size) + head
+        lines = data.split(b'\n')
+        # Первая строка блока может быть неполной.
+        head = lines.pop(0)
+        line_end = pos + len(data)
+        for index in range(len(lines) - 1, -1, -1):
+            line = lines[index]
+            line_start = line_end - len(line)
+            if line_start < end:
+                yield line_start, line + b'\n'
+            line_end = line_start - 1
+    if head:
+        yield 0, head + b'\n'
+
+
+def _read_forward(log, offset, limit, levelno):
+    lines = []
+    end = offset
+    keep = levelno is None
+    for line_start, line in _iter_lines_forward(log, offset):
+        if levelno is None:
+            if len(lines) >= limit:
+                break
+        else:
+            record_level = get_record_level(line)
+            if record_level is not None:
+                # При фильтрации страница заканчивается на границе
+                # записи, иначе следующая страница потеряет её конец.
+                if len(lines) >= limit:
+                    break
+                keep = record_level >= levelno
+        end = line_start + len(line)
+        if keep:
+            lines.append(line)
+    return lines, offset, end
+
+
+def _read_backward(log, before, limit, levelno):
+    lines = []
+    pending = []
+    start = before
+    for line_start, line in _iter_lines_backward(log, before):
+        if len(lines) >= limit:
+            break
+        start = line_start
+        if levelno is None:
+            lines.append(line)
+            continue
+        record_level = get_record_level(line)
+        if record_level is None:
+            if len(pending) < limit:
+                pending.append(line)
+            continue
+        if record_level >= levelno:
+            lines.extend(pending)
+            lines.append(line)
+        pending = []
+    lines.reverse()
+    return lines, start, before
+
+
+def read_log_page(
+    filepath,
+    offset=None,
+    before=None,
+    limit=PAGE_LINES,
+    level=None,
+):
+    """Читает страницу лога.
+
+    Args:
+        filepath: Строка, путь к логу.
+        offset: Целое число или None, смещение начала строки,
+            с которого страница читается вперёд.
+        before: Целое число или None, смещение, до которого страница
+            читается назад. Если offset и before не указаны, то
+            возвращается конец файла.
+        limit: Целое число, максимальное количество строк.
+        level: Имя или число, минимальный уровень записей.
+
+    Returns:
+        Словарь с ключами lines (список строк), offset и end
+        (смещения начала и конца прочитанного участка), size
+        (размер файла) и level (имя уровня или None).
+
+    Raises:
+        OSError, если файл не удалось прочитать.
+        ValueError, если параметры некорректны.
+
+    """
+    levelno = get_level(level)
+    limit = min(max(int(limit), 1), MAX_PAGE_LINES)
+    with open(filepath, 'rb') as log:
+        size = os.fstat(log.fileno()).st_size
+        if offset is not None:
+            lines, start, end = _read_forward(
+                log,
+                min(max(int(offset), 0), size),
+                limit,
+                levelno,
+            )
+        else:
+            if before is None:
+                before = size
+            lines, start, end = _read_backward(
+                log,
+                min(max(int(before), 0), size),
+                limit,
+                levelno,
+            )
+    return {
+        'lines': [line.decode(errors='replace') for line in lines],
+        'offset': start,
+        'end': end,
+        'size': size,
+        'level': logging.getLevelName(levelno) if levelno else None,
+    }
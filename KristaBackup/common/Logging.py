@@ -9,6 +9,11 @@ from collections import OrderedDict
 from logging.handlers import RotatingFileHandler
 from operator import itemgetter
 
+from common.LogIndex import LogIndex
+from common.LogPipeline import (
+    BatchFileHandler, flush_pipeline, start_pipeline,
+)
+from common.LogReader import read_log_page
 from common.TriggerHandler import TriggerHandler
 from common.YamlConfig import AppConfig, ConfigError
 
@@ -78,7 +83,7 @@ def get_formatter(full_name):
     return logging.Formatter(rec_format, date_format)
 
 
-def get_default_file_handler(name, path):
+def get_default_file_handler(name, path, handler_type=logging.FileHandler):
     """Возвращает стандартный хэндлер для файла.
 
     Returns:
@@ -89,11 +94,11 @@ def get_default_file_handler(name, path):
         name,
         logging.INFO,
         path=path,
-        handler_type=logging.FileHandler,
+        handler_type=handler_type,
     )
 
 
-def get_debug_file_handler(name, path):
+def get_debug_file_handler(name, path, handler_type=logging.FileHandler):
     """Возвращает хэндлер для файла с дебагом.
 
     Returns:
@@ -104,7 +109,7 @@ def get_debug_file_handler(name, path):
         name,
         logging.DEBUG,
         path=path,
-        handler_type=logging.FileHandler,
+        handler_type=handler_type,
     )
 
 
@@ -201,6 +206,12 @@ def configure_logging(verbose=False):
         - trigger - >=WARNING, в триггер файл, если он указан в конфиге.
         - stdout - DEBUG, в консоль, если указан параметр verbose.
 
+    Если logging.use_queue не выключен, то хэндлеры подключаются
+    через очередь (см. LogPipeline): записи пишутся отдельным потоком
+    пачками. Размер очереди, политика при её заполнении и размер
+    пачки задаются logging.queue_size, logging.queue_policy
+    и logging.queue_batch.
+
     Args:
         verbose: Логическое значение, логировать в stdout.
 
@@ -228,18 +239,23 @@ def configure_logging(verbose=False):
     )
     log_path_debug = get_log_dirpath(subdir='debug')
 
+    log_conf = AppConfig.conf().get('logging', {})
+    use_queue = log_conf.get('use_queue', True)
+    file_handler_type = BatchFileHandler if use_queue else logging.FileHandler
     handlers = [
         get_default_file_handler(
             full_name,
             os.path.join(log_path_info, log_filename),
+            handler_type=file_handler_type,
         ),
         get_debug_file_handler(
             full_name,
             os.path.join(log_path_debug, log_debug_filename),
+            handler_type=file_handler_type,
         ),
     ]
 
-    if verbose or AppConfig.conf().get('logging', {}).get('use_console', False):
+    if verbose or log_conf.get('use_console', False):
         # Инициализация хэндлера консоли, если стоит verbose или use_console.
         handlers.append(get_console_handler(full_name))
 
@@ -250,8 +266,33 @@ def configure_logging(verbose=False):
     logger = logging.getLogger()
     logger.setLevel(logging.DEBUG)
 
+    queue_error = None
+    if use_queue:
+        try:
+            start_pipeline(
+                handlers,
+                logger,
+                queue_size=log_conf.get('queue_size', 10000),
+                policy=log_conf.get('queue_policy', 'block'),
+                batch_size=log_conf.get('queue_batch', 512),
+            )
+        except (TypeError, ValueError) as exc:
+            queue_error = exc
+            for log_handler in handlers:
+                if isinstance(log_handler, BatchFileHandler):
+                    log_handler.batched = False
+        else:
+            return
+
     for log_handler in handlers:
         logger.addHandler(log_handler)
+    if queue_error is not None:
+        logger.warning('Очередь логов не используется: %s', queue_error)
+
+
+def flush_logging():
+    """Дожидается записи логов, переданных в очередь."""
+    flush_pipeline()
 
 
 def retrieve_seconds_from_name(filename):
@@ -282,13 +323,30 @@ def retrieve_seconds_from_name(filename):
     return -1
 
 
-def get_logs_list():
+def _collect_logs(since=None):
+    """Собирает описания логов из индексов директорий.
+
+    Args:
+        since: Число или None, если указано, то возвращаются только
+            логи с mtime не меньше since.
+
+    Returns:
+        Кортеж (словарь {директория: список описаний логов},
+        наибольший mtime логов, общее количество логов).
+
+    """
     res = {}
+    latest_mtime, count = 0, 0
     for dir in os.listdir(get_log_dirpath()):
         if dir == "debug" or os.path.isfile(os.path.join(get_log_dirpath(), dir)):
             continue
-        res[dir] = []
-        for filename in sorted(os.listdir(os.path.join(get_log_dirpath(), dir)), reverse=True):
+        entries = LogIndex(os.path.join(get_log_dirpath(), dir)).update()
+        count += len(entries)
+        logs = []
+        for filename, entry in entries.items():
+            latest_mtime = max(latest_mtime, entry['mtime'])
+            if since is not None and entry['mtime'] < since:
+                continue
             log = {}
             log["name"] = filename
             if dir == 'krista_backup' or dir == 'web_api':
@@ -297,12 +355,16 @@ def get_logs_list():
                 # Файл для дебаг лога имеет суффикс debug
                 log['debugname'] = '{0}-debug{1}'.format(
                     filename[:-4], filename[-4:])
-            file_exists, error, warning, msg = analyze_log_file(dir, filename)
-            log['exist'] = file_exists
-            log['error'] = error
-            log['warning'] = warning
-            log['msg'] = msg
-            res[dir].append(log)
+            log['exist'] = True
+            log['error'] = entry['error']
+            log['warning'] = entry['warning']
+            log['msg'] = entry['msg']
+            log['task'] = entry['task']
+            log['start'] = entry['start']
+            log['end'] = entry['end']
+            logs.append(log)
+        if since is None or logs:
+            res[dir] = logs
 
     res = OrderedDict(sorted(res.items(), key=itemgetter(0), reverse=True))
     # сортировка по годам в порядке убывания
@@ -314,51 +376,109 @@ def get_logs_list():
             key=lambda entry: retrieve_seconds_from_name(entry.get('name')),
             reverse=True,
         )
-    return res
-
-
-def analyze_log_file(dir, name):
-    file_exists, error, warning = False, False, False
-    msg = ""
-    filepath = os.path.join(get_log_dirpath(), dir, name)
-    file_exists = os.path.exists(filepath) and os.path.isfile(filepath)
-    if file_exists:
-        with open(filepath, "r") as log:
-            for line in log:
-                if "ERROR" in line or "CRITICAL" in line:
-                    error = True
-                    msg = line
-                    break
-                elif "WARNING" in line:
-                    warning = True
-                    msg = line
-    return file_exists, error, warning, msg
-
-
-def get_log_content(dir, filename):
-    # Проверяет существование файла в указанной директории
-    def check_path():
-        dir_path = os.path.join(get_log_dirpath(), dir)
-        if not os.path.isdir(dir_path) or not dir in os.listdir(get_log_dirpath()):
-            return False
-        file_path = os.path.join(dir_path, filename)
-        if not os.path.isfile(file_path) or not filename in os.listdir(dir_path):
-            return False
-        return True
-
-    content = {}
-
-    if check_path():
-        filepath = os.path.join(get_log_dirpath(), dir, filename)
+    return res, latest_mtime, count
+
+
+def get_logs_list():
+    """Возвращает список логов по директориям.
+
+    Результат разбора логов берётся из индекса директории (LogIndex),
+    заново разбираются только новые и изменившиеся файлы.
+
+    Returns:
+        OrderedDict {директория: список словарей с описанием логов}.
+
+    """
+    return _collect_logs()[0]
+
+
+def get_logs_changes(since=None):
+    """Возвращает логи, изменившиеся начиная с since.
+
+    Args:
+        since: Число или None, mtime, начиная с которого нужны логи.
+            Если None, то возвращаются все логи.
+
+    Returns:
+        Кортеж (OrderedDict {директория: список описаний логов},
+        наибольший mtime логов, общее количество логов).
+
+    """
+    return _collect_logs(since)
+
+
+def get_log_filepath(dir, filename):
+    """Возвращает путь к логу, если он есть в директории логов.
+
+    Имена проверяются по содержимому директорий, поэтому путь
+    не может выйти за пределы директории логов.
+
+    Returns:
+        Строку, путь к файлу, или None.
+
+    """
+    dir_path = os.path.join(get_log_dirpath(), dir)
+    if not os.path.isdir(dir_path) or not dir in os.listdir(get_log_dirpath()):
+        return None
+    file_path = os.path.join(dir_path, filename)
+    if not os.path.isfile(file_path) or not filename in os.listdir(dir_path):
+        return None
+    return file_path
+
+
+def parse_log_page_args(args):
+    """Достаёт параметры страницы лога из параметров запроса.
+
+    Args:
+        args: Словарь (request.args, request.query) с необязательными
+            ключами offset, before, limit и level.
+
+    Returns:
+        Словарь с аргументами для get_log_content.
+
+    Raises:
+        ValueError, если параметры некорректны.
+
+    """
+    kwargs = {}
+    for key in ('offset', 'before', 'limit'):
+        value = args.get(key)
+        if value not in (None, ''):
+            kwargs[key] = int(value)
+    if args.get('level'):
+        kwargs['level'] = args.get('level')
+    return kwargs
+
+
+def get_log_content(dir, filename, **kwargs):
+    """Возвращает страницу лога.
+
+    По умолчанию возвращаются последние LogReader.PAGE_LINES строк.
+
+    Args:
+        dir: Строка, директория в директории логов.
+        filename: Строка, имя файла.
+        kwargs: offset, before, limit и level для read_log_page.
+
+    Returns:
+        Словарь с ключами filename, lines и описанием страницы
+        (см. read_log_page).
+
+    Raises:
+        ValueError, если параметры страницы некорректны.
+
+    """
+    content = {"lines": []}
+
+    filepath = get_log_filepath(dir, filename)
+    if filepath is not None:
         content["filename"] = filepath
-        with open(filepath, "r") as log:
-            lines = log.readlines()
-            log.close()
-    else:
-        lines = []
+        try:
+            content.update(read_log_page(filepath, **kwargs))
+        except OSError:
+            filepath = None
 
-    if len(lines) == 0:
-        content["lines"] = "файл отсутствует в файловой системе или нет прав на чтение"
-    content["lines"] = lines
+    if filepath is None:
+        content["state"] = "файл отсутствует в файловой системе или нет прав на чтение"
 
     return content
@@ -10,6 +10,13 @@ class TriggerHandler(NullHandler):
         Данный handler следит за уровнем записей в логе и при повышении
         актуального текущего меняет статус в соотвутствующем trigger файле.
 
+        Состояние файла хранится в памяти, файл перезаписывается только
+        при смене статуса (или если он устарел). Изменения файла другими
+        процессами определяются по mtime не чаще раза в CHECK_INTERVAL
+        секунд. Запись атомарная: через временный файл и переименование,
+        а если в каталог нельзя писать - на месте. Ошибки записи
+        передаются в handleError.
+
         Атрибуты TriggerHandler:
 
         1. trigger_path - путь к файлу с флагом
@@ -26,13 +33,15 @@ class TriggerHandler(NullHandler):
 
     MAX_TIME_DIFF = 5 * 60 * 60  # 5 часов
 
+    CHECK_INTERVAL = 10  # секунд между проверками mtime файла
+
     def __init__(self, trigger_path):
         self.baseFilename = trigger_path
         self.current_run_state = 25
         self.refresh_trigger_state()
         lowest_priority_status = min(self.STATES, key=self.STATES.get)
         if self.current_run_state >= self.state_trigger:
-            self.emit(lowest_priority_status)
+            self.update(lowest_priority_status)
         elif (time.time() - self.mtime_trigger) >= self.MAX_TIME_DIFF:
             self.emit(lowest_priority_status)
 
@@ -43,29 +52,88 @@ class TriggerHandler(NullHandler):
         либо предыдущий устарел.
 
         """
-        self.refresh_trigger_state()
+        self.check_trigger_state()
         if record.levelno > self.current_run_state:
             self.current_run_state = record.levelno
 
-        if self.current_run_state >= self.state_trigger:
-            self.emit(record.levelname)
+        state_name = self.get_state_name(self.current_run_state)
+        try:
+            if self.current_run_state >= self.state_trigger:
+                self.update(state_name)
+            elif (time.time() - self.mtime_trigger) >= self.MAX_TIME_DIFF:
+                self.emit(state_name)
+        except OSError:
+            self.handleError(record)
+
+    def update(self, state_name):
+        """Записывает статус, если он отличается от файла или устарел."""
+        if state_name != self.state_name_trigger:
+            self.emit(state_name)
         elif (time.time() - self.mtime_trigger) >= self.MAX_TIME_DIFF:
-            self.emit(record.levelname)
+            self.emit(state_name)
 
     def emit(self, state_name):
-        with open(self.baseFilename, 'w+') as trigger_file:
-            trigger_file.write(state_name)
+        tmp_path = '{0}.{1}.tmp'.format(self.baseFilename, os.getpid())
+        try:
+            fd = os.open(
+                tmp_path,
+                os.O_WRONLY | os.O_CREAT | os.O_TRUNC,
+                0o666,
+            )
+            with os.fdopen(fd, 'w') as trigger_file:
+                trigger_file.write(state_name)
+            os.replace(tmp_path, self.baseFilename)
+        except OSError:
+            # Нет прав на каталог: файл перезаписывается на месте.
+            if os.path.lexists(tmp_path):
+                os.remove(tmp_path)
+            with open(self.baseFilename, 'w') as trigger_file:
+                trigger_file.write(state_name)
+
+        self.state_name_trigger = state_name
+        self.state_trigger = self.STATES[state_name]
+        self.mtime_trigger = os.path.getmtime(self.baseFilename)
+        self.checked_at = time.monotonic()
+
+    def get_state_name(self, levelno):
+        """Возвращает имя наибольшего статуса, не превышающего levelno."""
+        state_name = min(self.STATES, key=self.STATES.get)
+        for name, state in self.STATES.items():
+            if self.STATES[state_name] < state <= levelno:
+                state_name = name
+        return state_name
+
+    def check_trigger_state(self):
+        """Перечитывает файл, если его изменил другой процесс.
+
+        mtime проверяется не чаще раза в CHECK_INTERVAL секунд.
+
+        """
+        if time.monotonic() - self.checked_at < self.CHECK_INTERVAL:
+            return
+        self.checked_at = time.monotonic()
+        try:
+            mtime = os.path.getmtime(self.baseFilename)
+        except OSError:
+            mtime = 0
+        if mtime != self.mtime_trigger:
+            self.refresh_trigger_state()
 
     def refresh_trigger_state(self):
         state = None
         try:
             with open(self.baseFilename) as trigger:
-                state = trigger.read()
+                state = trigger.read().strip()
         except IOError:
             self.mtime_trigger = 0
         else:
             self.mtime_trigger = os.path.getmtime(self.baseFilename)
+        self.checked_at = time.monotonic()
 
         if state not in self.STATES:
-            state = min(self.STATES, key=self.STATES.get)
-        self.state_trigger = self.STATES.get(state)
+            state = None
+        self.state_name_trigger = state
+        self.state_trigger = self.STATES.get(
+            state,
+            min(self.STATES.values()),
+        )
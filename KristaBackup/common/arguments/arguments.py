@@ -18,6 +18,8 @@ class ArgsManager:
             KristaBackup.py run unit [--dry] [--verbose]
                             en  task
                             dis task
+                            catalog pgdump_action [--verbose]
+                            restore snapshot target [--path PATH]
                             web start/stop [--api]
                                 users (add,rm,upd) ...
 
@@ -58,6 +60,31 @@ class ArgsManager:
         )
         self._add_unit(parser_dis, _help='имя задания или действия (или all)')
 
+        parser_catalog = subparsers.add_parser(
+            constants.CATALOG_OPT_NAME,
+            help='обновить кэш списка баз pgdump',
+        )
+        self._add_default_opts(parser_catalog)
+        self._add_unit(parser_catalog, _help='имя действия pgdump (или all)')
+
+        parser_restore = subparsers.add_parser(
+            constants.RESTORE_OPT_NAME,
+            help='восстановить файлы из снимка dedup',
+        )
+        self._add_default_opts(parser_restore)
+        parser_restore.add_argument('snapshot', help='путь к файлу снимка')
+        parser_restore.add_argument('target', help='каталог восстановления')
+        parser_restore.add_argument(
+            '--path',
+            dest='restore_path',
+            help='восстановить только файл или каталог снимка',
+        )
+        parser_restore.add_argument(
+            '--store',
+            dest='store_path',
+            help='путь к хранилищу блоков, если оно перенесено',
+        )
+
         parser_web = subparsers.add_parser('web', help='настроить веб-модуль')
         self._add_default_opts(parser_web)
         self._add_api(parser_web)
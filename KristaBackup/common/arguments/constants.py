@@ -35,6 +35,9 @@ RUN_OPT_NAME = 'run'
 START_OPT_NAME = 'start'
 STOP_OPT_NAME = 'stop'
 
+CATALOG_OPT_NAME = 'catalog'
+RESTORE_OPT_NAME = 'restore'
+
 ENABLE_OPT_NAME = 'en'
 ENABLE_OPT_NAME_ALIAS = 'enable'
 
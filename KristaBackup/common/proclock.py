@@ -0,0 +1,144 @@
+# -*- coding: UTF-8 -*-
+
+"""Блокировки процессов через fcntl.flock.
+
+Блокировка - файл <имя>.lock в директории блокировок, в который
+владелец записывает свой PID. Ядро снимает flock при завершении
+процесса, поэтому блокировка не остаётся после падения.
+
+"""
+
+import errno
+import fcntl
+import os
+import tempfile
+import time
+
+from common.YamlConfig import AppConfig, ConfigError
+
+DEFAULT_LOCK_PATH = '/var/run/KristaBackup'
+
+# Интервал между попытками захвата при ожидании, в секундах.
+POLL_INTERVAL = 0.2
+
+
+def get_lock_dirpath():
+    """Возвращает путь к директории блокировок.
+
+    Путь задаётся параметром lock_path конфигурации. Если директорию
+    нельзя создать (нет прав), то используется временная директория.
+
+    Returns:
+        Строку, путь к существующей директории.
+
+    """
+    try:
+        path = AppConfig.conf().get('lock_path', DEFAULT_LOCK_PATH)
+    except (FileNotFoundError, ConfigError):
+        path = DEFAULT_LOCK_PATH
+    try:
+        os.makedirs(path, exist_ok=True)
+    except PermissionError:
+        path = os.path.join(
+            tempfile.gettempdir(),
+            'KristaBackup-{0}'.format(os.getuid()),
+        )
+        os.makedirs(path, exist_ok=True)
+    return path
+
+
+class ProcessLock:
+    """Блокировка с записанным PID владельца.
+
+    Attributes:
+        name: Строка, имя блокировки.
+        path: Строка, путь к файлу блокировки.
+
+    """
+
+    def __init__(self, name, dirpath=None):
+        self.name = name
+        self.path = os.path.join(
+            dirpath or get_lock_dirpath(),
+            '{0}.lock'.format(name),
+        )
+        self._file = None
+
+    @property
+    def locked(self):
+        return self._file is not None
+
+    def acquire(self, timeout=0):
+        """Захватывает блокировку.
+
+        Args:
+            timeout: Число, сколько секунд ждать освобождения
+                блокировки. 0 - не ждать, None - ждать без ограничения.
+
+        Returns:
+            True, если блокировка захвачена, иначе False.
+
+        """
+        if self.locked:
+            return True
+        lock_file = open(self.path, 'a+')
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError as exc:
+                if exc.errno not in (errno.EAGAIN, errno.EACCES):
+                    lock_file.close()
+                    raise
+            else:
+                break
+            if deadline is not None and time.monotonic() >= deadline:
+                lock_file.close()
+                return False
+            time.sleep(POLL_INTERVAL)
+
+        lock_file.seek(0)
+        lock_file.truncate()
+        lock_file.write(str(os.getpid()))
+        lock_file.flush()
+        self._file = lock_file
+        return True
+
+    def release(self):
+        """Освобождает блокировку.
+
+        Файл не удаляется: иначе другой процесс может захватить
+        блокировку на уже удалённом файле.
+
+        """
+        if not self.locked:
+            return
+        self._file.truncate(0)
+        fcntl.flock(self._file, fcntl.LOCK_UN)
+        self._file.close()
+        self._file = None
+
+    def get_owner_pid(self):
+        """Возвращает PID владельца блокировки.
+
+        Returns:
+            Целое число или None, если блокировка свободна.
+
+        """
+        if self.locked:
+            return os.getpid()
+        try:
+            lock_file = open(self.path)
+        except FileNotFoundError:
+            return None
+        with lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_SH | fcntl.LOCK_NB)
+            except OSError as exc:
+                if exc.errno not in (errno.EAGAIN, errno.EACCES):
+                    raise
+            else:
+                return None
+            pid = lock_file.read().strip()
+        # PID может быть ещё не записан владельцем.
+        return int(pid) if pid.isdigit() else None
@@ -1,7 +1,9 @@
 from .action import Action
 from .movebkpperiod import MoveBkpPeriod
 from .script import Command, Script
-from .archiver import Archiver, ArchiverTar, ArchiverZip
+from .archiver import (
+    Archiver, ArchiverDedup, ArchiverSnapshot, ArchiverTar, ArchiverZip,
+)
 from .check_last_backup import CheckLastBackup
 from .pgdump import PgDump
 from .cleaner import Cleaner
@@ -22,6 +24,8 @@ _action_types = (
     ('arhiver', Archiver),
     ('tar', ArchiverTar),
     ('zip', ArchiverZip),
+    ('dedup', ArchiverDedup),
+    ('snapshot', ArchiverSnapshot),
     ('pgdump', PgDump),
     ('cleaner', Cleaner),
     ('rsync', Rsync),
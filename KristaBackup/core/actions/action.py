@@ -1,14 +1,19 @@
 # -*- coding: UTF-8 -*-
 
 import fnmatch
+import io
 import logging
+import os
 import re
 import subprocess
 import uuid
 from threading import Thread
 
 from .decorators import side_effecting
-from .utils import create_sha1sum_file
+from .utils import (
+    HashingWriter, create_hash_file, get_hash_algorithms,
+    write_checksum_file,
+)
 
 
 class Action:
@@ -31,6 +36,11 @@ class Action:
 
         dry: Логическое значение, включает тестовый режим.
 
+        hash_algorithm: Строка, алгоритм хэшсумм (checksum_file).
+
+        hash_workers: Целое число, количество потоков подсчёта хэшсумм
+        для алгоритмов, которые считаются параллельно, 0 - по числу ядер.
+
     """
 
     DRYRUN_POSTFIX = 'DRYRUN'
@@ -50,6 +60,9 @@ class Action:
         self.continue_on_error = False
         self._dry = False
 
+        self.hash_algorithm = 'sha1'
+        self.hash_workers = 1
+
     @property
     def dry(self):
         return self._dry
@@ -140,6 +153,9 @@ class Action:
         return_stdout=False,
         stdout_params=None,
         stderr_params=None,
+        stdout_file=None,
+        progress=None,
+        check=None,
     ):
         """Выполняет cmdline.
 
@@ -151,14 +167,26 @@ class Action:
                 {'default_level': logging.<LEVEL>, 'remove_header': <bool>, 'filters': <dict>}
             stderr_params: Словарь, параметры для наблюдателя за stderr вида
                 {'default_level': logging.<LEVEL>, 'remove_header': <bool>, 'filters': <dict>}
+            stdout_file: Файловый объект для записи stdout в бинарном
+                виде вместо наблюдателя, stdout_params не используются.
+            progress: Функция или None, вызывается с количеством
+                записанных в stdout_file байт после каждого блока.
+            check: Логическое значение, проверять код возврата.
+                По умолчанию проверяется, если указан stdout_file:
+                иначе оборванный вывод сохранится как успешный.
 
         Формат filters можно найти в описании к stream_watcher_filtered.
+
+        Raises:
+            subprocess.CalledProcessError, если при проверке кода
+                возврата команда завершилась с ошибкой.
+
         """
         process = subprocess.Popen(
             cmdline,
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
-            universal_newlines=True,
+            universal_newlines=stdout_file is None,
             shell=True,
         )
         if return_stdout:
@@ -168,14 +196,23 @@ class Action:
             process.stderr.close()
             return value
 
-        stdout_params['stream'] = process.stdout
-        stdo = Thread(
-            target=self.stream_watcher_filtered,
-            name='stdout-watcher',
-            kwargs=stdout_params,
-        )
+        copy_errors = []
+        if stdout_file is None:
+            stdout_params['stream'] = process.stdout
+            stdo = Thread(
+                target=self.stream_watcher_filtered,
+                name='stdout-watcher',
+                kwargs=stdout_params,
+            )
+            stderr_params['stream'] = process.stderr
+        else:
+            stdo = Thread(
+                target=_copy_stream,
+                name='stdout-writer',
+                args=(process.stdout, stdout_file, copy_errors, progress),
+            )
+            stderr_params['stream'] = io.TextIOWrapper(process.stderr)
 
-        stderr_params['stream'] = process.stderr
         stde = Thread(
             target=self.stream_watcher_filtered,
             name='stderr-watcher',
@@ -186,6 +223,12 @@ class Action:
         process.wait()
         stdo.join()
         stde.join()
+        if copy_errors:
+            raise copy_errors[0]
+        if check is None:
+            check = stdout_file is not None
+        if check and process.returncode:
+            raise subprocess.CalledProcessError(process.returncode, cmdline)
 
         return None
 
@@ -194,36 +237,94 @@ class Action:
 
     execute_cmdline = side_effecting(execute_cmdline)
 
-    def create_checksum_file(self, src_file, dest_file):
+    def create_checksum_file(
+        self,
+        src_file,
+        dest_file,
+        hash_value=None,
+        logger=None,
+    ):
         """Создаёт файл с хэшсуммой.
 
         Метод нужен для логирования. Основная работа происходит в _create_checksum_file.
 
+        Args:
+            src_file: Строка, путь к файлу.
+            dest_file: Строка, путь к файлу с хэшсуммой.
+            hash_value: Строка или None, посчитанная при записи
+                src_file хэшсумма. Если None, то файл читается заново.
+            logger: Логгер или None, по умолчанию логгер действия.
+
         """
+        logger = logger or self.logger
         try:
             hash_value = self._create_checksum_file(
                 src_file,
                 dest_file,
+                hash_value,
             )
         except PermissionError as exc:
-            self.logger.warning(
+            logger.warning(
                 'Невозможно создать файл с хэшсуммой: %s',
                 exc,
             )
         else:
             if self.dry:
                 hash_value = '(dryrun, хэшсумма не подсчитывается)'
-            self.logger.info(
+            logger.info(
                 'Создан файл %s с хэшсуммой %s',
                 dest_file,
                 hash_value,
             )
 
     @side_effecting
-    def _create_checksum_file(self, src_file, dest_file):
-        return create_sha1sum_file(
+    def _create_checksum_file(self, src_file, dest_file, hash_value=None):
+        algorithm, workers = self.get_hash_params()
+        if hash_value is not None:
+            return write_checksum_file(
+                dest_file,
+                hash_value,
+                algorithm,
+                os.path.basename(src_file),
+            )
+        return create_hash_file(
             src_file,
             dest_file,
+            algorithm,
+            workers,
+        )
+
+    def get_hash_params(self):
+        """Возвращает алгоритм и количество потоков для хэшсумм.
+
+        Недоступный алгоритм заменяется на sha1.
+
+        """
+        algorithm = str(self.hash_algorithm).strip().lower()
+        if algorithm not in get_hash_algorithms():
+            self.logger.warning(
+                'Алгоритм хэширования %s недоступен, используется sha1',
+                self.hash_algorithm,
+            )
+            algorithm = 'sha1'
+        self.hash_algorithm = algorithm
+
+        try:
+            workers = int(self.hash_workers)
+        except (TypeError, ValueError):
+            workers = 1
+        if workers <= 0:
+            workers = os.cpu_count() or 1
+        return algorithm, workers
+
+    def open_hashing_writer(self, fileobj):
+        """Оборачивает fileobj для подсчёта хэшсуммы при записи."""
+        algorithm, workers = self.get_hash_params()
+        return HashingWriter(
+            fileobj,
+            algorithm=algorithm,
+            close_fileobj=True,
+            workers=workers,
         )
 
     def __repr__(self):
@@ -250,6 +351,43 @@ class Action:
         raise NotImplementedError('Should have implemented this')
 
 
+def _copy_stream(
+    stream,
+    fileobj,
+    errors,
+    progress=None,
+    buf_size=1024 * 1024,
+):
+    """Копирует поток stream в fileobj до конца потока.
+
+    Чтение идёт в один переиспользуемый буфер через readinto,
+    в fileobj передаётся memoryview без копирования.
+    При ошибке записи поток дочитывается вхолостую, чтобы процесс
+    не завис на заполненном pipe, а ошибка добавляется в errors.
+
+    """
+    buf = bytearray(buf_size)
+    view = memoryview(buf)
+    copied = 0
+    try:
+        while True:
+            size = stream.readinto(buf)
+            if not size:
+                break
+            try:
+                fileobj.write(view[:size])
+            except (OSError, ValueError) as exc:
+                errors.append(exc)
+                while stream.readinto(buf):
+                    pass
+                break
+            copied += size
+            if progress is not None:
+                progress(copied)
+    finally:
+        stream.close()
+
+
 def _generate_random_basename():
     """Генерирует случайный basename."""
     return uuid.uuid4().hex.upper()[0:6]
@@ -2,17 +2,32 @@
 
 import datetime
 import functools
+import grp
+import io
+import json
 import logging
+import multiprocessing
 import os
+import pwd
 import re
+import shutil
+import stat
 import tarfile
 import time
 import zipfile
+import zlib
 
 from .action import Action
 from .decorators import side_effecting, use_exclusions
 from .interfaces import NameGenerationInterface
 from .mixins import WalkAppierMixin
+from .utils.compression import ParallelGzipWriter
+from .utils.exclusions import ExclusionMatcher, get_tree_pattern
+from .utils.file_linker import LINK_MODES, FileLinker
+from .utils.manifest import (
+    Manifest, ManifestError, ManifestWriter, convert_listfile, merge_manifests,
+)
+from .utils.read_ahead import ReadAhead
 
 
 @use_exclusions
@@ -37,24 +52,51 @@ class Archiver(Action, NameGenerationInterface, WalkAppierMixin):
             level_folders: Список с именами директорий для каждого уровня
                 бэкапа.
             list_extension: Расширение лист-файла.
+            manifest_extension: Расширение бинарного индекса лист-файла.
+            use_manifest: Логическое значение, использовать бинарный
+                индекс для сравнения с предыдущим уровнем.
             hash_extension: Расширение файла с хэш-суммой.
+            shards: Целое число, количество частей архива, каждая
+                пишется отдельным процессом в каталог .shards.
+            shard_by: Строка, разбиение на части: top - по каталогам
+                верхнего уровня, hash - по хэшу пути файла.
         Внутренние:
             prepared_exclusions
+            inc_list: Словарь из list файла предыдущего уровня,
+                используется, если индекс недоступен.
+            inc_manifest: Manifest предыдущего уровня или None.
+            prefetch_workers: Целое число, потоки упреждающего чтения,
+                0 - чтение в потоке записи.
             parent_type: Строка с типом родительского действия
             open_mode
+            shard_index: Целое число, часть, которую пишет процесс,
+                или None.
 
     """
 
+    MAX_LEVEL = 9  # уровень в стандартной схеме именования - одна цифра
+    STREAM_CHECKSUM = True  # архив - файл, хэшсумма считается при записи
+    SUPPORTS_SHARDS = True
+    SKIP_UNCHANGED = True  # неизменные файлы только пишутся в list файл
+    SHARD_MODES = ('top', 'hash')
+    SHARDS_EXTENSION = 'shards'
+
     def __init__(self, name):
         super().__init__(name)
         self.compression = 5
         self.list_extension = 'list'  # расширение для файла-списка архива
+        self.manifest_extension = 'idx'  # расширение для индекса списка
+        self.use_manifest = True
         self.check_level_list_only = True
         self.log_files = False
         self.overwrite = False
         self.checksum_file = False
         self.inc_list = {}
+        self.inc_manifest = None
         self.use_absolute_path = False
+        self.prefetch_workers = 0
+        self.prefetch_memory = 256  # Мб прочитанных заранее данных
+        self.prefetch_threshold = 16  # Мб, файлы больше читаются при записи
 
         self.compression_lib = None
         self.open_mode = None
@@ -63,6 +105,10 @@ class Archiver(Action, NameGenerationInterface, WalkAppierMixin):
         self.level = 0
         self.level_folders = []
 
+        self.shards = 1
+        self.shard_by = 'top'
+        self.shard_index = None
+
     def configure_archiver(self):
         self.compression = 5
         if self.compression < 0:
@@ -70,12 +116,35 @@ class Archiver(Action, NameGenerationInterface, WalkAppierMixin):
         elif self.compression > 9:
             self.compression = 9
 
-    def open_file(self, archive_filepath):
+    def open_file(self, archive_filepath, fileobj=None):
+        """Открывает архив на запись.
+
+        Args:
+            archive_filepath: Строка, путь к архиву.
+            fileobj: Файловый объект или None, если задан, то архив
+                пишется в него, а не открывает archive_filepath.
+
+        """
         raise NotImplementedError('open_file - should have implemented this')
 
-    def append(self, archive, file):
+    def append(self, archive, file, arcname=None, entry=None, content=None):
+        """Добавляет файл в архив.
+
+        Args:
+            archive: Архив, открытый через open_file.
+            file: Строка, путь к исходному файлу.
+            arcname: Строка, имя файла в архиве.
+            entry: FileEntry или None, данные lstat файла.
+            content: bytes или None, прочитанное заранее содержимое
+                файла, если None, то файл читается при добавлении.
+
+        """
         raise NotImplementedError('append - should have implemented this')
 
+    def close_file(self, archive):
+        """Закрывает архив, открытый через open_file."""
+        archive.close()
+
     def generate_dirname(self, *args, **kwargs):
         level = kwargs.get('level', self.level)
         if self.level_folders:
@@ -104,53 +173,205 @@ class Archiver(Action, NameGenerationInterface, WalkAppierMixin):
             patterns.append(hash_p)
         return patterns
 
-    def find_source_listfile(self, level):
-        """Находит list файл по уровню.
+    def get_max_level(self):
+        """Возвращает максимальный возможный уровень бэкапа."""
+        if self.level_folders:
+            return len(self.level_folders) - 1
+        return self.MAX_LEVEL
+
+    def find_listfiles(self, level):
+        """Находит все list файлы уровня.
 
         Args:
             level: Целое число, необходимый уровень.
 
         Returns:
-            str или None, если путь к файлу не найден/не существует.
+            Список кортежей (datetime, путь к файлу), отсортированный
+            по времени создания бэкапа.
 
         """
-        if level < 0:
-            return None
+        if level < 0 or level > self.get_max_level():
+            return []
         dirpath = self.generate_dirname(level=level)
 
         if not os.path.exists(dirpath):
-            return None
+            return []
 
         required_filename_pattern = self.scheme.get_fsdump_pattern(
             self,
             level=level,
             ext=self.list_extension,
         )
-        listfiles_candidates = []
+        listfiles = []
 
         for filename in os.listdir(dirpath):
             if re.match(required_filename_pattern, filename):
                 filepath = os.path.join(dirpath, filename)
-                if os.path.isfile(filepath):
-                    listfiles_candidates.append(filepath)
+                if not os.path.isfile(filepath):
+                    continue
+                backup_time = self.scheme.retrieve_time_from_name(
+                    filename,
+                    required_filename_pattern,
+                )
+                if backup_time:
+                    listfiles.append((backup_time, filepath))
 
-        if not listfiles_candidates:
+        return sorted(listfiles)
+
+    def find_source_listfile(self, level):
+        """Находит самый новый list файл по уровню.
+
+        Args:
+            level: Целое число, необходимый уровень.
+
+        Returns:
+            str или None, если путь к файлу не найден/не существует.
+
+        """
+        listfiles = self.find_listfiles(level)
+        if not listfiles:
             return None
+        return listfiles[-1][1]
 
-        return max(
-            listfiles_candidates,
-            key=lambda filepath: self.scheme.retrieve_time_from_name(
-                os.path.basename(filepath),
-                required_filename_pattern,
-            ),
+    def find_base_listfile(self, level):
+        """Находит list файл бэкапа, от которого строится уровень level.
+
+        Базой уровня N является самый новый бэкап среди уровней
+        от 0 до N-1 (как в dump). При регулярном расписании это
+        последний бэкап уровня N-1, но если после него был сделан
+        бэкап более низкого уровня, то база - он.
+
+        Returns:
+            Кортеж (уровень, путь к list файлу) или None.
+
+        """
+        candidates = []
+        for base_level in range(level):
+            listfiles = self.find_listfiles(base_level)
+            if listfiles:
+                backup_time, filepath = listfiles[-1]
+                candidates.append((backup_time, base_level, filepath))
+        if not candidates:
+            return None
+        _, base_level, filepath = max(candidates)
+        return base_level, filepath
+
+    def find_previous_archive(self, exclude=None):
+        """Находит самый новый существующий архив любого уровня.
+
+        Args:
+            exclude: Строка или None, путь к архиву, который
+                не учитывается (например, создаваемый).
+
+        Returns:
+            Кортеж (путь к архиву, путь к list файлу) или None.
+
+        """
+        listfiles = sorted(
+            listfile
+            for level in range(self.get_max_level() + 1)
+            for listfile in self.find_listfiles(level)
         )
+        for _, list_filepath in reversed(listfiles):
+            with open(list_filepath) as list_file:
+                archive_filepath = list_file.readline().rstrip()
+            if archive_filepath != exclude \
+                    and os.path.exists(archive_filepath):
+                return archive_filepath, list_filepath
+        return None
+
+    def find_required_backup_times(self, level):
+        """Находит бэкапы уровня level, нужные для восстановления.
 
-    def fill_archive(self, archive_file=None, list_file=None):
+        Бэкап нужен, если он входит в цепочку баз какого-либо
+        существующего бэкапа более высокого уровня.
+
+        Returns:
+            Множество datetime бэкапов уровня level.
+
+        """
+        backups = sorted(
+            (backup_time, backup_level)
+            for backup_level in range(self.get_max_level() + 1)
+            for backup_time, _ in self.find_listfiles(backup_level)
+        )
+        required = set()
+        for index, (_, backup_level) in enumerate(backups):
+            if backup_level <= level:
+                continue
+            chain_level = backup_level
+            for base_time, base_level in reversed(backups[:index]):
+                if base_level >= chain_level:
+                    continue
+                if base_level == level:
+                    required.add(base_time)
+                if base_level <= level:
+                    break
+                chain_level = base_level
+        return required
+
+    def get_manifest_filepath(self, list_filepath):
+        """Возвращает путь к бинарному индексу для list файла."""
+        list_suffix = '.{0}'.format(self.list_extension)
+        if list_filepath.endswith(list_suffix):
+            list_filepath = list_filepath[:-len(list_suffix)]
+        return '{0}.{1}'.format(list_filepath, self.manifest_extension)
+
+    def open_source_manifest(self, list_filepath):
+        """Открывает индекс list файла предыдущего уровня.
+
+        Если индекса нет, то он создаётся из list файла.
+
+        Returns:
+            Manifest или None, если индекс недоступен.
+
+        """
+        manifest_filepath = self.get_manifest_filepath(list_filepath)
+        if not os.path.exists(manifest_filepath):
+            if self.dry:
+                return None
+            try:
+                count = convert_listfile(
+                    list_filepath,
+                    manifest_filepath,
+                    logger=self.logger,
+                )
+            except OSError as exc:
+                self.logger.warning(
+                    'Не удалось создать индекс %s: %s',
+                    manifest_filepath,
+                    exc,
+                )
+                return None
+            self.logger.info(
+                'Создан индекс %s, записей: %s',
+                manifest_filepath,
+                count,
+            )
+
+        try:
+            manifest = Manifest(manifest_filepath)
+        except (OSError, ManifestError) as exc:
+            self.logger.warning(
+                'Индекс %s не будет использован: %s',
+                manifest_filepath,
+                exc,
+            )
+            return None
+        self.logger.debug(
+            'Используется индекс %s, записей: %s',
+            manifest_filepath,
+            len(manifest),
+        )
+        return manifest
+
+    def fill_archive(self, archive_file=None, list_file=None, manifest=None):
         """Добавление файлов в tar.
 
         Args:
             archive_file: Tarfile, файл архива.
             list_file: Лист файл, содержит записи о содержимом tar архива.
+            manifest: ManifestWriter, бинарный индекс list файла.
 
         """
         file_logger = logging.getLogger(
@@ -161,39 +382,124 @@ class Archiver(Action, NameGenerationInterface, WalkAppierMixin):
         get_signature = functools.partial(
             self._get_signature,
             file_logger=file_logger,
-            matcher=re.match,
+            is_excluded=self.exclusion_matcher.match,
         )
 
         add = functools.partial(
             self._add_item,
             archive=archive_file,
             list_file=list_file,
+            manifest=manifest,
             repeat=True,
         )
-        handle_file = functools.partial(
-            self._handle_item,
-            get_signature=get_signature,
-            add=add,
+        record = functools.partial(
+            self._record_item,
+            list_file=list_file,
+            manifest=manifest,
         )
-        self.walk_apply(src=self.src_path, apply=handle_file, apply_dirs=True)
+        if self.prefetch_workers <= 0 or self.dry:
+            handle_file = functools.partial(
+                self._handle_item,
+                get_signature=get_signature,
+                add=add,
+                record=record,
+                file_logger=file_logger,
+            )
+            self.scan_apply(
+                src=self.src_path,
+                apply=self._filter_shard(handle_file),
+                apply_dirs=True,
+            )
+            return
+
+        self.logger.debug(
+            'Упреждающее чтение, потоков: %s',
+            self.prefetch_workers,
+        )
+        with ReadAhead(
+            workers=self.prefetch_workers,
+            memory_limit=self.prefetch_memory * 1024 * 1024,
+            threshold=self.prefetch_threshold * 1024 * 1024,
+        ) as read_ahead:
+            # Неизменные файлы тоже идут через очередь, чтобы порядок
+            # строк list файла совпадал с порядком в архиве.
+            handle_file = functools.partial(
+                self._handle_item,
+                get_signature=get_signature,
+                add=functools.partial(
+                    self._queue_item,
+                    handle=add,
+                    read_ahead=read_ahead,
+                    prefetch=True,
+                ),
+                record=functools.partial(
+                    self._queue_item,
+                    handle=record,
+                    read_ahead=read_ahead,
+                ),
+                file_logger=file_logger,
+            )
+            self.scan_apply(
+                src=self.src_path,
+                apply=self._filter_shard(handle_file),
+                apply_dirs=True,
+            )
+
+    def _queue_item(
+        self,
+        path,
+        entry,
+        signature,
+        handle,
+        read_ahead,
+        prefetch=False,
+    ):
+        """Ставит обработку файла в очередь упреждающего чтения."""
+        handler = functools.partial(handle, path, entry, signature)
+        if prefetch and stat.S_ISREG(entry.mode):
+            read_ahead.submit(
+                handler,
+                os.path.join(self.src_path, entry.path),
+                entry.size,
+            )
+        else:
+            read_ahead.submit(handler)
 
     def parse_exclusions(self):
-        """Обработка переданных исключений."""
+        """Обработка переданных исключений.
+
+        Все исключения объединяются в ExclusionMatcher. Для паттернов
+        вида ``<директория>/*`` дополнительно строятся паттерны
+        поддеревьев, чтобы не обходить исключённые директории.
+
+        """
+        tree_patterns = []
         for exclusion in self.exclusions:
-            exclusion = self.prepare_pattern(exclusion)
-            if not exclusion:
+            prepared = self.prepare_pattern(exclusion)
+            if not prepared:
                 continue
             try:
-                exclusion = re.compile(exclusion)
+                prepared = re.compile(prepared)
             except Exception as exc:
                 self.logger.warning(
                     'Ошибка в исключении %s: %s',
-                    exclusion,
+                    prepared,
                     exc,
                 )
-            else:
-                self.prepared_exclusions.append(exclusion)
+                continue
+            self.prepared_exclusions.append(prepared)
+            tree_pattern = get_tree_pattern(
+                exclusion,
+                self.use_re_in_patterns,
+                self.prepare_pattern,
+            )
+            if tree_pattern:
+                tree_patterns.append(tree_pattern)
 
+        self.exclusion_matcher = ExclusionMatcher(
+            self.prepared_exclusions,
+            tree_patterns,
+        )
         self.logger.debug(
             'Добавлены исключения: %s',
             [excl.pattern for excl in self.prepared_exclusions],
@@ -206,11 +512,11 @@ class Archiver(Action, NameGenerationInterface, WalkAppierMixin):
             True, если возникли ошибки.
 
         """
-        if self.level > 1:
-            self.logger.warning('Уровни выше 1 не реализованы')
-            self.logger.info('Понижаю уровень до 1')
-            self.level = 1
-
+        try:
+            self.level = int(self.level)
+        except (TypeError, ValueError):
+            self.logger.error('Неверное значение level: %s', self.level)
+            return True
         if self.level_folders and len(self.level_folders) < self.level + 1:
             self.logger.error(
                 'Неверно сконфигурированы папки уровней бекапов!',
@@ -221,6 +527,15 @@ class Archiver(Action, NameGenerationInterface, WalkAppierMixin):
                 self.level_folders,
             )
             return True
+        if self.level < 0 or self.level > self.get_max_level():
+            self.logger.error(
+                'Неверное значение level: %s, допустимые: 0-%s',
+                self.level,
+                self.get_max_level(),
+            )
+            return True
+        if self.configure_shards():
+            return True
         if not os.path.exists(self.src_path):
             if os.path.isfile(self.src_path):
                 self.logger.error(
@@ -236,6 +551,35 @@ class Archiver(Action, NameGenerationInterface, WalkAppierMixin):
 
         return False
 
+    def configure_shards(self):
+        """Проверяет параметры разбиения архива на части.
+
+        Returns:
+            True, если параметры неверны.
+
+        """
+        try:
+            self.shards = int(self.shards)
+        except (TypeError, ValueError):
+            self.logger.error('Неверное значение shards: %s', self.shards)
+            return True
+        if self.shards <= 0:
+            self.shards = os.cpu_count() or 1
+        if self.shards > 1 and not self.SUPPORTS_SHARDS:
+            self.logger.warning(
+                'Разбиение на части не поддерживается %s',
+                self.__class__.__name__,
+            )
+            self.shards = 1
+        if self.shard_by not in self.SHARD_MODES:
+            self.logger.error(
+                'Неверное значение shard_by: %s, допустимые: %s',
+                self.shard_by,
+                ', '.join(self.SHARD_MODES),
+            )
+            return True
+        return False
+
     def adjust_backup_level(self):
         """Поиск/проверка списка файлов и архива предыдущего уровня.
 
@@ -245,23 +589,19 @@ class Archiver(Action, NameGenerationInterface, WalkAppierMixin):
         if self.level == 0:
             return
 
-        src_list_file = None
-        while self.level > 0 and not src_list_file:
-            # Поиск list файла минимального уровня.
-            src_list_file = self.find_source_listfile(level=self.level - 1)
-            if not src_list_file:
-                self.level -= 1
-
-        if not src_list_file:
+        base = self.find_base_listfile(self.level)
+        if base is None:
+            self.level = 0
             self.logger.warning(
                 'Лист файл не найден, будет создана копия %s уровня.',
                 self.level,
             )
             return
+        base_level, src_list_file = base
 
         self.logger.debug(
             'Файл списка бэкапа %s уровня: %s',
-            self.level - 1,
+            base_level,
             src_list_file,
         )
 
@@ -276,16 +616,33 @@ class Archiver(Action, NameGenerationInterface, WalkAppierMixin):
                     )
                     self.level = 0
                     return
-            for line_num, line in enumerate(lines):
-                if line.count(',') < 2:
-                    self.logger.warning(
-                        'Ошибка в строке %s, файл будет пропущен: %s',
-                        line_num,
-                        line,
-                    )
-                    continue
+            self.load_inc_list(src_list_file, lines)
+
+    def load_inc_list(self, src_list_file, lines):
+        """Загружает список файлов бэкапа, от которого строится текущий.
+
+        Используется бинарный индекс, если он доступен, иначе
+        заполняется inc_list.
+
+        Args:
+            src_list_file: Строка, путь к list файлу.
+            lines: list файл, открытый и прочитанный до списка файлов.
+
+        """
+        if self.use_manifest:
+            self.inc_manifest = self.open_source_manifest(src_list_file)
+            if self.inc_manifest is not None:
+                return
+        for line_num, line in enumerate(lines):
+            try:
                 mtime, size, filename = line.rstrip().split(',', 2)
-                self.inc_list[filename] = (mtime, size)
+                self.inc_list[filename] = (float(mtime), int(size))
+            except ValueError:
+                self.logger.warning(
+                    'Ошибка в строке %s, файл будет пропущен: %s',
+                    line_num,
+                    line,
+                )
 
     def start(self):
         start_time = datetime.datetime.now()
@@ -298,14 +655,19 @@ class Archiver(Action, NameGenerationInterface, WalkAppierMixin):
 
         if not os.path.exists(self.dest_path):
             os.makedirs(self.dest_path, 0o755)
+
+        sharded = self.shards > 1
+        extension = self.SHARDS_EXTENSION if sharded else self.extension
+        if self.overwrite:
+            # Перезаписываемый архив удаляется до выбора предыдущего
+            # уровня, иначе он может стать базой для самого себя.
+            self._remove_target(self.generate_filepath(extension=extension))
         self.adjust_backup_level()
 
-        archive_filepath = self.generate_filepath(
-            extension=self.extension,
-        )
-        if os.path.exists(archive_filepath):
+        archive_filepath = self.generate_filepath(extension=extension)
+        if os.path.lexists(archive_filepath):
             if self.overwrite:
-                os.remove(archive_filepath)
+                self._remove_target(archive_filepath)
             else:
                 self.logger.error(
                     'Получатель уже существует: %s, архив не будет создан',
@@ -324,15 +686,46 @@ class Archiver(Action, NameGenerationInterface, WalkAppierMixin):
             self.src_path,
         )
 
+        stream_checksum = self.checksum_file and self.STREAM_CHECKSUM \
+            and not sharded
+        error = False
         if self.dry:
             self.fill_archive()
+        elif sharded:
+            error = self.write_shards(archive_filepath, list_filename)
         else:
-            with open(list_filename, 'w+') as list_file:
-                list_file.write(archive_filepath)
-                list_file.write('\n')
-                arhive = self.open_file(archive_filepath)
-                self.fill_archive(arhive, list_file)
-                arhive.close()
+            manifest = ManifestWriter(
+                self.get_manifest_filepath(list_filename),
+            )
+            archive_fileobj = None
+            if stream_checksum:
+                # Хэшсумма считается при записи, без повторного чтения.
+                raw_fileobj = open(archive_filepath, 'wb')
+                try:
+                    archive_fileobj = self.open_hashing_writer(raw_fileobj)
+                except Exception:
+                    raw_fileobj.close()
+                    raise
+            try:
+                with open(list_filename, 'w+') as list_file:
+                    list_file.write(archive_filepath)
+                    list_file.write('\n')
+                    arhive = self.open_file(
+                        archive_filepath,
+                        fileobj=archive_fileobj,
+                    )
+                    self.fill_archive(arhive, list_file, manifest)
+                    self.close_file(arhive)
+            finally:
+                if archive_fileobj is not None:
+                    archive_fileobj.close()
+            manifest.close()
+
+        if self.inc_manifest is not None:
+            self.inc_manifest.close()
+            self.inc_manifest = None
+        if error:
+            return self.continue_on_error
 
         self.logger.info(
             'Архив создан: %s, время обработки: %s',
@@ -342,10 +735,172 @@ class Archiver(Action, NameGenerationInterface, WalkAppierMixin):
 
         if self.checksum_file:
             hash_filepath = self.generate_hash_filepath()
-            self.create_checksum_file(archive_filepath, hash_filepath)
+            hash_value = None
+            if not self.dry and stream_checksum:
+                hash_value = archive_fileobj.hexdigest()
+            self.create_checksum_file(
+                archive_filepath,
+                hash_filepath,
+                hash_value,
+            )
 
         return True
 
+    @staticmethod
+    def _remove_target(filepath):
+        """Удаляет существующий архив: файл, ссылку или каталог."""
+        if not os.path.lexists(filepath):
+            return
+        if os.path.isdir(filepath) and not os.path.islink(filepath):
+            shutil.rmtree(filepath)
+        else:
+            os.remove(filepath)
+
+    def write_shards(self, shards_dirpath, list_filename):
+        """Пишет архив частями в параллельных процессах.
+
+        Каждая часть - отдельный архив со своим list файлом в каталоге
+        shards_dirpath, связывает их index.json. list файл и индекс
+        всего бэкапа собираются из частей, поэтому следующий уровень
+        строится от набора частей как от обычного архива.
+
+        Returns:
+            True, если возникла ошибка.
+
+        """
+        os.makedirs(shards_dirpath)
+        self.logger.info(
+            'Архив пишется частями: %s, разбиение: %s',
+            self.shards,
+            self.shard_by,
+        )
+        context = multiprocessing.get_context('fork')
+        processes = []
+        for index in range(self.shards):
+            process = context.Process(
+                target=self._write_shard,
+                args=(shards_dirpath, index),
+                name='{0}-shard-{1}'.format(self.name, index),
+            )
+            process.start()
+            processes.append(process)
+
+        failed = []
+        for index, process in enumerate(processes):
+            process.join()
+            if process.exitcode != 0:
+                failed.append(index)
+        if failed:
+            self.logger.error(
+                'Части архива %s не созданы, код выхода: %s',
+                failed,
+                [processes[index].exitcode for index in failed],
+            )
+            shutil.rmtree(shards_dirpath, ignore_errors=True)
+            return True
+
+        shard_names = [
+            self.get_shard_name(index) for index in range(self.shards)
+        ]
+        with open(list_filename, 'w') as list_file:
+            list_file.write(shards_dirpath)
+            list_file.write('\n')
+            for shard_name in shard_names:
+                shard_list_filepath = os.path.join(
+                    shards_dirpath,
+                    '{0}.{1}'.format(shard_name, self.list_extension),
+                )
+                with open(shard_list_filepath) as shard_list:
+                    shard_list.readline()
+                    shutil.copyfileobj(shard_list, list_file)
+        manifest_filepaths = [
+            os.path.join(
+                shards_dirpath,
+                '{0}.{1}'.format(shard_name, self.manifest_extension),
+            )
+            for shard_name in shard_names
+        ]
+        merge_manifests(
+            manifest_filepaths,
+            self.get_manifest_filepath(list_filename),
+        )
+        for manifest_filepath in manifest_filepaths:
+            os.remove(manifest_filepath)
+
+        with open(os.path.join(shards_dirpath, 'index.json'), 'w') as index:
+            json.dump(
+                {
+                    'shards': self.shards,
+                    'shard_by': self.shard_by,
+                    'level': self.level,
+                    'archives': [
+                        '{0}.{1}'.format(shard_name, self.extension)
+                        for shard_name in shard_names
+                    ],
+                    'lists': [
+                        '{0}.{1}'.format(shard_name, self.list_extension)
+                        for shard_name in shard_names
+                    ],
+                },
+                index,
+                indent=2,
+            )
+        return False
+
+    def get_shard_name(self, index):
+        """Возвращает имя части без расширения."""
+        return 'shard-{0:02d}'.format(index)
+
+    def get_shard(self, path):
+        """Возвращает номер части для пути относительно src_path."""
+        if self.shard_by == 'top':
+            path = path.split(os.sep, 1)[0]
+        return zlib.crc32(path.encode('utf-8', 'surrogateescape')) \
+            % self.shards
+
+    def _write_shard(self, shards_dirpath, index):
+        """Пишет одну часть архива, выполняется в дочернем процессе."""
+        self.shard_index = index
+        shard_filepath = os.path.join(
+            shards_dirpath,
+            self.get_shard_name(index),
+        )
+        archive_filepath = '{0}.{1}'.format(shard_filepath, self.extension)
+        try:
+            manifest = ManifestWriter(
+                '{0}.{1}'.format(shard_filepath, self.manifest_extension),
+            )
+            list_filepath = '{0}.{1}'.format(
+                shard_filepath,
+                self.list_extension,
+            )
+            with open(list_filepath, 'w') as list_file:
+                list_file.write(archive_filepath)
+                list_file.write('\n')
+                archive = self.open_file(archive_filepath)
+                self.fill_archive(archive, list_file, manifest)
+                self.close_file(archive)
+            manifest.close()
+        except Exception:
+            self.logger.exception('Ошибка при создании части %s', index)
+            raise
+        self.logger.debug('Часть %s создана: %s', index, archive_filepath)
+
+    def _filter_shard(self, handle_file):
+        """Оставляет в обходе только файлы части shard_index."""
+        if self.shard_index is None:
+            return handle_file
+
+        def handle_shard_file(entry):
+            if self.get_shard(entry.path) == self.shard_index:
+                return handle_file(entry)
+            if self.shard_by == 'top' and stat.S_ISDIR(entry.mode):
+                # Каталог верхнего уровня другой части не читается.
+                return self.SKIP
+            return None
+
+        return handle_shard_file
+
     def get_filename_patterns(self):
         patterns = (
             self.scheme.get_fsdump_pattern(self),
@@ -354,9 +909,25 @@ class Archiver(Action, NameGenerationInterface, WalkAppierMixin):
         return patterns
 
     @side_effecting
-    def _add_item(self, path, signature, archive, list_file, repeat=False):
+    def _add_item(
+        self,
+        path,
+        entry,
+        signature,
+        archive,
+        list_file,
+        manifest,
+        repeat=False,
+        content=None,
+    ):
         try:
-            self.append(archive, path)
+            self.append(
+                archive,
+                os.path.join(self.src_path, entry.path),
+                arcname=path,
+                entry=entry,
+                content=content,
+            )
         except FileNotFoundError:
             self.logger.debug(
                 'Файл/директория не найдена: %s',
@@ -371,46 +942,78 @@ class Archiver(Action, NameGenerationInterface, WalkAppierMixin):
             if repeat:
                 self.logger.debug('Новая попытка через 5 секунд.')
                 time.sleep(5)
-                self._add_item(path, signature, archive, list_file)
+                self._add_item(
+                    path,
+                    entry,
+                    signature,
+                    archive,
+                    list_file,
+                    manifest,
+                )
         else:
-            list_file.write('{0}\n'.format(signature))
+            self._record_item(path, entry, signature, list_file, manifest)
 
-    def _get_signature(self, path, file_logger, matcher):
-        try:
-            mtime = os.path.getmtime(path)
-            fsize = os.path.getsize(path)
-        except FileNotFoundError:
+    @side_effecting
+    def _record_item(self, path, entry, signature, list_file, manifest):
+        """Записывает файл в list файл и индекс."""
+        list_file.write('{0}\n'.format(signature))
+        manifest.add(path, entry.stat.st_mtime_ns, entry.size)
+
+    def _get_signature(self, path, entry, file_logger, is_excluded):
+        """Возвращает сигнатуру файла или None для исключённых файлов."""
+        if is_excluded(path):
+            file_logger.debug('ex %s', path)
             return None
-        signature = '{0},{1},{2}'.format(mtime, fsize, path)
-        for exclusion in self.prepared_exclusions:
-            if matcher(exclusion, path):
-                file_logger.debug('ex %s', path)
-                return None
-        if path in self.inc_list:
-            if mtime == float(self.inc_list[path][0]):
-                if fsize == float(self.inc_list[path][1]):
-                    file_logger.debug('eq %s', signature)
-                    return None
-        file_logger.debug('add %s', signature)
-        return signature
-
-    def _handle_item(self, path, add, get_signature):
+        return '{0},{1},{2}'.format(entry.mtime, entry.size, path)
+
+    def _matches_previous(self, path, entry):
+        """Сравнивает mtime и размер файла с list файлом или индексом."""
+        if self.inc_manifest is not None:
+            return self.inc_manifest.is_unchanged(
+                path,
+                entry.stat.st_mtime_ns,
+                entry.size,
+            )
+        return self.inc_list.get(path) == (entry.mtime, entry.size)
+
+    def _handle_item(self, entry, add, record, get_signature, file_logger):
         """Обрабатывает файл.
 
-        Если get_signature возвращает не None, то вызывается
-        add(path, signature).
+        Если get_signature возвращает не None, то файл попадает в list
+        файл: изменённые файлы через add(path, entry, signature),
+        неизменные с предыдущего уровня - через record. Поэтому list
+        файл любого уровня описывает всё дерево и может быть базой
+        для следующего уровня.
 
         Args:
-            path: Строка, путь к файлу/директории.
+            entry: FileEntry, файл/директория относительно src_path.
             add: Функция добавления в архив.
+            record: Функция записи в list файл без добавления в архив.
             get_signature: Функция получения сигнатуры файла.
+            file_logger: Логгер для записей о файлах.
+
+        Returns:
+            SKIP для директорий, всё содержимое которых исключено,
+            иначе None.
 
         """
+        path = entry.path
         if self.use_absolute_path:
-            path = os.path.abspath(path)
-        signature = get_signature(path)
+            path = os.path.abspath(os.path.join(self.src_path, path))
+        signature = get_signature(path, entry)
         if signature:
-            add(path, signature)
+            if self.SKIP_UNCHANGED and self._matches_previous(path, entry):
+                file_logger.debug('eq %s', signature)
+                record(path, entry, signature)
+            else:
+                file_logger.debug('add %s', signature)
+                add(path, entry, signature)
+
+        if stat.S_ISDIR(entry.mode) \
+                and self.exclusion_matcher.excludes_tree(path):
+            file_logger.debug('ex %s/*', path)
+            return self.SKIP
+        return None
 
 
 @use_exclusions
@@ -421,6 +1024,15 @@ class ArchiverTar(Archiver):
         Внешние:
             compression: Целое число, уровень сжатия.
             compression_lib: тип библиотеки шифрования gzip, bzip; lzma (python3.3+)
+            compression_workers: Целое число, количество потоков сжатия.
+                Если больше 1, то gzip архив сжимается параллельно
+                блоками (multi-member gzip), 0 - по числу ядер.
+            prefetch_workers: Целое число, количество потоков
+                упреждающего чтения файлов, 0 - отключено.
+            prefetch_memory: Целое число, Мб прочитанных заранее,
+                но ещё не записанных в архив данных.
+            prefetch_threshold: Целое число, Мб, файлы большего
+                размера не читаются заранее.
 
     """
 
@@ -440,6 +1052,7 @@ class ArchiverTar(Archiver):
     def __init__(self, name):
         super().__init__(name)
         self.compression_lib = 'gzip'
+        self.compression_workers = 1
 
     def configure_archiver(self):
         super().configure_archiver()
@@ -447,22 +1060,101 @@ class ArchiverTar(Archiver):
             self.compression_lib = 'gzip'
         self.open_mode = self.compression_types[self.compression_lib][0]
         self.extension = self.compression_types[self.compression_lib][1]
+
+        try:
+            self.compression_workers = int(self.compression_workers)
+        except (TypeError, ValueError):
+            self.logger.warning(
+                'Неверное значение compression_workers: %s, '
+                'используется 1 поток',
+                self.compression_workers,
+            )
+            self.compression_workers = 1
+        if self.compression_workers <= 0:
+            self.compression_workers = os.cpu_count() or 1
+        if self.compression_workers > 1 and self.compression_lib != 'gzip':
+            self.logger.warning(
+                'Параллельное сжатие доступно только для gzip, '
+                'для %s используется 1 поток',
+                self.compression_lib,
+            )
+            self.compression_workers = 1
+
+        try:
+            self.prefetch_workers = max(int(self.prefetch_workers), 0)
+            self.prefetch_memory = max(int(self.prefetch_memory), 1)
+            self.prefetch_threshold = max(int(self.prefetch_threshold), 0)
+        except (TypeError, ValueError):
+            self.logger.warning(
+                'Неверные параметры упреждающего чтения, оно отключено',
+            )
+            self.prefetch_workers = 0
         return False
 
-    def open_file(self, archive_filepath):
+    def open_file(self, archive_filepath, fileobj=None):
+        if self.compression_workers > 1:
+            self.logger.debug(
+                'Параллельное сжатие gzip, потоков: %s',
+                self.compression_workers,
+            )
+            output = fileobj or open(archive_filepath, 'wb')
+            try:
+                compressor = ParallelGzipWriter(
+                    output,
+                    compresslevel=self.compression,
+                    workers=self.compression_workers,
+                    close_fileobj=True,
+                )
+            except Exception:
+                if fileobj is None:
+                    output.close()
+                raise
+            # name нужен tarfile, чтобы не добавить архив сам в себя.
+            return tarfile.open(
+                archive_filepath,
+                mode='w',
+                fileobj=compressor,
+            )
         if self.compression_lib != 'lzma':
             return tarfile.open(
                 archive_filepath,
                 mode=self.open_mode,
+                fileobj=fileobj,
                 compresslevel=self.compression,
             )
         return tarfile.open(
             archive_filepath,
             mode=self.open_mode,
+            fileobj=fileobj,
         )
 
-    def append(self, archive, file):
-        archive.add(file, recursive=False)
+    def append(self, archive, file, arcname=None, entry=None, content=None):
+        if entry is None:
+            archive.add(file, arcname=arcname, recursive=False)
+            return
+        if archive.name and os.path.abspath(file) == archive.name:
+            # Как и tarfile.add, не добавляем архив сам в себя.
+            return
+
+        tarinfo = _tarinfo_from_stat(archive, file, arcname, entry.stat)
+        if tarinfo is None:
+            self.logger.debug('Неподдерживаемый тип файла: %s', file)
+        elif tarinfo.isreg() and content is not None:
+            if len(content) != tarinfo.size:
+                # Файл изменился после чтения, как и tarfile.addfile.
+                raise OSError('unexpected end of data')
+            archive.addfile(tarinfo, io.BytesIO(content))
+        elif tarinfo.isreg():
+            with open(file, 'rb') as fileobj:
+                archive.addfile(tarinfo, fileobj)
+        else:
+            archive.addfile(tarinfo)
+
+    def close_file(self, archive):
+        archive.close()
+        if isinstance(archive.fileobj, ParallelGzipWriter):
+            # tarfile не закрывает переданный ему fileobj.
+            archive.fileobj.close()
 
 
 @use_exclusions
@@ -498,13 +1190,405 @@ class ArchiverZip(Archiver):
             self.compression_lib = 'zip'
         self.open_mode = self.compression_types[self.compression_lib][0]
         self.extension = self.compression_types[self.compression_lib][1]
+        if self.prefetch_workers:
+            self.logger.warning('Упреждающее чтение не поддерживается zip')
+            self.prefetch_workers = 0
 
-    def open_file(self, archive_filepath):
+    def open_file(self, archive_filepath, fileobj=None):
+        # Через fileobj без seek zip пишется с дескрипторами данных.
         return zipfile.ZipFile(
-            archive_filepath,
+            fileobj or archive_filepath,
             mode='w',
             compression=self.open_mode,
         )
 
-    def append(self, archive, file):
-        archive.write(file)
+    def append(self, archive, file, arcname=None, entry=None, content=None):
+        archive.write(file, arcname)
+
+
+@use_exclusions
+class ArchiverDedup(Archiver):
+    """Класс действия для создания снимков с дедупликацией.
+
+    Данные файлов режутся на блоки и хранятся один раз в каталоге
+    store_dirname внутри dest_path, архивом является снимок - список
+    файлов со ссылками на блоки. Каждый снимок полный и восстанавливается
+    без предыдущих, уровни влияют только на имена файлов.
+
+    Attributes:
+        Внешние:
+            compression: Целое число, уровень сжатия блоков zlib,
+                0 - без сжатия.
+            compression_workers: Целое число, количество потоков
+                сжатия и записи блоков, 0 - по числу ядер.
+            chunk_size: Целое число, средний размер блока в Кб,
+                округляется до степени двойки.
+            store_dirname: Строка, имя каталога хранилища блоков.
+
+    """
+
+    SUPPORTS_SHARDS = False
+    # Снимок всегда полный, неизменные файлы не читаются
+    # благодаря списку блоков предыдущего снимка.
+    SKIP_UNCHANGED = False
+
+    def __init__(self, name):
+        super().__init__(name)
+        self.extension = 'snap'
+        self.compression_workers = 1
+        self.chunk_size = 1024  # Кб
+        self.store_dirname = 'pack'
+
+    def configure_archiver(self):
+        super().configure_archiver()
+        try:
+            self.compression_workers = int(self.compression_workers)
+            self.chunk_size = max(int(self.chunk_size), 4)
+        except (TypeError, ValueError):
+            self.logger.error(
+                'Неверные параметры compression_workers/chunk_size',
+            )
+            return True
+        if self.compression_workers <= 0:
+            self.compression_workers = os.cpu_count() or 1
+        return False
+
+    def get_store_path(self):
+        """Возвращает путь к хранилищу блоков."""
+        return os.path.join(self.dest_path, self.store_dirname)
+
+    def find_required_backup_times(self, level):
+        # Снимки не зависят друг от друга, их можно удалять в любом порядке.
+        return set()
+
+    def open_file(self, archive_filepath, fileobj=None):
+        # Хранилище блоков нужно только этому действию.
+        from .utils.chunk_store import (
+            Chunker, ChunkStore, ChunkStoreError, SnapshotWriter,
+            load_snapshot_files,
+        )
+
+        previous = {}
+        previous_archive = self.find_previous_archive(archive_filepath)
+        if previous_archive is not None:
+            previous_filepath = previous_archive[0]
+            try:
+                previous = load_snapshot_files(previous_filepath)
+            except (OSError, ChunkStoreError) as exc:
+                self.logger.warning(
+                    'Предыдущий снимок %s не будет использован: %s',
+                    previous_filepath,
+                    exc,
+                )
+            else:
+                self.logger.debug(
+                    'Предыдущий снимок: %s, файлов: %s',
+                    previous_filepath,
+                    len(previous),
+                )
+
+        store = ChunkStore(
+            self.get_store_path(),
+            compresslevel=self.compression,
+            workers=self.compression_workers,
+        )
+        os.makedirs(store.path, exist_ok=True)
+        store.lock()
+        output = None
+        try:
+            output = fileobj or open(archive_filepath, 'wb')
+            return SnapshotWriter(
+                output,
+                store,
+                Chunker(self.chunk_size * 1024),
+                os.path.dirname(archive_filepath),
+                previous=previous,
+                close_fileobj=fileobj is None,
+            )
+        except Exception:
+            if fileobj is None and output is not None:
+                output.close()
+            store.close()
+            raise
+
+    def append(self, archive, file, arcname=None, entry=None, content=None):
+        if archive.add(
+            file,
+            arcname,
+            entry.stat if entry is not None else None,
+            content,
+        ) is False:
+            self.logger.debug('Неподдерживаемый тип файла: %s', file)
+
+    def close_file(self, archive):
+        try:
+            archive.close()
+            # Каталог регистрируется до снятия блокировки, иначе сборка
+            # мусора между ними удалит блоки нового снимка.
+            archive.store.register_root(archive.dirpath)
+        finally:
+            archive.store.close()
+
+        stats = archive.stats
+        store_stats = archive.store.stats
+        self.logger.info(
+            'Снимок: файлов %s, данных %s байт, из предыдущего снимка '
+            '%s байт, повторных блоков %s байт, новых блоков %s '
+            '(%s байт, записано %s байт)',
+            stats['files'],
+            stats['bytes'],
+            stats['reused_bytes'],
+            store_stats['duplicate_bytes'],
+            store_stats['new_chunks'],
+            store_stats['new_bytes'],
+            store_stats['stored_bytes'],
+        )
+
+
+@use_exclusions
+class ArchiverSnapshot(Archiver):
+    """Класс действия для создания снимков-каталогов (как rsnapshot).
+
+    Снимок - копия дерева src_path, которую можно просматривать без
+    распаковки. Файлы, время изменения и размер которых совпадают
+    с предыдущим снимком (по его list файлу или индексу), не копируются,
+    а связываются с файлом предыдущего снимка (reflink или жёсткая
+    ссылка), поэтому снимок занимает место только изменённых файлов.
+    Каждый снимок полный, уровни влияют только на имена и каталоги.
+
+    Attributes:
+        Внешние:
+            link_mode: Строка, способ связывания неизменных файлов:
+                auto (reflink, если поддерживается, иначе жёсткая
+                ссылка), reflink, hardlink или copy.
+        Внутренние:
+            previous_archive: Строка, путь к предыдущему снимку или None.
+
+    """
+
+    STREAM_CHECKSUM = False  # хэшсумма каталога считается после записи
+    SUPPORTS_SHARDS = False
+    # Все файлы проходят через append: неизменные связываются
+    # с предыдущим снимком, остальные копируются.
+    SKIP_UNCHANGED = False
+
+    def __init__(self, name):
+        super().__init__(name)
+        self.extension = 'tree'
+        self.link_mode = 'auto'
+        self.previous_archive = None
+
+    def configure_archiver(self):
+        super().configure_archiver()
+        if self.link_mode not in LINK_MODES:
+            self.logger.error(
+                'Неверное значение link_mode: %s, допустимые: %s',
+                self.link_mode,
+                ', '.join(LINK_MODES),
+            )
+            return True
+        if self.prefetch_workers:
+            # Неизменные файлы не читаются, упреждающее чтение
+            # прочитало бы их зря.
+            self.logger.warning('Упреждающее чтение не поддерживается')
+            self.prefetch_workers = 0
+        return False
+
+    def adjust_backup_level(self):
+        """Находит предыдущий снимок и загружает его список файлов."""
+        previous = self.find_previous_archive()
+        if previous is None:
+            self.logger.info('Предыдущий снимок не найден, файлы копируются')
+            return
+        self.previous_archive, list_filepath = previous
+        if not os.path.isdir(self.previous_archive):
+            self.previous_archive = None
+            return
+        self.logger.debug('Предыдущий снимок: %s', self.previous_archive)
+        with open(list_filepath) as lines:
+            lines.readline()
+            self.load_inc_list(list_filepath, lines)
+
+    def find_required_backup_times(self, level):
+        # Связанные файлы остаются при удалении любого снимка.
+        return set()
+
+    def open_file(self, archive_filepath, fileobj=None):
+        os.makedirs(archive_filepath, exist_ok=True)
+        return _SnapshotTree(
+            archive_filepath,
+            self.previous_archive,
+            FileLinker(self.link_mode),
+        )
+
+    def append(self, archive, file, arcname=None, entry=None, content=None):
+        statres = entry.stat if entry is not None else os.lstat(file)
+        dest = archive.get_path(arcname)
+        if stat.S_ISDIR(statres.st_mode):
+            os.makedirs(dest, exist_ok=True)
+            archive.directories.append((dest, statres))
+            return
+        if os.path.lexists(dest):
+            os.remove(dest)
+        else:
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+
+        if stat.S_ISLNK(statres.st_mode):
+            os.symlink(os.readlink(file), dest)
+            if archive.is_root:
+                os.lchown(dest, statres.st_uid, statres.st_gid)
+        elif not stat.S_ISREG(statres.st_mode):
+            self.logger.debug('Неподдерживаемый тип файла: %s', file)
+        elif content is None and entry is not None \
+                and archive.previous_path is not None \
+                and self._matches_previous(arcname, entry) \
+                and self._link_previous(archive, arcname, dest, statres):
+            return
+        else:
+            if content is not None:
+                with open(dest, 'wb') as dest_file:
+                    dest_file.write(content)
+            else:
+                shutil.copyfile(file, dest, follow_symlinks=False)
+            archive.copied += 1
+            _copy_attributes(dest, statres, archive.is_root)
+
+    def close_file(self, archive):
+        for dest, statres in reversed(archive.directories):
+            _copy_attributes(dest, statres, archive.is_root)
+        self.logger.info(
+            'Снимок: скопировано файлов %s, reflink %s, жёстких ссылок %s',
+            archive.copied,
+            archive.linker.stats['reflink'],
+            archive.linker.stats['hardlink'],
+        )
+
+    def _link_previous(self, archive, arcname, dest, statres):
+        """Связывает файл с предыдущим снимком.
+
+        Returns:
+            True, если файл связан и копировать его не нужно.
+
+        """
+        previous = archive.get_previous_path(arcname)
+        try:
+            previous_stat = os.lstat(previous)
+        except FileNotFoundError:
+            return False
+        if not stat.S_ISREG(previous_stat.st_mode) \
+                or previous_stat.st_size != statres.st_size:
+            return False
+        # Жёсткая ссылка разделяет атрибуты с предыдущим снимком.
+        shared = _get_attributes(previous_stat) == _get_attributes(statres)
+        method = archive.linker.link(previous, dest, shared)
+        if method == 'reflink':
+            _copy_attributes(dest, statres, archive.is_root)
+        return method is not None
+
+
+class _SnapshotTree:
+    """Открытый на запись снимок-каталог ArchiverSnapshot."""
+
+    def __init__(self, path, previous_path, linker):
+        self.path = path
+        self.previous_path = previous_path
+        self.linker = linker
+        self.directories = []
+        self.copied = 0
+        self.is_root = os.geteuid() == 0
+
+    def get_path(self, arcname):
+        return os.path.join(self.path, arcname.lstrip(os.sep))
+
+    def get_previous_path(self, arcname):
+        return os.path.join(self.previous_path, arcname.lstrip(os.sep))
+
+
+def _get_attributes(statres):
+    return (
+        statres.st_mode,
+        statres.st_uid,
+        statres.st_gid,
+        statres.st_mtime_ns,
+    )
+
+
+def _copy_attributes(path, statres, is_root):
+    """Устанавливает владельца, права и время изменения из statres."""
+    if is_root:
+        os.chown(path, statres.st_uid, statres.st_gid)
+    os.chmod(path, stat.S_IMODE(statres.st_mode))
+    os.utime(path, ns=(statres.st_atime_ns, statres.st_mtime_ns))
+
+
+@functools.lru_cache(maxsize=None)
+def _get_username(uid):
+    try:
+        return pwd.getpwuid(uid)[0]
+    except KeyError:
+        return ''
+
+
+@functools.lru_cache(maxsize=None)
+def _get_groupname(gid):
+    try:
+        return grp.getgrgid(gid)[0]
+    except KeyError:
+        return ''
+
+
+def _tarinfo_from_stat(archive, name, arcname, statres):
+    """Формирует TarInfo по готовому результату lstat.
+
+    Повторяет TarFile.gettarinfo, но не делает stat повторно и
+    кэширует имена пользователей и групп.
+
+    Returns:
+        TarInfo или None, если тип файла не поддерживается tar.
+
+    """
+    arcname = (arcname or name).replace(os.sep, '/').lstrip('/')
+    tarinfo = archive.tarinfo()
+    tarinfo.tarfile = archive
+
+    linkname = ''
+    stmd = statres.st_mode
+    if stat.S_ISREG(stmd):
+        inode = (statres.st_ino, statres.st_dev)
+        if statres.st_nlink > 1 and inode in archive.inodes \
+                and arcname != archive.inodes[inode]:
+            # Жёсткая ссылка на уже добавленный файл.
+            ftype = tarfile.LNKTYPE
+            linkname = archive.inodes[inode]
+        else:
+            ftype = tarfile.REGTYPE
+            if inode[0]:
+                archive.inodes[inode] = arcname
+    elif stat.S_ISDIR(stmd):
+        ftype = tarfile.DIRTYPE
+    elif stat.S_ISFIFO(stmd):
+        ftype = tarfile.FIFOTYPE
+    elif stat.S_ISLNK(stmd):
+        ftype = tarfile.SYMTYPE
+        linkname = os.readlink(name)
+    elif stat.S_ISCHR(stmd):
+        ftype = tarfile.CHRTYPE
+    elif stat.S_ISBLK(stmd):
+        ftype = tarfile.BLKTYPE
+    else:
+        return None
+
+    tarinfo.name = arcname
+    tarinfo.mode = stmd
+    tarinfo.uid = statres.st_uid
+    tarinfo.gid = statres.st_gid
+    tarinfo.size = statres.st_size if ftype == tarfile.REGTYPE else 0
+    tarinfo.mtime = statres.st_mtime
+    tarinfo.type = ftype
+    tarinfo.linkname = linkname
+    tarinfo.uname = _get_username(statres.st_uid)
+    tarinfo.gname = _get_groupname(statres.st_gid)
+    if ftype in (tarfile.CHRTYPE, tarfile.BLKTYPE):
+        tarinfo.devmajor = os.major(statres.st_rdev)
+        tarinfo.devminor = os.minor(statres.st_rdev)
+    return tarinfo
@@ -91,11 +91,14 @@ class Cleaner(Action, WalkAppierMixin):
                     filepath,
                     exc,
                 )
-        else:
+        elif os.path.isdir(filepath):
+            # Бэкап в виде директории (например, pg_dump --format=directory).
             shutil.rmtree(
                 filepath,
                 ignore_errors=False,
                 onerror=onerror,
             )
+        else:
+            self.logger.info('Файл уже удалён %s', filepath)
 
         return error_occured
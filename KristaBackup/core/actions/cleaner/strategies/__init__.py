@@ -1,10 +1,11 @@
-from ...archiver import Archiver
+from ...archiver import Archiver, ArchiverDedup
 from ...movebkpperiod import MoveBkpPeriod
 from ...pgdump import PgDump
 
 
 def match_strategy(action):
     from .archiver_strategy import ArchiverStrategy
+    from .dedup_strategy import DedupStrategy
     from .move_bkp_perod_strategy import MoveBkpPeriodStrategy
     from .pgdump_strategy import PgDumpStrategy
 
@@ -14,6 +15,9 @@ def match_strategy(action):
     if isinstance(action, MoveBkpPeriod):
         return MoveBkpPeriodStrategy
 
+    if isinstance(action, ArchiverDedup):
+        return DedupStrategy
+
     if isinstance(action, Archiver):
         return ArchiverStrategy
 
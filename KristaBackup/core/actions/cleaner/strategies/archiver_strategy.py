@@ -1,3 +1,5 @@
+import os
+
 from .base_strategy import BaseStrategy
 
 
@@ -11,6 +13,7 @@ class ArchiverStrategy(BaseStrategy):
             cleaner=cleaner,
             path=kwargs.get('path', action.generate_dirname()),
             patterns=patterns,
+            apply_dirs=True,
         )
 
         files = cls.filter_files(
@@ -20,5 +23,41 @@ class ArchiverStrategy(BaseStrategy):
             max_files=max_files,
             days=days,
         )
+        if 'path' not in kwargs:
+            # В каталогах периодов лежат копии, цепочек там нет.
+            files = cls.exclude_chain_bases(cleaner, action, files)
         cls.remove_files(cleaner, files)
         return True
+
+    @staticmethod
+    def exclude_chain_bases(cleaner, action, files):
+        """Исключает из удаления бэкапы, нужные более высоким уровням.
+
+        Бэкап уровня N нельзя удалять, пока существует бэкап
+        более высокого уровня, который строился от него (напрямую
+        или через промежуточные уровни), иначе набор для
+        восстановления будет неполным.
+
+        """
+        if not files:
+            return files
+        required = action.find_required_backup_times(action.level)
+        if not required:
+            return files
+
+        pattern = action.scheme.get_fsdump_pattern(action)
+        result = []
+        for filepath in files:
+            backup_time = action.scheme.retrieve_time_from_name(
+                os.path.basename(filepath),
+                pattern,
+            )
+            if backup_time in required:
+                cleaner.logger.info(
+                    'Файл %s не удалён: от него зависят бэкапы '
+                    'более высоких уровней',
+                    filepath,
+                )
+            else:
+                result.append(filepath)
+        return result
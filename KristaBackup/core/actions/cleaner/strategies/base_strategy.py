@@ -3,6 +3,8 @@ import functools
 import os
 import re
 
+from ...utils import ExclusionMatcher
+
 
 class BaseStrategy:
 
@@ -40,13 +42,26 @@ class BaseStrategy:
             )
 
     @classmethod
-    def collect_files(cls, cleaner, path, patterns, exclusions=None):
-        """Возвращает словарь с файлами из директории path."""
+    def collect_files(
+        cls,
+        cleaner,
+        path,
+        patterns,
+        exclusions=None,
+        apply_dirs=False,
+    ):
+        """Возвращает словарь с файлами из директории path.
+
+        Args:
+            apply_dirs: Логическое значение, учитывать и поддиректории
+                path, если бэкапы бывают директориями.
+
+        """
         if not patterns:
             cleaner.logger.warning('Не заданы паттерны')
             return None
 
-        exclusions = exclusions or []
+        exclusions = exclusions or ExclusionMatcher()
         path = path or cleaner.source.generate_dirname()
         files = {}
 
@@ -63,7 +78,12 @@ class BaseStrategy:
             base_path=path,
         )
         try:
-            cleaner.walk_apply(path, apply, recursive=False, apply_dirs=False)
+            cleaner.walk_apply(
+                path,
+                apply,
+                recursive=False,
+                top_dirs=apply_dirs,
+            )
         except AttributeError:
             cleaner.logger.info('Указаный путь не существует')
         cleaner.logger.debug('Список файлов %s', files)
@@ -143,7 +163,12 @@ class BaseStrategy:
 
     @classmethod
     def _filter_file(cls, filepath, patterns, exclusions):
-        """Проверяет попадание файл в паттерны и отсутствие в исключениях."""
+        """Проверяет попадание файл в паттерны и отсутствие в исключениях.
+
+        Args:
+            exclusions: ExclusionMatcher, исключения.
+
+        """
         full_filename = os.path.basename(filepath)
         _, file_extension = os.path.splitext(full_filename)
         file_extension = file_extension or ' '
@@ -152,9 +177,8 @@ class BaseStrategy:
             match = re.match(pattern, full_filename)
             if not match:
                 continue
-            for exclusion_pattern in exclusions:
-                if re.match(exclusion_pattern, full_filename):
-                    return False
+            if exclusions.match(full_filename):
+                return False
             if 'ext' in match.groupdict():
                 file_extension = match.group('ext')
 
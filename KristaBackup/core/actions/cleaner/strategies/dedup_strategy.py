@@ -0,0 +1,26 @@
+from .archiver_strategy import ArchiverStrategy
+
+
+class DedupStrategy(ArchiverStrategy):
+
+    @classmethod
+    def clean(cls, cleaner, action, max_files=None, days=None, **kwargs):
+        """Удаляет снимки, затем блоки без ссылок из хранилища."""
+        from ...utils.chunk_store import ChunkStore, collect_garbage
+
+        super().clean(cleaner, action, max_files, days, **kwargs)
+
+        store = ChunkStore(action.get_store_path())
+        result = collect_garbage(
+            store,
+            '.{0}'.format(action.extension),
+            cleaner.logger,
+            dry=cleaner.dry,
+        )
+        if result is not None:
+            cleaner.logger.info(
+                'Хранилище %s: удалено блоков %s, освобождено %s байт',
+                store.path,
+                *result
+            )
+        return True
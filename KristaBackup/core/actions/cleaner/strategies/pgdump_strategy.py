@@ -1,3 +1,4 @@
+from ...utils import ExclusionMatcher
 from .base_strategy import BaseStrategy
 
 
@@ -13,6 +14,7 @@ class PgDumpStrategy(BaseStrategy):
             path=kwargs.get('path', action.generate_dirname()),
             patterns=patterns,
             exclusions=exclusions,
+            apply_dirs=True,
         )
         files = cls.filter_files(
             cleaner=cleaner,
@@ -45,4 +47,4 @@ class PgDumpStrategy(BaseStrategy):
             'Добавлены группы исключений: %s',
             [exc.pattern for exc in result_exclusions],
         )
-        return result_exclusions
+        return ExclusionMatcher(result_exclusions)
@@ -4,6 +4,8 @@
 
 import functools
 
+from ..utils import ExclusionMatcher
+
 
 def side_effecting(method):
     """Декоратор для методов, изменяющих состояние системы.
@@ -31,6 +33,7 @@ def use_exclusions(cls):
     def wrapper(self, *args, **kwargs):
         self.exclusions = []
         self.prepared_exclusions = []
+        self.exclusion_matcher = ExclusionMatcher()
         return method(self, *args, **kwargs)
     cls.__init__ = wrapper
     return cls
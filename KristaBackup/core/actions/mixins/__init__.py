@@ -1 +1 @@
-from .walk_applier_mixin import WalkAppierMixin
+from .walk_applier_mixin import SKIP, FileEntry, WalkAppierMixin
@@ -1,19 +1,52 @@
+import collections
 import os
+import stat
+
+FileEntry = collections.namedtuple(
+    'FileEntry',
+    ('path', 'mtime', 'size', 'mode', 'inode', 'stat'),
+)
+"""Запись о файле/директории, которую получает apply в scan_apply.
+
+Attributes:
+    path: Строка, путь относительно исходной директории.
+    mtime: Число, время изменения (как os.path.getmtime).
+    size: Число, размер в байтах.
+    mode: Число, st_mode.
+    inode: Число, номер inode.
+    stat: os.stat_result, полный результат lstat.
+
+"""
+
+SKIP = object()
+"""Значение, которое apply возвращает для директории, чтобы не обходить её."""
 
 
 class WalkAppierMixin:
 
-    def walk_apply(self, src, apply, recursive=True, apply_dirs=False):
+    SKIP = SKIP
+
+    def walk_apply(
+        self,
+        src,
+        apply,
+        recursive=True,
+        apply_dirs=False,
+        top_dirs=False,
+    ):
         """Метод проходит по файлам и применяет к ним apply.
 
-        На время выполнения меняет текущую директорию на src. По умолчанию
-        проход рекурсивный.
+        В apply передаются пути относительно src. По умолчанию
+        проход рекурсивный. Если для директории apply вернул SKIP,
+        её содержимое не обходится.
 
         Args:
             src: Строка, исходная директория.
             apply: Функция, принимает файл/строку.
             recursive: Логическое значение, задаёт рекурсивный обход.
             apply_dirs: Логическое значение, обработка и директории.
+            top_dirs: Логическое значение, при нерекурсивном проходе
+                обрабатывать и поддиректории src.
 
         """
         if not os.path.isdir(src):
@@ -21,19 +54,148 @@ class WalkAppierMixin:
                 'директория src не существует: {0}'.format(src),
             )
 
-        current_dir = os.getcwd()
-        os.chdir(src)
-
         walker = (
-            (dirpath[2:], filenames)
-            for dirpath, _, filenames in os.walk('.')
+            (_relpath(dirpath, src), dirnames, filenames)
+            for dirpath, dirnames, filenames in os.walk(src)
         )
         if not recursive:
             walker = [next(walker)]
-        for (dirpath, filenames) in walker:
-            if apply_dirs and dirpath.strip():
-                apply(dirpath)
+            if top_dirs:
+                for dirname in walker[0][1]:
+                    apply(dirname)
+        for (dirpath, dirnames, filenames) in walker:
+            if apply_dirs and dirpath and apply(dirpath) is SKIP:
+                # os.walk не спускается в удалённые из dirnames директории.
+                dirnames.clear()
+                continue
             for filename in filenames:
                 filepath = os.path.join(dirpath, filename)
                 apply(filepath)
-        os.chdir(current_dir)
+
+    def scan_apply(
+        self,
+        src,
+        apply,
+        recursive=True,
+        apply_dirs=False,
+        top_dirs=False,
+    ):
+        """Проходит по файлам через os.scandir и применяет к ним apply.
+
+        Если os.scandir нет (python до 3.5), то записи директории
+        получаются через os.listdir и os.lstat.
+
+        В отличие от walk_apply, в apply передаётся FileEntry, для
+        получения которого делается ровно один lstat на запись.
+        Текущая директория процесса не меняется, пути в FileEntry
+        относительны src. Порядок обхода совпадает с walk_apply:
+        директория, её файлы, затем поддиректории. Если для директории
+        apply вернул SKIP, она не читается.
+
+        Args:
+            src: Строка, исходная директория.
+            apply: Функция, принимает FileEntry.
+            recursive: Логическое значение, задаёт рекурсивный обход.
+            apply_dirs: Логическое значение, обработка и директории.
+            top_dirs: Логическое значение, при нерекурсивном проходе
+                обрабатывать и поддиректории src.
+
+        """
+        if not os.path.isdir(src):
+            raise AttributeError(
+                'директория src не существует: {0}'.format(src),
+            )
+
+        stack = [('', None)]
+        while stack:
+            dirpath, dir_entry = stack.pop()
+            if apply_dirs and dir_entry is not None:
+                entry = _make_entry(dirpath, dir_entry)
+                if entry is not None and apply(entry) is SKIP:
+                    continue
+
+            subdirs = []
+            try:
+                scanner = _scandir(os.path.join(src, dirpath))
+            except OSError:
+                # Как и os.walk, пропускаем недоступные директории.
+                continue
+            try:
+                for dir_entry in scanner:
+                    path = os.path.join(dirpath, dir_entry.name)
+                    try:
+                        is_dir = dir_entry.is_dir()
+                    except OSError:
+                        is_dir = False
+                    if is_dir and not recursive:
+                        if top_dirs:
+                            entry = _make_entry(path, dir_entry)
+                            if entry is not None:
+                                apply(entry)
+                        continue
+                    if is_dir:
+                        # Ссылки на директории os.walk не обходит.
+                        if not dir_entry.is_symlink():
+                            subdirs.append((path, dir_entry))
+                        continue
+                    entry = _make_entry(path, dir_entry)
+                    if entry is not None:
+                        apply(entry)
+            finally:
+                # Итератор os.scandir как контекстный менеджер - с 3.6.
+                close = getattr(scanner, 'close', None)
+                if close is not None:
+                    close()
+            stack.extend(reversed(subdirs))
+
+
+class _LstatEntry:
+    """Замена os.DirEntry на os.lstat для python без os.scandir."""
+
+    def __init__(self, dirpath, name):
+        self.name = name
+        self.path = os.path.join(dirpath, name)
+        self._lstat = None
+
+    def stat(self, follow_symlinks=True):
+        if follow_symlinks:
+            return os.stat(self.path)
+        if self._lstat is None:
+            self._lstat = os.lstat(self.path)
+        return self._lstat
+
+    def is_symlink(self):
+        return stat.S_ISLNK(self.stat(follow_symlinks=False).st_mode)
+
+    def is_dir(self):
+        if self.is_symlink():
+            return os.path.isdir(self.path)
+        return stat.S_ISDIR(self.stat(follow_symlinks=False).st_mode)
+
+
+def _scandir(dirpath):
+    if hasattr(os, 'scandir'):
+        return os.scandir(dirpath)
+    return [_LstatEntry(dirpath, name) for name in os.listdir(dirpath)]
+
+
+def _make_entry(path, dir_entry):
+    try:
+        statres = dir_entry.stat(follow_symlinks=False)
+    except OSError:
+        return None
+    return FileEntry(
+        path,
+        statres.st_mtime,
+        statres.st_size,
+        statres.st_mode,
+        statres.st_ino,
+        statres,
+    )
+
+
+def _relpath(dirpath, src):
+    relpath = os.path.relpath(dirpath, src)
+    if relpath == os.curdir:
+        return ''
+    return relpath
@@ -9,8 +9,10 @@ from lib.crontex import CronExpression
 from common.YamlConfig import AppConfig
 
 from .action import Action
+from .archiver import ArchiverDedup
 from .decorators import side_effecting
 from .mixins import WalkAppierMixin
+from .utils import FileLinker
 
 
 class MoveBkpPeriod(Action, WalkAppierMixin):
@@ -28,11 +30,15 @@ class MoveBkpPeriod(Action, WalkAppierMixin):
 
         files_to_move (list): Содержит список файлов для копирования.
 
+        snapshot_files (set): Снимки ArchiverDedup из files_to_move,
+            копии которых регистрируются в хранилище блоков.
+
     """
 
     def __init__(self, name):
         super().__init__(name)
         self.files_to_move = []
+        self.snapshot_files = set()
         self.action_list = []
         self.periods = {}
 
@@ -118,6 +124,12 @@ class MoveBkpPeriod(Action, WalkAppierMixin):
                     ]
 
             self.files_to_move.extend(newest_files)
+            if isinstance(action, ArchiverDedup):
+                snapshot_suffix = '.{0}'.format(action.extension)
+                self.snapshot_files.update(
+                    filepath for filepath in newest_files
+                    if filepath.endswith(snapshot_suffix)
+                )
 
         self.logger.info(
             'Найденные файлы для перемещения: %s', self.files_to_move,
@@ -185,7 +197,25 @@ class MoveBkpPeriod(Action, WalkAppierMixin):
 
     @side_effecting
     def _move_backup(self, moving_file, files_dest_path):
-        shutil.copy2(moving_file, files_dest_path)
+        if os.path.isdir(moving_file):
+            # Файлы бэкапов не изменяются, поэтому копия каталога
+            # (снимок, дамп формата directory) связывается с исходным.
+            shutil.copytree(
+                moving_file,
+                os.path.join(files_dest_path, os.path.basename(moving_file)),
+                symlinks=True,
+                copy_function=functools.partial(
+                    _link_or_copy,
+                    linker=FileLinker(),
+                ),
+            )
+        else:
+            shutil.copy2(moving_file, files_dest_path)
+            if moving_file in self.snapshot_files:
+                from .utils.chunk_store import register_snapshot_root
+
+                # Блоки копии снимка не должны удаляться при очистке.
+                register_snapshot_root(moving_file, files_dest_path)
 
     def _fill_files_by_action(self, action):
         path = action.generate_dirname()
@@ -198,13 +228,20 @@ class MoveBkpPeriod(Action, WalkAppierMixin):
             path=path,
         )
         try:
-            self.walk_apply(path, apply, recursive=False, apply_dirs=True)
+            # Бэкапы бывают директориями (снимки, выгрузки формата
+            # directory), поэтому учитываются и поддиректории.
+            self.walk_apply(path, apply, recursive=False, top_dirs=True)
         except AttributeError:
             self.logger.info('Указаный путь не существует')
 
         return files
 
 
+def _link_or_copy(src, dst, linker):
+    if not linker.link(src, dst):
+        shutil.copy2(src, dst)
+
+
 def _match_and_add(filename, path, patterns, files):
     _, file_extension = os.path.splitext(filename)
     file_extension = file_extension or ' '
@@ -1,13 +1,21 @@
 # -*- coding: UTF-8 -*-
 
+import json
 import logging
 import os
 import re
 import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 from .action import Action
-from .decorators import use_exclusions
+from .decorators import side_effecting, use_exclusions
 from .interfaces import NameGenerationInterface
+from .utils import (
+    DatabaseCatalog, ExclusionMatcher, HashingWriter,
+    get_stream_compressors, open_compressor,
+)
 
 
 @use_exclusions
@@ -49,35 +57,50 @@ class PgDump(Action, NameGenerationInterface):
         self.password = None
         self.databases = []
         self.mode = 'single'
-
-    def backup_database(self, database):
+        self.parallel_databases = 1  # количество одновременных pg_dump
+        self.jobs = 1  # --jobs для формата directory, 0 - по бюджету
+        self.max_workers = 0  # общий бюджет процессов pg_dump, 0 - без ограничения
+        self._dump_jobs = 1
+        self.compression_lib = None  # сжатие stdout pg_dump: gzip, bzip, lzma, zstd
+        self.compression = 5
+        self.compression_workers = 1
+        self.progress_interval = 60  # секунд между записями о скорости выгрузки
+        self._compression_suffix = None
+        self.catalog_path = os.path.join('cache', 'pgdump_catalog.json')
+        self.catalog_ttl = 60 * 60  # секунд, 0 - кэш на диске не используется
+        self.skip_unchanged = False  # не выгружать базы без изменений
+        self._markers = {}
+        self._dump_state = {}
+        self._state_lock = threading.Lock()
+
+    def backup_database(self, database, logger=None):
         """Выполняет бэкап базы.
 
         Args:
             database: Строка, имя базы.
+            logger: Логгер или None, по умолчанию логгер действия.
 
         Returns:
             True, если возникли ошибки.
 
         """
-        filepath = self.generate_filepath(
-            dbname=database,
-        )
+        logger = logger or self.logger
+        filepath = self.get_dump_filepath(database)
 
         if not os.path.exists(self.dest_path):
-            self.logger.debug(
+            logger.debug(
                 'Выходная директория %s не существует.',
                 self.dest_path,
             )
             if not self.dry:
-                os.makedirs(self.dest_path)
-            self.logger.debug('Директория создана.')
+                os.makedirs(self.dest_path, exist_ok=True)
+            logger.debug('Директория создана.')
 
         if self.format == 'directory':
             if not self.dry:
                 os.makedirs(filepath)
                 shutil.chown(filepath, user=self.user)
-            self.logger.debug('Директория %s создана.', filepath)
+            logger.debug('Директория %s создана.', filepath)
 
         cmdline = ' '.join(
             [
@@ -92,73 +115,165 @@ class PgDump(Action, NameGenerationInterface):
                 '='.join(['--format', self.format]),
                 '='.join(['--file', filepath]
                          ) if self.format == 'directory' else '',
+                '='.join(['--jobs', str(self._dump_jobs)]
+                         ) if self._dump_jobs > 1 else '',
             ],
         )
 
         if not self.user:
             # запуск команды под пользователем postgres, если user не указан
             cmdline = 'su postgres -c \'{0}\''.format(cmdline)
-        if self.format == 'custom':
-            cmdline += '> {0}'.format(filepath)
+
+        dump_file = None
+        compressor = None
+        output = None
+        progress = None
+        if self.format != 'directory' and not self.dry:
+            # stdout сжимается и пишется в файл за один проход,
+            # хэшсумма считается от сжатых данных при записи,
+            # без повторного чтения дампа.
+            dump_file = open(filepath, 'wb')
+            if self.checksum_file:
+                dump_file = self.open_hashing_writer(dump_file)
+            output = dump_file
+            if self.compression_lib:
+                compressor = open_compressor(
+                    dump_file,
+                    self.compression_lib,
+                    self.compression,
+                    self.compression_workers,
+                )
+                output = compressor
+            progress = _Progress(logger, self.progress_interval)
 
         stdout_params = {
-            'logger': self.logger,
+            'logger': logger,
             'remove_header': True,
             'default_level': logging.DEBUG,
         }
 
         stderr_params = {
-            'logger': self.logger,
+            'logger': logger,
             'filters': self.stderr_filters,
             'remove_header': True,
             'default_level': logging.ERROR,
         }
 
-        self.logger.debug('Выполнение команды %s', cmdline)
+        logger.debug('Выполнение команды %s', cmdline)
+        error = None
         try:
             self.execute_cmdline(
                 cmdline,
                 stdout_params=stdout_params,
                 stderr_params=stderr_params,
+                stdout_file=output,
+                progress=progress,
+                check=True,
             )
         except Exception as exc:
-            self.logger.error('Ошибка при выполнении: %s', exc)
+            error = exc
+        finally:
+            # Сжатие закрывается и при ошибке, иначе остаются
+            # его потоки, а файл выгрузки закрывается последним.
+            try:
+                if compressor is not None:
+                    compressor.close()
+            except Exception as exc:
+                error = error or exc
+            finally:
+                if dump_file is not None:
+                    dump_file.close()
+        if error is not None:
+            logger.error('Ошибка при выполнении: %s', error)
+            self.remove_partial_dump(filepath, logger)
             return True
-        self.logger.info('Заархивирована база %s', database)
+        if progress is not None:
+            progress.log_total(os.path.getsize(filepath))
+        logger.info('Заархивирована база %s', database)
 
+        hash_value = None
         if self.checksum_file:
             hash_filepath = self.generate_hash_filepath(dbname=database)
-            self.create_checksum_file(filepath, hash_filepath)
+            if isinstance(dump_file, HashingWriter):
+                hash_value = dump_file.hexdigest()
+            self.create_checksum_file(
+                filepath,
+                hash_filepath,
+                hash_value,
+                logger=logger,
+            )
+        if self.skip_unchanged and not self.dry:
+            self.remember_dump(database, filepath, hash_value)
+
+    @side_effecting
+    def remove_partial_dump(self, filepath, logger):
+        """Удаляет неполную выгрузку базы после ошибки."""
+        try:
+            if os.path.isdir(filepath) and not os.path.islink(filepath):
+                shutil.rmtree(filepath)
+            elif os.path.lexists(filepath):
+                os.remove(filepath)
+        except OSError as exc:
+            logger.warning(
+                'Невозможно удалить неполную выгрузку %s: %s',
+                filepath,
+                exc,
+            )
+
+    def get_dump_filepath(self, database):
+        """Возвращает путь к выгрузке базы с учётом расширения сжатия."""
+        filepath = self.generate_filepath(
+            dbname=database,
+        )
+        if self._compression_suffix:
+            filepath = '{0}.{1}'.format(filepath, self._compression_suffix)
+        return filepath
 
     def is_exclusion(self, dbname):
-        for ex in self.prepared_exclusions:
-            if re.match(ex, dbname):
-                return True
-        return False
+        return self.exclusion_matcher.match(dbname)
 
     @staticmethod
-    def get_database_list(user=None, host=None, port=None, *, logger=None):
-        """Подключается к postgresql и получает список баз.
+    def get_psql_cmdline(query, user=None, host=None, port=None, opts=''):
+        """Возвращает команду выполнения запроса через psql.
 
-        Требует наличия переменной PGPASSWORD в окружении.
+        Args:
+            query: Строка, sql запрос без двойных кавычек.
+            opts: Строка, дополнительные опции psql.
 
         """
-        cmdline = 'echo "select datname from pg_database" | {psql_cmdline}'
-        psql_cmdline = 'psql {0} --tuples-only --dbname postgres'.format(
+        psql_cmdline = 'psql {0} --tuples-only {1} --dbname postgres'.format(
             ' '.join(
                 [
                     ' '.join(['--user', user]) if user else '',
                     ' '.join(['--host', host]) if host and user else '',
                     ' '.join(['--port', str(port)]) if port else '',
                 ]
-            )
+            ),
+            opts,
         )
 
         if not user:
             # запуск команды под пользователем postgres, если user не указан
             psql_cmdline = 'su postgres -c "{0}"'.format(psql_cmdline)
 
-        cmdline = cmdline.format(psql_cmdline=psql_cmdline)
+        return 'echo "{query}" | {psql_cmdline}'.format(
+            query=query,
+            psql_cmdline=psql_cmdline,
+        )
+
+    @staticmethod
+    def get_database_list(user=None, host=None, port=None, *, logger=None):
+        """Подключается к postgresql и получает список баз.
+
+        Требует наличия переменной PGPASSWORD в окружении.
+
+        """
+        cmdline = PgDump.get_psql_cmdline(
+            'select datname from pg_database',
+            user,
+            host,
+            port,
+        )
         if logger:
             logger.debug('Запускается команда %s', cmdline)
 
@@ -169,44 +284,486 @@ class PgDump(Action, NameGenerationInterface):
 
         return [dbname.strip() for dbname in database_list if dbname.strip()]
 
-    def _get_database_list(self):
-        if self.user and self.password:
-            os.putenv('PGPASSWORD', self.password)
-        if self.mode == 'all':
-            database_list = PgDump.get_database_list(
+    @staticmethod
+    def get_database_catalog(user=None, host=None, port=None, *, logger=None):
+        """Получает имена, размеры и маркеры изменений баз одним запросом.
+
+        Для баз без права подключения размер считается нулевым.
+        Маркер изменений - сумма изменённых строк из pg_stat_database,
+        время сброса статистики и, на реплике, время последней
+        применённой транзакции (pg_stat_database на реплике
+        не учитывает применённые изменения).
+
+        Returns:
+            Список кортежей (имя базы, размер в байтах, маркер).
+
+        """
+        cmdline = PgDump.get_psql_cmdline(
+            'select d.datname, case when has_database_privilege('
+            'd.datname, \'CONNECT\') then pg_database_size(d.datname) '
+            'else 0 end, coalesce(s.tup_inserted + s.tup_updated '
+            '+ s.tup_deleted, 0) || \':\' || coalesce(extract(epoch '
+            'from s.stats_reset)::bigint, 0) || \':\' || coalesce('
+            'extract(epoch from pg_last_xact_replay_timestamp())::text, '
+            '\'\') from pg_database d '
+            'left join pg_stat_database s on s.datid = d.oid',
+            user,
+            host,
+            port,
+            opts='--no-align',
+        )
+        if logger:
+            logger.debug('Запускается команда %s', cmdline)
+
+        catalog = []
+        output = Action.unsafe_execute_cmdline(cmdline, return_stdout=True)
+        for line in output.splitlines():
+            try:
+                dbname, size, marker = line.strip().rsplit('|', 2)
+                catalog.append((dbname, int(size), marker))
+            except ValueError:
+                continue
+        return catalog
+
+    def get_catalog(self):
+        """Возвращает кэш каталога баз для подключения действия."""
+        def load():
+            if self.user and self.password:
+                os.putenv('PGPASSWORD', self.password)
+            return PgDump.get_database_catalog(
                 self.user,
                 self.host,
                 self.port,
                 logger=self.logger,
             )
+
+        try:
+            ttl = float(self.catalog_ttl)
+        except (TypeError, ValueError):
+            ttl = 0
+        return DatabaseCatalog(
+            self.catalog_path,
+            '{0}@{1}:{2}'.format(
+                self.user or 'postgres',
+                self.host or '',
+                self.port or '',
+            ),
+            load,
+            ttl=ttl,
+            readonly=self.dry,
+            logger=self.logger,
+        )
+
+    def _get_database_list(self, refresh=False):
+        """Возвращает список баз для бэкапа.
+
+        Args:
+            refresh: Логическое значение, в режиме all запросить
+                список у сервера, а не из кэша.
+
+        """
+        if self.mode == 'all':
+            database_list = self.get_catalog().get_databases(refresh)
         elif self.mode == 'single':
             database_list = [
                 dbname.strip() for dbname in self.databases if dbname.strip()
             ]
         return database_list
 
+    def configure_compression(self):
+        """Проверяет параметры сжатия выгрузки.
+
+        Если сжатие недоступно, то выгрузка пишется без сжатия.
+
+        """
+        self._compression_suffix = None
+        if not self.compression_lib:
+            return
+        compression_lib = str(self.compression_lib).strip().lower()
+        compressors = get_stream_compressors()
+        if self.format == 'directory':
+            self.logger.warning(
+                'Сжатие %s не используется для формата directory',
+                compression_lib,
+            )
+            self.compression_lib = None
+            return
+        if compression_lib not in compressors:
+            self.logger.warning(
+                'Метод сжатия %s недоступен, выгрузка не сжимается',
+                compression_lib,
+            )
+            self.compression_lib = None
+            return
+        self.compression_lib = compression_lib
+        self._compression_suffix = compressors[compression_lib]
+
+        max_level = 22 if compression_lib == 'zstd' else 9
+        try:
+            self.compression = min(max(int(self.compression), 0), max_level)
+            self.compression_workers = int(self.compression_workers)
+        except (TypeError, ValueError):
+            self.logger.warning(
+                'Неверные параметры сжатия: %s/%s, используются 5/1',
+                self.compression,
+                self.compression_workers,
+            )
+            self.compression, self.compression_workers = 5, 1
+        if self.compression_workers <= 0:
+            self.compression_workers = os.cpu_count() or 1
+        if self.compression_workers > 1 \
+                and compression_lib not in ('gzip', 'zstd'):
+            self.logger.warning(
+                'Параллельное сжатие недоступно для %s, используется 1 поток',
+                compression_lib,
+            )
+            self.compression_workers = 1
+        if self.format == 'custom':
+            self.logger.debug(
+                'Формат custom уже сжат pg_dump, '
+                'для сжатия %s стоит указать --compress=0 в opts',
+                compression_lib,
+            )
+
     def start(self):
         failed = False
         self.format = self.format.strip().lower()
-        database_list = self._get_database_list()
+        self.configure_compression()
+        database_list = self._get_database_list(refresh=True)
         if not database_list:
             self.logger.warning('Отсутствуют базы для бэкапа')
             return self.continue_on_error
 
         self.parse_exclusions()
+        databases = []
         for dbname in database_list:
             if self.is_exclusion(dbname):
                 self.logger.debug('- %s', dbname)
             else:
+                databases.append(dbname)
+
+        if self.skip_unchanged:
+            databases = self.filter_unchanged(databases)
+
+        workers, self._dump_jobs = self.get_worker_plan(len(databases))
+        self.logger.debug(
+            'Одновременно баз: %s, --jobs для базы: %s',
+            workers,
+            self._dump_jobs,
+        )
+        if workers > 1 and len(databases) > 1:
+            failed = self.backup_databases_parallel(databases, workers)
+        else:
+            for dbname in databases:
                 error = self.backup_database(dbname)
                 failed = error or failed
                 self.logger.debug('+ %s', dbname)
 
+        if self.skip_unchanged:
+            self.save_dump_state()
+
         if failed:
             return self.continue_on_error
 
         return True
 
+    def filter_unchanged(self, databases):
+        """Исключает базы, которые не менялись с последней выгрузки.
+
+        Вместо выгрузки такой базы создаётся жёсткая ссылка на
+        предыдущую с именем по текущей схеме, поэтому очистка
+        работает с ней как с обычным бэкапом.
+
+        Returns:
+            Список баз, которые нужно выгрузить.
+
+        """
+        self._markers = self.get_catalog().get_markers(
+            refresh=self.mode != 'all',
+        )
+        self._dump_state = self.load_dump_state()
+        changed = []
+        for dbname in databases:
+            if self.reuse_unchanged(dbname):
+                self.logger.debug('= %s', dbname)
+            else:
+                changed.append(dbname)
+        return changed
+
+    def reuse_unchanged(self, database):
+        """Ссылается на предыдущую выгрузку базы, если база не менялась.
+
+        Returns:
+            True, если выгрузка базы не нужна.
+
+        """
+        marker = self._markers.get(database)
+        previous = self._dump_state.get(database)
+        if marker is None or not isinstance(previous, dict):
+            return False
+        if previous.get('marker') != marker \
+                or previous.get('signature') != self.get_dump_signature():
+            return False
+        prev_filepath = previous.get('filepath')
+        if not prev_filepath or not os.path.exists(prev_filepath):
+            self.logger.debug(
+                'Предыдущая выгрузка базы %s не найдена',
+                database,
+            )
+            return False
+
+        filepath = self.get_dump_filepath(database)
+        if filepath != prev_filepath:
+            if os.path.lexists(filepath):
+                return False
+            try:
+                self._link_dump(prev_filepath, filepath)
+            except OSError as exc:
+                self.logger.warning(
+                    'Невозможно создать ссылку на %s: %s, база выгружается',
+                    prev_filepath,
+                    exc,
+                )
+                self._remove_partial(filepath)
+                return False
+        self.logger.info(
+            'База %s не изменилась, использована выгрузка %s',
+            database,
+            prev_filepath,
+        )
+
+        if self.checksum_file:
+            self._reuse_checksum(database, previous, filepath)
+        if not self.dry:
+            with self._state_lock:
+                previous['filepath'] = filepath
+                previous['hash_filepath'] = \
+                    self.generate_hash_filepath(dbname=database)
+        return True
+
+    def _reuse_checksum(self, database, previous, filepath):
+        hash_filepath = self.generate_hash_filepath(dbname=database)
+        algorithm, _ = self.get_hash_params()
+        hash_value = None
+        if previous.get('hash_algorithm') == algorithm:
+            hash_value = previous.get('hash_value')
+        prev_hash_filepath = previous.get('hash_filepath')
+        if hash_value is None and os.path.isdir(filepath) \
+                and previous.get('hash_algorithm') == algorithm \
+                and prev_hash_filepath \
+                and os.path.isfile(prev_hash_filepath):
+            # В файле директории только относительные пути, он не меняется.
+            self._copy_checksum_file(prev_hash_filepath, hash_filepath)
+            return
+        self.create_checksum_file(filepath, hash_filepath, hash_value)
+
+    def get_dump_signature(self):
+        """Возвращает параметры, при изменении которых база выгружается."""
+        return '{0}|{1}|{2}'.format(
+            self.format,
+            self.compression_lib or '',
+            self.opts,
+        )
+
+    def remember_dump(self, database, filepath, hash_value=None):
+        """Запоминает маркер изменений базы для успешной выгрузки."""
+        marker = self._markers.get(database)
+        if marker is None:
+            return
+        algorithm = None
+        if self.checksum_file:
+            algorithm, _ = self.get_hash_params()
+        with self._state_lock:
+            self._dump_state[database] = {
+                'marker': marker,
+                'signature': self.get_dump_signature(),
+                'filepath': filepath,
+                'hash_filepath': self.generate_hash_filepath(dbname=database),
+                'hash_algorithm': algorithm,
+                'hash_value': hash_value,
+            }
+
+    def get_state_filepath(self):
+        """Возвращает путь к файлу с маркерами последних выгрузок."""
+        return os.path.join(
+            self.dest_path,
+            '.{0}.state.json'.format(self.basename),
+        )
+
+    def load_dump_state(self):
+        """Читает маркеры последних выгрузок баз."""
+        state_filepath = self.get_state_filepath()
+        try:
+            with open(state_filepath) as state_file:
+                state = json.load(state_file)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as exc:
+            self.logger.warning(
+                'Файл %s не прочитан, все базы выгружаются: %s',
+                state_filepath,
+                exc,
+            )
+            return {}
+        return state if isinstance(state, dict) else {}
+
+    @side_effecting
+    def save_dump_state(self):
+        """Сохраняет маркеры последних выгрузок баз."""
+        state_filepath = self.get_state_filepath()
+        tmp_filepath = '{0}.tmp'.format(state_filepath)
+        try:
+            with open(tmp_filepath, 'w') as state_file:
+                json.dump(self._dump_state, state_file, ensure_ascii=False)
+            os.replace(tmp_filepath, state_filepath)
+        except OSError as exc:
+            self.logger.warning(
+                'Невозможно сохранить файл %s: %s',
+                state_filepath,
+                exc,
+            )
+
+    @side_effecting
+    def _link_dump(self, src, dest):
+        """Создаёт жёсткую ссылку на выгрузку.
+
+        Для формата directory создаётся директория со ссылками
+        на каждый файл.
+
+        """
+        if not os.path.isdir(src):
+            os.link(src, dest)
+            return
+        for dirpath, _, filenames in os.walk(src):
+            dest_dirpath = os.path.join(dest, os.path.relpath(dirpath, src))
+            os.makedirs(dest_dirpath, exist_ok=True)
+            for filename in filenames:
+                os.link(
+                    os.path.join(dirpath, filename),
+                    os.path.join(dest_dirpath, filename),
+                )
+
+    @side_effecting
+    def _remove_partial(self, filepath):
+        if os.path.isdir(filepath):
+            shutil.rmtree(filepath, ignore_errors=True)
+        elif os.path.exists(filepath):
+            os.remove(filepath)
+
+    @side_effecting
+    def _copy_checksum_file(self, src, dest):
+        shutil.copyfile(src, dest)
+        self.logger.info('Создан файл %s', dest)
+
+    def get_parallel_databases(self):
+        """Возвращает количество одновременно выгружаемых баз."""
+        try:
+            return max(int(self.parallel_databases), 1)
+        except (TypeError, ValueError):
+            self.logger.warning(
+                'Неверное значение parallel_databases: %s, '
+                'базы выгружаются последовательно',
+                self.parallel_databases,
+            )
+            return 1
+
+    def get_worker_plan(self, databases_count):
+        """Распределяет бюджет max_workers между базами и --jobs.
+
+        Произведение количества одновременных баз на --jobs не
+        превышает max_workers, поэтому сервер БД не перегружается.
+        --jobs используется только для формата directory.
+
+        Args:
+            databases_count: Целое число, количество баз для бэкапа.
+
+        Returns:
+            Кортеж (количество одновременных баз, --jobs для базы).
+
+        """
+        workers = min(self.get_parallel_databases(), max(databases_count, 1))
+        try:
+            jobs = int(self.jobs)
+            budget = int(self.max_workers)
+        except (TypeError, ValueError):
+            self.logger.warning(
+                'Неверное значение jobs/max_workers: %s/%s',
+                self.jobs,
+                self.max_workers,
+            )
+            jobs, budget = 1, 0
+
+        if budget > 0:
+            workers = min(workers, budget)
+            jobs_limit = max(budget // workers, 1)
+            jobs = jobs_limit if jobs <= 0 else min(jobs, jobs_limit)
+        elif jobs <= 0:
+            jobs = 1
+
+        if self.format != 'directory':
+            jobs = 1
+        return workers, jobs
+
+    def order_by_size(self, databases):
+        """Сортирует базы по убыванию размера.
+
+        Большие базы запускаются первыми, чтобы в конце не оставалась
+        одна долгая выгрузка. Если размеры получить не удалось,
+        порядок не меняется.
+
+        """
+        sizes = self.get_catalog().get_sizes()
+        if not sizes:
+            self.logger.debug('Размеры баз не получены')
+            return list(databases)
+        return sorted(
+            databases,
+            key=lambda dbname: sizes.get(dbname, 0),
+            reverse=True,
+        )
+
+    def backup_databases_parallel(self, databases, workers):
+        """Выполняет бэкап баз в workers потоков.
+
+        Записи лога каждой базы копятся в буфере и выводятся группой,
+        поэтому вывод разных pg_dump не перемешивается построчно.
+
+        Returns:
+            True, если при бэкапе хотя бы одной базы возникли ошибки.
+
+        """
+        databases = self.order_by_size(databases)
+        self.logger.info(
+            'Параллельный бэкап %s баз, потоков: %s',
+            len(databases),
+            workers,
+        )
+        log_lock = threading.Lock()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(self._backup_database_logged, dbname, log_lock)
+                for dbname in databases
+            ]
+
+        failed = False
+        for future in futures:
+            failed = future.result() or failed
+        return failed
+
+    def _backup_database_logged(self, database, log_lock):
+        logger = self.logger.getChild(database)
+        log_buffer = _LogBuffer(self.logger, log_lock)
+        logger.addHandler(log_buffer)
+        logger.propagate = False
+        try:
+            error = self.backup_database(database, logger=logger)
+            logger.debug('+ %s', database)
+            return error
+        finally:
+            logger.removeHandler(log_buffer)
+            logger.propagate = True
+            log_buffer.close()
+
     def parse_exclusions(self):
         """Обработка переданных исключений."""
         for exclusion in self.exclusions:
@@ -224,6 +781,7 @@ class PgDump(Action, NameGenerationInterface):
             else:
                 self.prepared_exclusions.append(exclusion)
 
+        self.exclusion_matcher = ExclusionMatcher(self.prepared_exclusions)
         self.logger.debug(
             'Добавлены исключения: %s',
             [excl.pattern for excl in self.prepared_exclusions],
@@ -254,7 +812,8 @@ class PgDump(Action, NameGenerationInterface):
         Метод пытается узнать список баз данных по предоставленным
         данным из родительского действия pgdump.
         Если в родительском действии есть список баз, то используется он,
-        если нет - попытка получить список баз напрямую через pg_dump.
+        если нет - список баз из кэша каталога (при необходимости
+        он запрашивается у postgres).
 
         Returns:
             Список паттернов групп, который генерируются при помощи
@@ -267,20 +826,8 @@ class PgDump(Action, NameGenerationInterface):
             databases = self.databases
         else:
             self.logger.debug('Атрибут databases со списком баз отсутствует.')
-            self.logger.debug(
-                'Пытаюсь получить список баз напрямую из postgres.',
-            )
-            if self.password:
-                os.putenv('PGPASSWORD', self.password)
-            try:
-                databases = PgDump.get_database_list(
-                    self.user,
-                    self.host,
-                    self.port,
-                    logger=self.logger,
-                )
-            except AttributeError:
-                databases = PgDump.get_database_list(logger=self.logger)
+            self.logger.debug('Список баз берётся из каталога.')
+            databases = self.get_catalog().get_databases()
 
         self.logger.debug('Получены базы: %s', databases)
 
@@ -297,3 +844,72 @@ class PgDump(Action, NameGenerationInterface):
         if kwargs.get('dbname'):
             return self.scheme.get_pgdump_hashfile_name(self, dbname=kwargs.get('dbname'))
         return self.scheme.get_pgdump_hashfile_name(self)
+
+
+class _LogBuffer(logging.Handler):
+    """Копит записи лога и передаёт их target одной группой.
+
+    Группа передаётся при закрытии или при заполнении буфера
+    под общей блокировкой, чтобы группы разных баз не смешивались.
+
+    """
+
+    def __init__(self, target, lock, capacity=1000):
+        super().__init__()
+        self.target = target
+        self.group_lock = lock
+        self.capacity = capacity
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+        if len(self.records) >= self.capacity:
+            self.flush()
+
+    def flush(self):
+        with self.group_lock:
+            records, self.records = self.records, []
+            for record in records:
+                self.target.handle(record)
+
+    def close(self):
+        self.flush()
+        super().close()
+
+
+class _Progress:
+    """Пишет в лог скорость выгрузки.
+
+    Вызывается с количеством прочитанных из pg_dump байт,
+    запись в лог - не чаще раза в interval секунд.
+
+    """
+
+    def __init__(self, logger, interval):
+        self.logger = logger
+        self.interval = interval
+        self.started = time.monotonic()
+        self._logged = self.started
+        self.copied = 0
+
+    def __call__(self, copied):
+        self.copied = copied
+        now = time.monotonic()
+        if self.interval and now - self._logged >= self.interval:
+            self._logged = now
+            self.logger.info(
+                'Выгружено %s байт, %.0f байт/с',
+                copied,
+                copied / (now - self.started),
+            )
+
+    def log_total(self, written):
+        """Пишет итог выгрузки, written - размер файла на диске."""
+        elapsed = max(time.monotonic() - self.started, 1e-6)
+        self.logger.info(
+            'Выгружено %s байт за %.1f с (%.0f байт/с), записано %s байт',
+            self.copied,
+            elapsed,
+            self.copied / elapsed,
+            written,
+        )
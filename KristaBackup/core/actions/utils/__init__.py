@@ -1 +1,16 @@
-from .file_checksum import create_sha1sum_file
+from .compression import (
+    ParallelGzipWriter, get_stream_compressors, open_compressor,
+)
+from .db_catalog import DatabaseCatalog
+from .exclusions import ExclusionMatcher, get_tree_pattern
+from .file_checksum import (
+    Blake2bTree, HashingWriter, create_hash_file,
+    create_sha1sum_file, get_hash_algorithms, hash_file,
+    new_hash, write_checksum_file,
+)
+from .file_linker import LINK_MODES, FileLinker, reflink
+from .manifest import (
+    Manifest, ManifestError, ManifestWriter,
+    convert_listfile, merge_manifests,
+)
+from .read_ahead import ReadAhead
@@ -0,0 +1,744 @@
+# -*- encoding: utf-8 -*-
+
+"""Хранилище блоков с дедупликацией и снимки дерева файлов.
+
+Файлы режутся на блоки переменной длины, границы которых зависят
+только от содержимого (content-defined chunking), поэтому вставка
+данных в начало файла меняет лишь соседние блоки. Каждый блок
+хранится один раз в каталоге хранилища под именем своего хэша
+(BLAKE2b-256), снимок - сжатый список файлов со ссылками на блоки.
+
+Граница блока ищется по окну из нескольких байт: байты потока
+перемешиваются с предыдущим через таблицы подстановки
+(bytes.translate и операции над int выполняются в C), после чего
+регулярным выражением ищется серия байт меньше 64. Как и в FastCDC,
+до среднего размера блока требуется более длинная серия, после -
+более короткая, поэтому размеры блоков ближе к среднему.
+
+Формат блока: один байт метода сжатия (Z - zlib, N - без сжатия)
+и данные. Формат снимка: gzip, в каждой строке json объект -
+заголовок, записи файлов и завершающая запись с итогами.
+
+"""
+
+import collections
+import errno
+import fcntl
+import gzip
+import hashlib
+import json
+import os
+import re
+import stat
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+SNAPSHOT_FORMAT = 'krista-dedup-snapshot'
+SNAPSHOT_VERSION = 1
+DEFAULT_CHUNK_SIZE = 1024 * 1024  # средний размер блока
+READ_SIZE = 1024 * 1024
+HEADER_LIMIT = 64 * 1024  # заголовок снимка, tar.gz не читается целиком
+
+_COMPRESSED = b'Z'
+_STORED = b'N'
+
+
+class ChunkStoreError(Exception):
+    """Ошибка хранилища блоков или снимка."""
+
+
+# Таблицы подстановки из псевдослучайных байт. Заданы константами:
+# границы блоков не должны зависеть от версии python и hashlib.
+_TABLE_CURRENT = bytes.fromhex(
+    '471beb384da3201160ac8d8e1aaf469cf2b7ce1478afdc0f636654edd1d3ca9c'
+    '169e0c2c2731c36678069fe79c0680c3d9226200ca9e0fd5c386eb4ad2216d7c'
+    '597e38cba1e217f1efecb34ddf11677e6b7d6992b0869e6e4055195aac90f65f'
+    '62488a5f28ee274733fe5cad0b379b497b2ca9a752ef172fa310f7fa1c353557'
+    'ad891eac3374f9d2ae5dd97f0d289dafc64da03ae5104a6752b8553b66647ba7'
+    'e65a99cbe45261863ea83c68169bd843c686988017c8b4eec333637190fba8e7'
+    '6a09930d4608341e1e723967a18f6e13b8634f84d654342f5756a2bc590eb0e2'
+    'a212e9773d038d795acc405ce2c95420e41e25d99d9c1e3056f46720492ac124'
+)
+_TABLE_PREVIOUS = bytes.fromhex(
+    'e1b59cc57efe69277f9c8996c84a0018671e4473b099fa54394cd4372d5f3520'
+    '4eb2eba6675363f6e4ffc5d6aa57d43c6e4c54db085cd4cc25ae190ea96f61cb'
+    '078487f881fdf8b02e864da6f5f315707476556fea5bf1c706b545d163c5af79'
+    '3b7371c749eb4f14ba473283ef2303585fa8c99bc12d8b7a6cb77e87d9355856'
+    '16912d40fd1ed83d6160b925cae79951c33123cec66cdad80851853c8c5a70ee'
+    '349543426ee376523565b26d0c765f5562117fc43f07a0cf5a43ccc34b1a30b4'
+    '23a50193db8b8a9c7f30f6054cd6d03551413be40ade55ef42336c26dc1b2533'
+    '57c8f3b8a0c032dca2e63c9ea257114723d7715363984554146eb92548383bb2'
+)
+
+
+def _mix(block, previous=b'\0'):
+    """Возвращает байты, каждый из которых зависит от двух байт потока.
+
+    Args:
+        block: bytes, данные.
+        previous: bytes, последний байт предыдущих данных.
+
+    """
+    size = len(block)
+    current = int.from_bytes(block.translate(_TABLE_CURRENT), 'little')
+    shifted = int.from_bytes(
+        (previous + block).translate(_TABLE_PREVIOUS),
+        'little',
+    )
+    return (current ^ shifted).to_bytes(size + 1, 'little')[:size]
+
+
+class Chunker:
+    """Разбивает поток на блоки, границы которых зависят от содержимого.
+
+    Attributes:
+        avg_size: Целое число, средний размер блока (степень двойки).
+        min_size: Целое число, avg_size / 4.
+        max_size: Целое число, avg_size * 4.
+
+    """
+
+    def __init__(self, avg_size=DEFAULT_CHUNK_SIZE):
+        bits = max(int(avg_size).bit_length() - 1, 12)
+        self.avg_size = 1 << bits
+        self.min_size = self.avg_size >> 2
+        self.max_size = self.avg_size << 2
+        # Вероятность байта меньше 64 - 1/4, серия из k байт - 2^-2k.
+        self._strict = re.compile(b'[\\x00-\\x3f]{%d}' % (bits // 2 + 1))
+        self._loose = re.compile(b'[\\x00-\\x3f]{%d}' % (bits // 2 - 1))
+
+    def params(self):
+        """Возвращает параметры для заголовка снимка."""
+        return {
+            'min': self.min_size,
+            'avg': self.avg_size,
+            'max': self.max_size,
+        }
+
+    def split(self, fileobj):
+        """Возвращает генератор блоков (bytes) из файлового объекта."""
+        data = bytearray()
+        mixed = bytearray()
+        previous = b'\0'
+        eof = False
+        while True:
+            while not eof and len(data) < self.max_size:
+                block = fileobj.read(READ_SIZE)
+                if not block:
+                    eof = True
+                    break
+                mixed += _mix(block, previous)
+                previous = block[-1:]
+                data += block
+            if not data:
+                return
+            cut = self._find_cut(mixed, len(data))
+            yield bytes(data[:cut])
+            del data[:cut]
+            del mixed[:cut]
+
+    def _find_cut(self, mixed, size):
+        if size <= self.min_size:
+            return size
+        end = min(size, self.max_size)
+        normal = min(end, self.avg_size)
+        match = self._strict.search(mixed, self.min_size, normal) \
+            or self._loose.search(mixed, normal, end)
+        if match:
+            return match.end()
+        return end
+
+
+class ChunkStore:
+    """Каталог с блоками, адресуемыми по хэшу содержимого.
+
+    Блоки сжимаются и пишутся в пуле потоков (zlib и hashlib
+    отпускают GIL). Запись атомарная: во временный файл
+    и переименование, поэтому оборванный бэкап не оставляет
+    повреждённых блоков.
+
+    Attributes:
+        path: Строка, путь к каталогу хранилища.
+        compresslevel: Целое число, уровень сжатия zlib, 0 - без сжатия.
+        stats: Counter со статистикой записи.
+
+    """
+
+    def __init__(self, path, compresslevel=5, workers=1):
+        self.path = path
+        self.compresslevel = compresslevel
+        self.stats = collections.Counter()
+        self._known = set()
+        self._dirs = set()
+        self._executor = ThreadPoolExecutor(max_workers=max(workers, 1))
+        self._pending = collections.deque()
+        self._max_pending = max(workers, 1) * 2
+        self._lock_file = None
+
+    @staticmethod
+    def chunk_id(data):
+        """Возвращает идентификатор блока - hex BLAKE2b-256."""
+        return hashlib.blake2b(data, digest_size=32).hexdigest()
+
+    def get_chunk_path(self, chunk_id):
+        return os.path.join(self.path, chunk_id[:2], chunk_id)
+
+    def has(self, chunk_id):
+        if chunk_id in self._known:
+            return True
+        if os.path.exists(self.get_chunk_path(chunk_id)):
+            self._known.add(chunk_id)
+            return True
+        return False
+
+    def put(self, data):
+        """Сохраняет блок, если его нет в хранилище.
+
+        Returns:
+            Строку, идентификатор блока.
+
+        """
+        chunk_id = self.chunk_id(data)
+        self.stats['chunks'] += 1
+        if self.has(chunk_id):
+            self.stats['duplicate_bytes'] += len(data)
+            return chunk_id
+        self._known.add(chunk_id)
+        self.stats['new_chunks'] += 1
+        self.stats['new_bytes'] += len(data)
+        self._pending.append(
+            self._executor.submit(self._write_chunk, chunk_id, data),
+        )
+        while len(self._pending) > self._max_pending:
+            self.stats['stored_bytes'] += self._pending.popleft().result()
+        return chunk_id
+
+    def get(self, chunk_id):
+        """Читает блок и проверяет его хэш.
+
+        Raises:
+            ChunkStoreError, если блок отсутствует или повреждён.
+
+        """
+        try:
+            with open(self.get_chunk_path(chunk_id), 'rb') as chunk_file:
+                raw = chunk_file.read()
+        except FileNotFoundError:
+            raise ChunkStoreError('Блок {0} отсутствует'.format(chunk_id))
+        method, payload = raw[:1], raw[1:]
+        if method == _COMPRESSED:
+            try:
+                payload = zlib.decompress(payload)
+            except zlib.error as exc:
+                raise ChunkStoreError(
+                    'Блок {0} повреждён: {1}'.format(chunk_id, exc),
+                )
+        elif method != _STORED:
+            raise ChunkStoreError('Блок {0} повреждён'.format(chunk_id))
+        if self.chunk_id(payload) != chunk_id:
+            raise ChunkStoreError(
+                'Хэшсумма блока {0} не совпадает'.format(chunk_id),
+            )
+        return payload
+
+    def flush(self):
+        """Дожидается записи всех блоков."""
+        while self._pending:
+            self.stats['stored_bytes'] += self._pending.popleft().result()
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            self._executor.shutdown(wait=True)
+            self.unlock()
+
+    def iter_chunks(self):
+        """Возвращает генератор (идентификатор, путь) всех блоков."""
+        if not os.path.isdir(self.path):
+            return
+        for subdir in sorted(os.listdir(self.path)):
+            dirpath = os.path.join(self.path, subdir)
+            if len(subdir) != 2 or not os.path.isdir(dirpath):
+                continue
+            for filename in os.listdir(dirpath):
+                if filename.startswith(subdir) and len(filename) == 64:
+                    yield filename, os.path.join(dirpath, filename)
+
+    def lock(self, exclusive=False, blocking=True):
+        """Блокирует хранилище.
+
+        Бэкап берёт разделяемую блокировку, сборка мусора -
+        эксклюзивную, поэтому она не удаляет блоки, на которые
+        ссылается ещё не записанный снимок.
+
+        Каталог хранилища должен существовать: блокировка его
+        не создаёт, в том числе при dry-run.
+
+        Returns:
+            False, если blocking=False и хранилище занято.
+
+        """
+        self._lock_file = open(os.path.join(self.path, 'lock'), 'a')
+        operation = fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH
+        if not blocking:
+            operation |= fcntl.LOCK_NB
+        try:
+            fcntl.flock(self._lock_file, operation)
+        except OSError as exc:
+            self._lock_file.close()
+            self._lock_file = None
+            if exc.errno in (errno.EAGAIN, errno.EACCES):
+                return False
+            raise
+        return True
+
+    def unlock(self):
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+    def get_roots(self):
+        """Возвращает каталоги, в которых лежат снимки хранилища."""
+        try:
+            with open(os.path.join(self.path, 'roots')) as roots_file:
+                return [
+                    line.rstrip('\n') for line in roots_file if line.strip()
+                ]
+        except FileNotFoundError:
+            return []
+
+    def register_root(self, dirpath):
+        """Запоминает каталог со снимками для сборки мусора."""
+        dirpath = os.path.realpath(dirpath)
+        os.makedirs(self.path, exist_ok=True)
+        with open(os.path.join(self.path, 'roots'), 'a+') as roots_file:
+            fcntl.flock(roots_file, fcntl.LOCK_EX)
+            roots_file.seek(0)
+            if dirpath not in (line.rstrip('\n') for line in roots_file):
+                roots_file.write('{0}\n'.format(dirpath))
+
+    def _write_chunk(self, chunk_id, data):
+        dirpath = os.path.join(self.path, chunk_id[:2])
+        if dirpath not in self._dirs:
+            os.makedirs(dirpath, exist_ok=True)
+            self._dirs.add(dirpath)
+        payload = _STORED + data
+        if self.compresslevel > 0:
+            compressed = zlib.compress(data, self.compresslevel)
+            if len(compressed) < len(data):
+                payload = _COMPRESSED + compressed
+        chunk_path = os.path.join(dirpath, chunk_id)
+        tmp_path = '{0}.{1}.{2}.tmp'.format(
+            chunk_path,
+            os.getpid(),
+            threading.get_ident(),
+        )
+        with open(tmp_path, 'wb') as chunk_file:
+            chunk_file.write(payload)
+        os.replace(tmp_path, chunk_path)
+        return len(payload)
+
+
+class SnapshotWriter:
+    """Записывает снимок дерева файлов, данные файлов - в ChunkStore.
+
+    Используется как архив: add добавляет файл, close завершает снимок.
+    Если файл не изменился (время изменения и размер) с предыдущего
+    снимка, то его список блоков берётся оттуда без чтения файла.
+
+    Attributes:
+        store: ChunkStore.
+        chunker: Chunker.
+        dirpath: Строка, каталог снимка.
+        previous: Словарь {путь: запись} предыдущего снимка.
+        stats: Counter со статистикой снимка.
+
+    """
+
+    def __init__(
+        self,
+        fileobj,
+        store,
+        chunker,
+        snapshot_dirpath,
+        previous=None,
+        close_fileobj=False,
+    ):
+        self.fileobj = fileobj
+        self.store = store
+        self.chunker = chunker
+        self.dirpath = snapshot_dirpath
+        self.previous = previous or {}
+        self.close_fileobj = close_fileobj
+        self.stats = collections.Counter()
+        self.name = None
+        self._stream = gzip.GzipFile(fileobj=fileobj, mode='wb', mtime=0)
+        self._write({
+            'format': SNAPSHOT_FORMAT,
+            'version': SNAPSHOT_VERSION,
+            'store': os.path.abspath(store.path),
+            'store_relpath': os.path.relpath(store.path, snapshot_dirpath),
+            'chunker': chunker.params(),
+        })
+
+    def add(self, filepath, arcname, statres=None, content=None):
+        """Добавляет файл, директорию или символическую ссылку.
+
+        Args:
+            filepath: Строка, путь к файлу.
+            arcname: Строка, имя файла в снимке.
+            statres: os.stat_result или None.
+            content: bytes или None, прочитанное заранее содержимое.
+
+        Returns:
+            False, если тип файла не поддерживается.
+
+        """
+        statres = statres or os.lstat(filepath)
+        record = {
+            'path': arcname,
+            'mode': statres.st_mode,
+            'uid': statres.st_uid,
+            'gid': statres.st_gid,
+            'mtime_ns': statres.st_mtime_ns,
+        }
+        if stat.S_ISDIR(statres.st_mode):
+            record['type'] = 'd'
+        elif stat.S_ISLNK(statres.st_mode):
+            record['type'] = 'l'
+            record['target'] = os.readlink(filepath)
+        elif stat.S_ISREG(statres.st_mode):
+            record['type'] = 'f'
+            record['size'], record['chunks'] = self._store_file(
+                filepath,
+                arcname,
+                statres,
+                content,
+            )
+            self.stats['bytes'] += record['size']
+        else:
+            return False
+        self.stats['files'] += 1
+        self._write(record)
+        return True
+
+    def close(self):
+        try:
+            self.store.flush()
+            self._write({'type': 'end', 'files': self.stats['files']})
+            self._stream.close()
+        finally:
+            if self.close_fileobj:
+                self.fileobj.close()
+
+    def _store_file(self, filepath, arcname, statres, content):
+        previous = self.previous.get(arcname)
+        if previous is not None \
+                and previous.get('type') == 'f' \
+                and previous.get('mtime_ns') == statres.st_mtime_ns \
+                and previous.get('size') == statres.st_size:
+            self.stats['reused_bytes'] += statres.st_size
+            return previous['size'], previous['chunks']
+
+        chunks = []
+        size = 0
+        if content is not None:
+            parts = self.chunker.split(_BytesReader(content))
+            for data in parts:
+                chunks.append(self.store.put(data))
+                size += len(data)
+        else:
+            with open(filepath, 'rb') as file_content:
+                for data in self.chunker.split(file_content):
+                    chunks.append(self.store.put(data))
+                    size += len(data)
+        return size, chunks
+
+    def _write(self, record):
+        line = json.dumps(record, ensure_ascii=False, separators=(',', ':'))
+        self._stream.write(line.encode('utf-8', 'surrogateescape'))
+        self._stream.write(b'\n')
+
+
+class _BytesReader:
+    """Минимальный файловый объект над bytes для Chunker.split."""
+
+    def __init__(self, content):
+        self._view = memoryview(content)
+        self._offset = 0
+
+    def read(self, size):
+        data = self._view[self._offset:self._offset + size]
+        self._offset += len(data)
+        return bytes(data)
+
+
+def read_snapshot_header(snapshot_filepath):
+    """Возвращает заголовок снимка (словарь).
+
+    Raises:
+        ChunkStoreError, если файл не является снимком.
+
+    """
+    with gzip.open(snapshot_filepath, 'rb') as stream:
+        return _read_header(stream, snapshot_filepath)
+
+
+def iter_snapshot_records(snapshot_filepath):
+    """Возвращает генератор записей снимка.
+
+    Raises:
+        ChunkStoreError, если файл не является снимком, повреждён
+            или оборван (нет завершающей записи).
+
+    """
+    with gzip.open(snapshot_filepath, 'rb') as stream:
+        _read_header(stream, snapshot_filepath)
+        try:
+            for line in stream:
+                record = json.loads(line.decode('utf-8', 'surrogateescape'))
+                if record.get('type') == 'end':
+                    return
+                yield record
+        except (OSError, EOFError, ValueError) as exc:
+            raise ChunkStoreError(
+                'Снимок {0} повреждён: {1}'.format(snapshot_filepath, exc),
+            )
+    raise ChunkStoreError('Снимок {0} оборван'.format(snapshot_filepath))
+
+
+def _read_header(stream, snapshot_filepath):
+    try:
+        header = json.loads(
+            stream.readline(HEADER_LIMIT).decode('utf-8', 'surrogateescape'),
+        )
+    except (OSError, EOFError, ValueError) as exc:
+        raise ChunkStoreError(
+            'Файл {0} не является снимком: {1}'.format(snapshot_filepath, exc),
+        )
+    if not isinstance(header, dict) \
+            or header.get('format') != SNAPSHOT_FORMAT:
+        raise ChunkStoreError(
+            'Файл {0} не является снимком'.format(snapshot_filepath),
+        )
+    return header
+
+
+def get_snapshot_store_path(snapshot_filepath, header):
+    """Возвращает путь к хранилищу снимка.
+
+    Сначала проверяется путь относительно снимка (хранилище
+    перенесено вместе со снимками), затем абсолютный.
+
+    """
+    relpath = os.path.join(
+        os.path.dirname(os.path.abspath(snapshot_filepath)),
+        header.get('store_relpath', ''),
+    )
+    if os.path.isdir(relpath):
+        return os.path.normpath(relpath)
+    return header.get('store')
+
+
+def register_snapshot_root(snapshot_filepath, dirpath):
+    """Регистрирует каталог с копией снимка в его хранилище.
+
+    Returns:
+        True, если файл является снимком и каталог зарегистрирован.
+
+    """
+    try:
+        header = read_snapshot_header(snapshot_filepath)
+    except (OSError, ChunkStoreError):
+        return False
+    store_path = get_snapshot_store_path(snapshot_filepath, header)
+    if not store_path or not os.path.isdir(store_path):
+        return False
+    ChunkStore(store_path).register_root(dirpath)
+    return True
+
+
+def load_snapshot_files(snapshot_filepath):
+    """Возвращает словарь {путь: запись} обычных файлов снимка."""
+    return {
+        record['path']: record
+        for record in iter_snapshot_records(snapshot_filepath)
+        if record.get('type') == 'f'
+    }
+
+
+def restore_snapshot(
+    snapshot_filepath,
+    target_dirpath,
+    store_path=None,
+    prefix=None,
+    logger=None,
+):
+    """Восстанавливает файлы снимка в каталог target_dirpath.
+
+    Args:
+        snapshot_filepath: Строка, путь к снимку.
+        target_dirpath: Строка, каталог для восстановления.
+        store_path: Строка или None, путь к хранилищу, если None,
+            то берётся из снимка.
+        prefix: Строка или None, восстановить только этот путь
+            (файл или каталог).
+        logger: Логгер или None.
+
+    Returns:
+        Целое число, количество восстановленных записей.
+
+    Raises:
+        ChunkStoreError, если снимок или блоки повреждены.
+
+    """
+    header = read_snapshot_header(snapshot_filepath)
+    store = ChunkStore(
+        store_path or get_snapshot_store_path(snapshot_filepath, header),
+    )
+    target_dirpath = os.path.abspath(target_dirpath)
+    prefix = prefix.strip('/') if prefix else None
+    is_root = hasattr(os, 'geteuid') and os.geteuid() == 0
+    directories = []
+    restored = 0
+
+    try:
+        for record in iter_snapshot_records(snapshot_filepath):
+            path = record['path'].strip('/')
+            if prefix and path != prefix and not path.startswith(prefix + '/'):
+                continue
+            dest = os.path.normpath(os.path.join(target_dirpath, path))
+            if dest != target_dirpath \
+                    and not dest.startswith(target_dirpath + os.sep):
+                raise ChunkStoreError(
+                    'Недопустимый путь в снимке: {0}'.format(path),
+                )
+
+            if record['type'] == 'd':
+                os.makedirs(dest, exist_ok=True)
+                directories.append((dest, record))
+            elif record['type'] == 'l':
+                os.makedirs(os.path.dirname(dest), exist_ok=True)
+                if os.path.lexists(dest):
+                    os.remove(dest)
+                os.symlink(record['target'], dest)
+                if is_root:
+                    os.lchown(dest, record['uid'], record['gid'])
+            elif record['type'] == 'f':
+                os.makedirs(os.path.dirname(dest), exist_ok=True)
+                size = 0
+                with open(dest, 'wb') as dest_file:
+                    for chunk_id in record['chunks']:
+                        size += dest_file.write(store.get(chunk_id))
+                if size != record['size']:
+                    raise ChunkStoreError(
+                        'Размер файла {0} не совпадает'.format(path),
+                    )
+                _apply_attributes(dest, record, is_root)
+            else:
+                continue
+            restored += 1
+            if logger:
+                logger.debug('Восстановлен %s', path)
+
+        for dest, record in reversed(directories):
+            _apply_attributes(dest, record, is_root)
+    finally:
+        store.close()
+    return restored
+
+
+def _apply_attributes(path, record, is_root):
+    if is_root:
+        os.chown(path, record['uid'], record['gid'])
+    os.chmod(path, stat.S_IMODE(record['mode']))
+    os.utime(path, ns=(record['mtime_ns'], record['mtime_ns']))
+
+
+def collect_garbage(store, suffix, logger, dry=False):
+    """Удаляет блоки, на которые не ссылается ни один снимок.
+
+    Для каждого блока считается количество ссылок из снимков
+    в зарегистрированных каталогах (store.get_roots), удаляются блоки
+    без ссылок. Если каталоги не зарегистрированы, какой-то из них
+    недоступен или хранилище занято бэкапом, то сборка мусора
+    пропускается.
+
+    Args:
+        store: ChunkStore.
+        suffix: Строка, расширение файлов снимков.
+        logger: Логгер.
+        dry: Логическое значение, только посчитать.
+
+    Returns:
+        Кортеж (удалено блоков, освобождено байт) или None,
+        если сборка мусора пропущена.
+
+    """
+    if not os.path.isdir(store.path):
+        return None
+    if not store.lock(exclusive=True, blocking=False):
+        logger.info('Хранилище %s занято, блоки не очищаются', store.path)
+        return None
+    try:
+        roots = store.get_roots()
+        if not roots:
+            # Без каталогов снимков все блоки выглядели бы лишними.
+            logger.warning(
+                'Для хранилища %s не найдены каталоги снимков, '
+                'блоки не очищаются',
+                store.path,
+            )
+            return None
+        store_realpath = os.path.realpath(store.path)
+        refs = collections.Counter()
+        for root in roots:
+            if not os.path.isdir(root):
+                logger.warning(
+                    'Каталог снимков %s недоступен, блоки не очищаются',
+                    root,
+                )
+                return None
+            for filename in os.listdir(root):
+                filepath = os.path.join(root, filename)
+                if not filename.endswith(suffix) \
+                        or not os.path.isfile(filepath):
+                    continue
+                try:
+                    header = read_snapshot_header(filepath)
+                except (OSError, ChunkStoreError):
+                    continue
+                store_path = get_snapshot_store_path(filepath, header)
+                if not store_path \
+                        or os.path.realpath(store_path) != store_realpath:
+                    continue
+                try:
+                    for record in iter_snapshot_records(filepath):
+                        refs.update(record.get('chunks', ()))
+                except ChunkStoreError as exc:
+                    # Ссылки прочитанной части снимка тоже сохраняются.
+                    logger.warning('%s', exc)
+
+        removed = 0
+        freed = 0
+        present = set()
+        for chunk_id, chunk_path in store.iter_chunks():
+            present.add(chunk_id)
+            if refs[chunk_id]:
+                continue
+            freed += os.path.getsize(chunk_path)
+            removed += 1
+            if not dry:
+                os.remove(chunk_path)
+        missing = len(set(refs) - present)
+        if missing:
+            logger.warning(
+                'В хранилище %s отсутствует блоков: %s',
+                store.path,
+                missing,
+            )
+        return removed, freed
+    finally:
+        store.unlock()
@@ -0,0 +1,201 @@
+# -*- encoding: utf-8 -*-
+
+"""Многопоточное и потоковое сжатие выходных файлов."""
+
+import bz2
+import collections
+import gzip
+import io
+import os
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import lzma
+except ImportError:
+    lzma = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+BLOCK_SIZE = 1024 * 1024  # размер блока, сжимаемого одним потоком
+
+_SUFFIXES = {
+    'gzip': 'gz',
+    'bzip': 'bz2',
+    'lzma': 'xz',
+    'zstd': 'zst',
+}
+
+
+def _compress_gzip_member(block, compresslevel):
+    """Сжимает блок в самостоятельный gzip member.
+
+    Заголовок содержит нулевое mtime, поэтому результат
+    детерминирован.
+
+    """
+    compressor = zlib.compressobj(compresslevel, zlib.DEFLATED, 31)
+    return compressor.compress(block) + compressor.flush()
+
+
+class ParallelGzipWriter(io.BufferedIOBase):
+    """Файловый объект для записи gzip с параллельным сжатием.
+
+    Входящие данные режутся на блоки по block_size байт, каждый блок
+    сжимается в пуле потоков как отдельный gzip member, а результаты
+    записываются в fileobj строго в порядке поступления. Такой файл
+    является обычным multi-member gzip и читается gzip, tar и tarfile.
+
+    Количество блоков в обработке ограничено, поэтому память не растёт
+    при медленном диске.
+
+    Attributes:
+        fileobj: Файловый объект, в который пишется сжатый поток.
+        compresslevel: Целое число, уровень сжатия.
+        workers: Целое число, количество потоков сжатия.
+        block_size: Целое число, размер блока в байтах.
+        close_fileobj: Логическое значение, закрывать fileobj при закрытии.
+
+    """
+
+    def __init__(
+        self,
+        fileobj,
+        compresslevel=5,
+        workers=None,
+        block_size=BLOCK_SIZE,
+        close_fileobj=False,
+    ):
+        super().__init__()
+        self.fileobj = fileobj
+        self.compresslevel = compresslevel
+        self.workers = workers or os.cpu_count() or 1
+        self.block_size = block_size
+        self.close_fileobj = close_fileobj
+
+        self._executor = ThreadPoolExecutor(max_workers=self.workers)
+        self._pending = collections.deque()
+        self._max_pending = self.workers * 2
+        self._buffer = bytearray()
+        self._offset = 0
+        self._members = 0
+
+    def writable(self):
+        return True
+
+    def tell(self):
+        """Возвращает количество записанных несжатых байт."""
+        return self._offset
+
+    def write(self, data):
+        if self.closed:
+            raise ValueError('write() на закрытом файле')
+        data = memoryview(data)
+        self._buffer += data
+        self._offset += data.nbytes
+
+        while len(self._buffer) >= self.block_size:
+            block = bytes(self._buffer[:self.block_size])
+            del self._buffer[:self.block_size]
+            self._submit(block)
+        return data.nbytes
+
+    def flush(self):
+        """Дописывает уже сжатые блоки в fileobj.
+
+        Неполный блок остаётся в буфере, чтобы не дробить поток
+        на мелкие members.
+
+        """
+        while self._pending and self._pending[0].done():
+            self._write_member(self._pending.popleft())
+        self.fileobj.flush()
+
+    def close(self):
+        if self.closed:
+            return
+        try:
+            if self._buffer or not self._members and not self._pending:
+                # Пустой файл тоже должен быть корректным gzip.
+                self._submit(bytes(self._buffer))
+                self._buffer = bytearray()
+            while self._pending:
+                self._write_member(self._pending.popleft())
+            self.fileobj.flush()
+        finally:
+            self._executor.shutdown(wait=True)
+            super().close()
+            if self.close_fileobj:
+                self.fileobj.close()
+
+    def _submit(self, block):
+        self._pending.append(
+            self._executor.submit(
+                _compress_gzip_member,
+                block,
+                self.compresslevel,
+            ),
+        )
+        self._members += 1
+        while len(self._pending) > self._max_pending:
+            self._write_member(self._pending.popleft())
+
+    def _write_member(self, future):
+        self.fileobj.write(future.result())
+
+
+def get_stream_compressors():
+    """Возвращает словарь {метод сжатия: расширение файла}."""
+    compressors = dict(_SUFFIXES)
+    if lzma is None:
+        del compressors['lzma']
+    if zstandard is None:
+        del compressors['zstd']
+    return compressors
+
+
+def open_compressor(fileobj, compression_lib, compresslevel=5, workers=1):
+    """Открывает поток сжатия поверх fileobj.
+
+    При закрытии возвращённого объекта fileobj не закрывается.
+
+    Args:
+        fileobj: Файловый объект, в который пишется сжатый поток.
+        compression_lib: Строка, метод сжатия из get_stream_compressors.
+        compresslevel: Целое число, уровень сжатия.
+        workers: Целое число, количество потоков сжатия
+            (для gzip и zstd).
+
+    Raises:
+        ValueError, если метод сжатия неизвестен или недоступен.
+
+    """
+    if compression_lib not in get_stream_compressors():
+        raise ValueError(
+            'Метод сжатия недоступен: {0}'.format(compression_lib),
+        )
+    if compression_lib == 'gzip':
+        if workers > 1:
+            return ParallelGzipWriter(
+                fileobj,
+                compresslevel=compresslevel,
+                workers=workers,
+            )
+        return gzip.GzipFile(
+            fileobj=fileobj,
+            mode='wb',
+            compresslevel=compresslevel,
+            mtime=0,
+        )
+    if compression_lib == 'bzip':
+        return bz2.BZ2File(fileobj, 'wb', compresslevel=max(compresslevel, 1))
+    if compression_lib == 'lzma':
+        return lzma.LZMAFile(fileobj, 'wb', preset=compresslevel)
+    compressor = zstandard.ZstdCompressor(
+        level=compresslevel,
+        threads=workers if workers > 1 else 0,
+    )
+    return compressor.stream_writer(fileobj, closefd=False)
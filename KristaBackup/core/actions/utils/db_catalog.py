@@ -0,0 +1,174 @@
+# -*- encoding: utf-8 -*-
+
+"""Кэш каталога баз сервера PostgreSQL.
+
+Каталог (имена баз, размеры и маркеры изменений) запрашивается
+у сервера один раз за запуск и сохраняется в json файл, поэтому
+очистка и перемещение бэкапов в следующих запусках не обращаются
+к psql, пока запись не устарела.
+
+Формат файла:
+    {"<ключ подключения>": {
+        "updated": <время обновления, unix time>,
+        "databases": [[<имя>, <размер>, <маркер>], ...]
+    }}
+
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+
+DEFAULT_TTL = 60 * 60  # секунд
+
+
+class DatabaseCatalog:
+    """Каталог баз с кэшем в памяти и на диске.
+
+    Записи, загруженные в текущем процессе, хранятся в памяти
+    и не перечитываются до конца запуска (кроме refresh).
+
+    Attributes:
+        filepath: Строка, путь к json файлу кэша.
+        key: Строка, ключ подключения (пользователь, хост, порт).
+        loader: Функция без аргументов, возвращает список кортежей
+            (имя базы, размер в байтах, маркер изменений).
+        ttl: Число, время жизни записи на диске в секундах,
+            0 - запись на диске не используется.
+        readonly: Логическое значение, не сохранять кэш на диск.
+
+    """
+
+    _loaded = {}
+    _lock = threading.Lock()
+
+    def __init__(
+        self,
+        filepath,
+        key,
+        loader,
+        ttl=DEFAULT_TTL,
+        readonly=False,
+        logger=None,
+    ):
+        self.filepath = filepath
+        self.key = key
+        self.loader = loader
+        self.ttl = ttl
+        self.readonly = readonly
+        self.logger = logger or logging.getLogger()
+
+    def get(self, refresh=False):
+        """Возвращает список записей (имя, размер, маркер).
+
+        Args:
+            refresh: Логическое значение, запросить каталог у сервера,
+                даже если есть актуальная запись.
+
+        """
+        memory_key = (self.filepath, self.key)
+        with self._lock:
+            if not refresh and memory_key in self._loaded:
+                return self._loaded[memory_key]
+
+            entry = None if refresh else self._read_entry()
+            if entry is not None \
+                    and time.time() - entry['updated'] < self.ttl:
+                self.logger.debug(
+                    'Список баз получен из кэша %s',
+                    self.filepath,
+                )
+                databases = entry['databases']
+            else:
+                databases = self._load(entry)
+            self._loaded[memory_key] = databases
+            return databases
+
+    def refresh(self):
+        """Запрашивает каталог у сервера и обновляет кэш."""
+        return self.get(refresh=True)
+
+    def get_databases(self, refresh=False):
+        """Возвращает список имён баз."""
+        return [record[0] for record in self.get(refresh)]
+
+    def get_sizes(self, refresh=False):
+        """Возвращает словарь {имя базы: размер в байтах}."""
+        return {record[0]: record[1] for record in self.get(refresh)}
+
+    def get_markers(self, refresh=False):
+        """Возвращает словарь {имя базы: маркер изменений}."""
+        return {record[0]: record[2] for record in self.get(refresh)}
+
+    def _load(self, stale_entry):
+        try:
+            databases = [
+                (str(name), int(size), str(marker))
+                for name, size, marker in self.loader()
+            ]
+        except Exception as exc:
+            self.logger.warning('Ошибка при получении списка баз: %s', exc)
+            databases = []
+
+        if not databases:
+            if stale_entry is not None:
+                self.logger.warning(
+                    'Используется устаревший список баз из кэша %s',
+                    self.filepath,
+                )
+                return stale_entry['databases']
+            return databases
+
+        if not self.readonly:
+            try:
+                self._write_entry(databases)
+            except OSError as exc:
+                self.logger.warning(
+                    'Невозможно сохранить кэш списка баз: %s',
+                    exc,
+                )
+        return databases
+
+    def _read_entries(self):
+        try:
+            with open(self.filepath) as cache_file:
+                entries = json.load(cache_file)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as exc:
+            self.logger.warning(
+                'Кэш списка баз %s не прочитан: %s',
+                self.filepath,
+                exc,
+            )
+            return {}
+        return entries if isinstance(entries, dict) else {}
+
+    def _read_entry(self):
+        entry = self._read_entries().get(self.key)
+        try:
+            return {
+                'updated': float(entry['updated']),
+                'databases': [
+                    (str(name), int(size), str(marker))
+                    for name, size, marker in entry['databases']
+                ],
+            }
+        except (KeyError, TypeError, ValueError):
+            return None
+
+    def _write_entry(self, databases):
+        entries = self._read_entries()
+        entries[self.key] = {
+            'updated': time.time(),
+            'databases': [list(record) for record in databases],
+        }
+        dirpath = os.path.dirname(self.filepath)
+        if dirpath:
+            os.makedirs(dirpath, exist_ok=True)
+        tmp_filepath = '{0}.{1}.tmp'.format(self.filepath, os.getpid())
+        with open(tmp_filepath, 'w') as cache_file:
+            json.dump(entries, cache_file, ensure_ascii=False)
+        os.replace(tmp_filepath, self.filepath)
@@ -0,0 +1,136 @@
+# -*- encoding: utf-8 -*-
+
+"""Проверка путей/имён на попадание в исключения."""
+
+import re
+
+# Конструкции, которые меняют смысл паттерна внутри общего выражения:
+# глобальные флаги, обратные ссылки по номеру и по имени.
+_NON_COMBINABLE = re.compile(r'\(\?[aiLmsux]+\)|\\[1-9]|\(\?P=')
+
+# Конструкции, которые зависят от текста после совпадения.
+_CONTEXT_DEPENDENT = ('$', r'\Z', r'\b', r'\B', '(?=', '(?!')
+
+
+class ExclusionMatcher:
+    """Объединяет паттерны исключений в одно регулярное выражение.
+
+    Вместо цикла по паттернам с re.match на каждый путь выполняется
+    одна проверка скомпилированной альтернации. Паттерны, которые
+    нельзя безопасно объединить, проверяются по отдельности.
+
+    Дополнительно хранятся паттерны поддеревьев: если директория
+    совпадает с одним из них, то исключено всё её содержимое и
+    обходить её не нужно.
+
+    Attributes:
+        patterns: Список строк, исходные паттерны исключений.
+        tree_patterns: Список строк, паттерны исключённых поддеревьев.
+
+    """
+
+    def __init__(self, patterns=(), tree_patterns=()):
+        self.patterns = [_pattern_string(pattern) for pattern in patterns]
+        self.tree_patterns = [
+            _pattern_string(pattern) for pattern in tree_patterns
+        ]
+        self._combined, self._separate = _combine(self.patterns)
+        self._tree_combined, self._tree_separate = _combine(
+            self.tree_patterns,
+        )
+
+    def match(self, path):
+        """Возвращает True, если path попадает в исключения."""
+        if self._combined is not None and self._combined.match(path):
+            return True
+        for pattern in self._separate:
+            if pattern.match(path):
+                return True
+        return False
+
+    def excludes_tree(self, dirpath):
+        """Возвращает True, если исключено всё содержимое dirpath."""
+        if self._tree_combined is not None \
+                and self._tree_combined.match(dirpath):
+            return True
+        for pattern in self._tree_separate:
+            if pattern.match(dirpath):
+                return True
+        return False
+
+    def __bool__(self):
+        return bool(self.patterns)
+
+    def __repr__(self):
+        return 'ExclusionMatcher({0})'.format(self.patterns)
+
+
+def get_tree_pattern(pattern, use_re_in_patterns, prepare):
+    """Возвращает паттерн поддерева для исключения или None.
+
+    Поддерево исключено целиком, если паттерн имеет вид ``<префикс>/*``
+    (shell) или ``<префикс>/.*`` (regex), а директория полностью
+    совпадает с префиксом: любой путь внутри неё тогда совпадает
+    с исходным паттерном.
+
+    Args:
+        pattern: Строка, исходный паттерн исключения.
+        use_re_in_patterns: Логическое значение, паттерн в формате regex.
+        prepare: Функция перевода паттерна в regex (Action.prepare_pattern).
+
+    Returns:
+        Строка с regex, проверяемым через match, или None.
+
+    """
+    pattern = pattern.strip()
+    if use_re_in_patterns:
+        if not pattern.endswith('/.*'):
+            return None
+        prefix = pattern[:-3]
+        if not prefix or any(
+            token in prefix for token in _CONTEXT_DEPENDENT
+        ):
+            return None
+        tree_pattern = r'(?:{0})\Z'.format(prefix)
+    else:
+        if not pattern.endswith('/*') or len(pattern) < 3:
+            return None
+        tree_pattern = prepare(pattern[:-2])
+
+    try:
+        re.compile(tree_pattern)
+    except re.error:
+        return None
+    return tree_pattern
+
+
+def _pattern_string(pattern):
+    return getattr(pattern, 'pattern', pattern)
+
+
+def _combine(patterns):
+    """Компилирует паттерны в альтернацию.
+
+    Returns:
+        Кортеж (общее выражение или None, список отдельных выражений).
+
+    """
+    combinable = []
+    separate = []
+    for pattern in patterns:
+        if _NON_COMBINABLE.search(pattern):
+            separate.append(re.compile(pattern))
+        else:
+            combinable.append(pattern)
+
+    if not combinable:
+        return None, separate
+    try:
+        combined = re.compile(
+            '|'.join('(?:{0})'.format(pattern) for pattern in combinable),
+        )
+    except re.error:
+        # Например, одинаковые именованные группы в разных паттернах.
+        separate.extend(re.compile(pattern) for pattern in combinable)
+        return None, separate
+    return combined, separate
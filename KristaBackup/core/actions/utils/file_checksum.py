@@ -1,32 +1,389 @@
 # -*- encoding: utf-8 -*-
 
+"""Подсчёт хэшсумм файлов.
+
+Поддерживаемые алгоритмы:
+    sha1 - стандартный, файл с хэшсуммой содержит только её;
+    sha256, blake2b - из hashlib;
+    blake2b-tree - дерево BLAKE2b из двух уровней, листья по
+        TREE_LEAF_SIZE байт считаются параллельно;
+    xxh64, xxh128 - быстрые некриптографические суммы (модуль xxhash);
+    blake3 - BLAKE3 (модуль blake3).
+
+Для всех алгоритмов, кроме sha1, файл с хэшсуммой пишется в формате
+BSD (``sha256sum --tag``): ``<АЛГОРИТМ> (<имя файла>) = <хэш>``, поэтому
+из него понятно, каким алгоритмом проверять файл.
+
+Для директории (например, pg_dump --format=directory) в файл пишется
+строка на каждый файл с путём относительно директории: для sha1 в
+формате ``sha1sum`` (``<хэш>  <путь>``), для остальных - в формате BSD.
+
+"""
+
+import collections
 import hashlib
+import io
 import os
+from concurrent.futures import ThreadPoolExecutor
 
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
 
-def create_sha1sum_file(src_file, dest_file):
-    """Считает SHA1 сумму файла и записывает её в новый файл.
+try:
+    import blake3
+except ImportError:
+    blake3 = None
+
+DEFAULT_ALGORITHM = 'sha1'
+BUF_SIZE = 1024 * 1024  # буфер чтения, переиспользуется через readinto
+TREE_LEAF_SIZE = 4 * 1024 * 1024  # размер листа blake2b-tree
+
+_TAGS = {
+    'sha256': 'SHA256',
+    'blake2b': 'BLAKE2b',
+    'blake2b-tree': 'BLAKE2b-TREE',
+    'xxh64': 'XXH64',
+    'xxh128': 'XXH128',
+    'blake3': 'BLAKE3',
+}
+
+
+class Blake2bTree:
+    """Хэш BLAKE2b в режиме дерева с параллельным подсчётом листьев.
+
+    Данные режутся на листья по leaf_size байт, листья хэшируются
+    в пуле потоков (hashlib отпускает GIL), корень считается от
+    хэшей листьев по порядку. Параметры дерева: fanout=0, depth=2,
+    inner_size=64, поэтому результат не зависит от числа потоков.
+
+    """
+
+    name = 'blake2b-tree'
+    digest_size = 64
+
+    def __init__(self, workers=1, leaf_size=TREE_LEAF_SIZE):
+        self.leaf_size = leaf_size
+        self._params = {
+            'fanout': 0,
+            'depth': 2,
+            'leaf_size': leaf_size,
+            'inner_size': self.digest_size,
+        }
+        self._root = hashlib.blake2b(
+            node_depth=1,
+            last_node=True,
+            **self._params,
+        )
+        self._executor = None
+        if workers > 1:
+            self._executor = ThreadPoolExecutor(max_workers=workers)
+        self._pending = collections.deque()
+        self._max_pending = max(workers, 1) * 2
+        self._buffer = bytearray()
+        self._leaves = 0
+        self._digest = None
+
+    def update(self, data):
+        if self._digest is not None:
+            raise ValueError('update() после подсчёта хэша')
+        view = memoryview(data).cast('B')
+        offset = 0
+        while offset < len(view):
+            # Последний лист помечается last_node, поэтому полный лист
+            # отправляется только когда за ним есть ещё данные.
+            if len(self._buffer) == self.leaf_size:
+                leaf, self._buffer = self._buffer, bytearray()
+                self._submit(leaf, last_node=False)
+            size = min(self.leaf_size - len(self._buffer), len(view) - offset)
+            self._buffer += view[offset:offset + size]
+            offset += size
+
+    def digest(self):
+        if self._digest is None:
+            leaf, self._buffer = self._buffer, bytearray()
+            self._submit(leaf, last_node=True)
+            while self._pending:
+                self._root.update(self._pending.popleft().result())
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+            self._digest = self._root.digest()
+        return self._digest
+
+    def hexdigest(self):
+        return self.digest().hex()
+
+    def _submit(self, leaf, last_node):
+        args = (leaf, self._leaves, last_node)
+        self._leaves += 1
+        if self._executor is None:
+            self._root.update(self._hash_leaf(*args))
+            return
+        self._pending.append(self._executor.submit(self._hash_leaf, *args))
+        while len(self._pending) > self._max_pending:
+            self._root.update(self._pending.popleft().result())
+
+    def _hash_leaf(self, leaf, node_offset, last_node):
+        return hashlib.blake2b(
+            leaf,
+            node_offset=node_offset,
+            node_depth=0,
+            last_node=last_node,
+            **self._params,
+        ).digest()
+
+
+def get_hash_algorithms():
+    """Возвращает список доступных алгоритмов."""
+    algorithms = [DEFAULT_ALGORITHM, 'sha256', 'blake2b', 'blake2b-tree']
+    if xxhash is not None:
+        algorithms.extend(('xxh64', 'xxh128'))
+    if blake3 is not None:
+        algorithms.append('blake3')
+    return algorithms
+
+
+def new_hash(algorithm=DEFAULT_ALGORITHM, workers=1):
+    """Создаёт объект хэша с методами update и hexdigest.
+
+    Args:
+        algorithm: Строка, название алгоритма.
+        workers: Целое число, количество потоков для алгоритмов,
+            которые считаются параллельно (blake2b-tree, blake3).
+
+    Raises:
+        ValueError, если алгоритм неизвестен или недоступен.
+
+    """
+    if algorithm not in get_hash_algorithms():
+        raise ValueError(
+            'Алгоритм хэширования недоступен: {0}'.format(algorithm),
+        )
+    if algorithm == 'blake2b-tree':
+        return Blake2bTree(workers=workers)
+    if algorithm == 'xxh64':
+        return xxhash.xxh64()
+    if algorithm == 'xxh128':
+        return xxhash.xxh3_128()
+    if algorithm == 'blake3':
+        if workers > 1:
+            return blake3.blake3(max_threads=workers)
+        return blake3.blake3()
+    return hashlib.new(algorithm)
+
+
+def format_checksum(hash_value, algorithm=DEFAULT_ALGORITHM, filename=None):
+    """Возвращает содержимое файла с хэшсуммой.
+
+    Для sha1 это только хэшсумма, как в прежних версиях,
+    для остальных алгоритмов - строка в формате BSD.
+
+    """
+    if algorithm == DEFAULT_ALGORITHM:
+        return hash_value
+    return '{0} ({1}) = {2}\n'.format(
+        _TAGS[algorithm],
+        filename or '-',
+        hash_value,
+    )
+
+
+def hash_file(src_file, algorithm=DEFAULT_ALGORITHM, workers=1):
+    """Считает хэшсумму файла.
+
+    Returns:
+        Строку, хэшсумму в hex.
+
+    """
+    hash_obj = new_hash(algorithm, workers)
+    buf = bytearray(BUF_SIZE)
+    view = memoryview(buf)
+    with open(src_file, 'rb', buffering=0) as file_content:
+        while True:
+            size = file_content.readinto(buf)
+            if not size:
+                break
+            hash_obj.update(view[:size])
+    return hash_obj.hexdigest()
+
+
+def create_hash_file(
+    src_file,
+    dest_file,
+    algorithm=DEFAULT_ALGORITHM,
+    workers=1,
+):
+    """Считает хэшсумму файла и записывает её в новый файл.
 
     Args:
         src_file: Строка, путь к файлу хэш которого требуется найти.
         dest_file: Строка, путь к файлу, в который нужно записать результат.
+        algorithm: Строка, алгоритм хэширования.
+        workers: Целое число, количество потоков подсчёта.
+
+    Returns:
+        Строку, хэшсумму в hex.
 
     Raises:
         FileNotFoundError, если src_file не существует/ не является файлом
         PermitionError, если нет доступа к src_file или dest_file
+        ValueError, если алгоритм неизвестен или недоступен.
 
     """
+    if os.path.isdir(src_file):
+        return create_directory_hash_file(
+            src_file,
+            dest_file,
+            algorithm,
+            workers,
+        )
     if not os.path.isfile(src_file):
         raise FileNotFoundError('Исходный файл не найден')
-    buf_size = 65536
-    sha1 = hashlib.sha1()
+    hash_value = hash_file(src_file, algorithm, workers)
+    return write_checksum_file(
+        dest_file,
+        hash_value,
+        algorithm,
+        os.path.basename(src_file),
+    )
+
+
+def create_directory_hash_file(
+    src_dir,
+    dest_file,
+    algorithm=DEFAULT_ALGORITHM,
+    workers=1,
+):
+    """Считает хэшсуммы всех файлов директории и записывает их в файл.
+
+    Файлы считаются в workers потоков, строки отсортированы по пути.
+
+    Returns:
+        Строку, хэшсумму записанного списка тем же алгоритмом.
+
+    """
+    filepaths = []
+    for dirpath, _, filenames in os.walk(src_dir):
+        for filename in filenames:
+            filepath = os.path.join(dirpath, filename)
+            filepaths.append(os.path.relpath(filepath, src_dir))
+    filepaths.sort()
+
+    def hash_relpath(relpath):
+        return hash_file(os.path.join(src_dir, relpath), algorithm)
+
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+        hash_values = list(executor.map(hash_relpath, filepaths))
+
+    lines = []
+    for relpath, hash_value in zip(filepaths, hash_values):
+        if algorithm == DEFAULT_ALGORITHM:
+            lines.append('{0}  {1}\n'.format(hash_value, relpath))
+        else:
+            lines.append(format_checksum(hash_value, algorithm, relpath))
+    content = ''.join(lines)
     with open(dest_file, 'w') as dest_file_:
-        with open(src_file, 'rb') as file_content:
-            while True:
-                part = file_content.read(buf_size)
-                if not part:
-                    break
-                sha1.update(part)
-        hash_value = sha1.hexdigest()
-        dest_file_.write(hash_value)
-        return hash_value
+        dest_file_.write(content)
+
+    list_hash = new_hash(algorithm)
+    list_hash.update(content.encode('utf-8', 'surrogateescape'))
+    return list_hash.hexdigest()
+
+
+def create_sha1sum_file(src_file, dest_file):
+    """Считает SHA1 сумму файла и записывает её в новый файл.
+
+    Args:
+        src_file: Строка, путь к файлу хэш которого требуется найти.
+        dest_file: Строка, путь к файлу, в который нужно записать результат.
+
+    Raises:
+        FileNotFoundError, если src_file не существует/ не является файлом
+        PermitionError, если нет доступа к src_file или dest_file
+
+    """
+    return create_hash_file(src_file, dest_file)
+
+
+def write_checksum_file(
+    dest_file,
+    hash_value,
+    algorithm=DEFAULT_ALGORITHM,
+    filename=None,
+):
+    """Записывает готовую хэшсумму в файл.
+
+    Args:
+        dest_file: Строка, путь к файлу с хэшсуммой.
+        hash_value: Строка, хэшсумма в hex.
+        algorithm: Строка, алгоритм, которым она посчитана.
+        filename: Строка, имя файла, к которому относится хэшсумма.
+
+    Returns:
+        Строку, hash_value.
+
+    """
+    with open(dest_file, 'w') as dest_file_:
+        dest_file_.write(format_checksum(hash_value, algorithm, filename))
+    return hash_value
+
+
+class HashingWriter(io.BufferedIOBase):
+    """Файловый объект, который считает хэш записываемых данных.
+
+    Данные передаются в fileobj без изменений, поэтому после записи
+    хэшсумма файла известна без повторного чтения.
+
+    Attributes:
+        fileobj: Файловый объект, в который пишутся данные.
+        algorithm: Строка, алгоритм хэширования.
+        close_fileobj: Логическое значение, закрывать fileobj при закрытии.
+
+    """
+
+    def __init__(
+        self,
+        fileobj,
+        algorithm=DEFAULT_ALGORITHM,
+        close_fileobj=False,
+        workers=1,
+    ):
+        super().__init__()
+        self.fileobj = fileobj
+        self.algorithm = algorithm
+        self.close_fileobj = close_fileobj
+        self._hash = new_hash(algorithm, workers)
+        self._offset = 0
+
+    def writable(self):
+        return True
+
+    def tell(self):
+        """Возвращает количество записанных байт."""
+        return self._offset
+
+    def write(self, data):
+        if self.closed:
+            raise ValueError('write() на закрытом файле')
+        data = memoryview(data)
+        self._hash.update(data)
+        self.fileobj.write(data)
+        self._offset += data.nbytes
+        return data.nbytes
+
+    def flush(self):
+        self.fileobj.flush()
+
+    def close(self):
+        if self.closed:
+            return
+        try:
+            self.fileobj.flush()
+        finally:
+            super().close()
+            if self.close_fileobj:
+                self.fileobj.close()
+
+    def hexdigest(self):
+        return self._hash.hexdigest()
@@ -0,0 +1,115 @@
+# -*- encoding: utf-8 -*-
+
+"""Связывание файлов без копирования данных.
+
+Жёсткая ссылка (hardlink) - тот же inode, поэтому права, владелец
+и время изменения у ссылок общие. Reflink (ioctl FICLONE, btrfs, xfs,
+ocfs2 и др.) - новый inode с общими блоками данных и copy-on-write,
+поэтому атрибуты копии независимы.
+
+"""
+
+import errno
+import fcntl
+import os
+
+FICLONE = 0x40049409  # _IOW(0x94, 9, int) из linux/fs.h
+
+LINK_MODES = ('auto', 'reflink', 'hardlink', 'copy')
+
+# Ошибки, после которых способ больше не пробуется.
+_UNSUPPORTED = {
+    errno.EOPNOTSUPP,
+    errno.ENOTTY,
+    errno.EINVAL,
+    errno.EXDEV,
+    errno.ENOSYS,
+}
+
+# Ошибки отдельного файла (запрет связывания, предел ссылок на inode),
+# такой файл копируется, а способ остаётся включённым.
+_FILE_ERRORS = {
+    errno.EPERM,
+    errno.EMLINK,
+}
+
+
+def reflink(src, dst):
+    """Создаёт dst как reflink копию src.
+
+    Raises:
+        OSError, если файловая система не поддерживает reflink.
+
+    """
+    with open(src, 'rb') as src_file:
+        dst_fd = os.open(dst, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        try:
+            fcntl.ioctl(dst_fd, FICLONE, src_file.fileno())
+        except OSError:
+            os.close(dst_fd)
+            os.remove(dst)
+            raise
+        os.close(dst_fd)
+
+
+class FileLinker:
+    """Связывает файл с существующей копией выбранным способом.
+
+    Если способ не поддерживается файловой системой, то он
+    отключается до конца работы, чтобы не повторять ошибку
+    для каждого файла.
+
+    Attributes:
+        mode: Строка, способ: auto (reflink, иначе hardlink),
+            reflink, hardlink или copy (не связывать).
+        stats: Словарь {способ: количество файлов}.
+
+    """
+
+    def __init__(self, mode='auto'):
+        if mode not in LINK_MODES:
+            raise ValueError('Неизвестный способ связывания: {0}'.format(mode))
+        self.mode = mode
+        self.stats = {'reflink': 0, 'hardlink': 0}
+        self._reflink = mode in ('auto', 'reflink')
+        self._hardlink = mode in ('auto', 'hardlink')
+
+    def link(self, src, dst, shared_attributes=True):
+        """Создаёт dst, связанный с src.
+
+        Args:
+            src: Строка, путь к существующему файлу.
+            dst: Строка, путь к новому файлу (не должен существовать).
+            shared_attributes: Логическое значение, атрибуты dst
+                совпадают с src, поэтому допустима жёсткая ссылка.
+
+        Returns:
+            Строку со способом (reflink, hardlink) или None,
+            если файл нужно скопировать.
+
+        """
+        if self._reflink:
+            try:
+                reflink(src, dst)
+            except OSError as exc:
+                if exc.errno in _FILE_ERRORS:
+                    return None
+                if exc.errno not in _UNSUPPORTED:
+                    raise
+                self._reflink = False
+            else:
+                self.stats['reflink'] += 1
+                return 'reflink'
+        if self._hardlink and shared_attributes:
+            try:
+                os.link(src, dst)
+            except OSError as exc:
+                if exc.errno in _FILE_ERRORS:
+                    return None
+                if exc.errno not in _UNSUPPORTED:
+                    raise
+                self._hardlink = False
+            else:
+                self.stats['hardlink'] += 1
+                return 'hardlink'
+        return None
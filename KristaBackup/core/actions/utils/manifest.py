@@ -0,0 +1,268 @@
+# -*- encoding: utf-8 -*-
+
+"""Бинарный индекс (манифест) файлов архива для инкрементальных бэкапов.
+
+Формат файла:
+    заголовок: magic (4 байта), версия (2), флаги (2), число записей (8);
+    записи по 24 байта, отсортированные по хэшу пути:
+        хэш пути (8 байт, начало sha1), mtime в наносекундах (8),
+        размер (8).
+
+Все числа big-endian, поэтому порядок байт записей совпадает с порядком
+хэшей и поиск выполняется бинарным поиском прямо по mmap файла, без
+загрузки индекса в объекты python.
+
+"""
+
+import hashlib
+import heapq
+import mmap
+import os
+import struct
+from decimal import Decimal, InvalidOperation
+
+MAGIC = b'KBMF'
+VERSION = 2  # в версии 1 путь хэшировался blake2b (python 3.6+)
+
+FLAG_COARSE_MTIME = 1
+"""Флаг: mtime получены из float (например, из list файла)."""
+
+COARSE_MTIME_TOLERANCE = 1000
+"""Допустимое расхождение mtime в нс для индекса с FLAG_COARSE_MTIME."""
+
+_HEADER = struct.Struct('>4sHHQ')
+_VALUE = struct.Struct('>qQ')
+_HASH_SIZE = 8
+_RECORD_SIZE = _HASH_SIZE + _VALUE.size
+
+RUN_RECORDS = 1 << 19
+"""Количество записей, которое ManifestWriter сортирует в памяти."""
+
+
+class ManifestError(Exception):
+    pass
+
+
+def path_hash(path):
+    """Возвращает 8 байт хэша пути."""
+    return hashlib.sha1(
+        path.encode('utf-8', 'surrogateescape'),
+    ).digest()[:_HASH_SIZE]
+
+
+class ManifestWriter:
+    """Записывает манифест.
+
+    Записи копятся упакованными в bytearray. Когда набирается
+    RUN_RECORDS записей, они сортируются и сбрасываются во временный
+    манифест, при закрытии временные манифесты сливаются через
+    merge_manifests. Файл заменяется атомарно.
+
+    """
+
+    def __init__(self, filepath, flags=0):
+        self.filepath = filepath
+        self.flags = flags
+        self._buffer = bytearray()
+        self._runs = []
+        self._count = 0
+        self._closed = False
+
+    def add(self, path, mtime_ns, size):
+        self._buffer += path_hash(path)
+        self._buffer += _VALUE.pack(mtime_ns, size)
+        self._count += 1
+        if len(self._buffer) >= RUN_RECORDS * _RECORD_SIZE:
+            self._spill()
+
+    def _sorted_records(self):
+        data = bytes(self._buffer)
+        self._buffer = bytearray()
+        records = [
+            data[offset:offset + _RECORD_SIZE]
+            for offset in range(0, len(data), _RECORD_SIZE)
+        ]
+        del data
+        records.sort()
+        return records
+
+    def _spill(self):
+        run_filepath = '{0}.run{1}'.format(self.filepath, len(self._runs))
+        self._runs.append(run_filepath)
+        records = self._sorted_records()
+        _write_manifest(run_filepath, self.flags, len(records), records)
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        if not self._runs:
+            records = self._sorted_records()
+            _write_manifest(self.filepath, self.flags, len(records), records)
+            return
+        try:
+            if self._buffer:
+                self._spill()
+            merge_manifests(self._runs, self.filepath)
+        finally:
+            for run_filepath in self._runs:
+                if os.path.exists(run_filepath):
+                    os.remove(run_filepath)
+
+    def __len__(self):
+        return self._count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class Manifest:
+    """Манифест, открытый на чтение через mmap.
+
+    Raises:
+        ManifestError, если файл повреждён или имеет другой формат.
+
+    """
+
+    def __init__(self, filepath):
+        self.filepath = filepath
+        self._file = open(filepath, 'rb')
+        try:
+            header = self._file.read(_HEADER.size)
+            if len(header) != _HEADER.size:
+                raise ManifestError('Неполный заголовок {0}'.format(filepath))
+            magic, version, self.flags, self.count = _HEADER.unpack(header)
+            if magic != MAGIC or version != VERSION:
+                raise ManifestError(
+                    'Неизвестный формат индекса {0}'.format(filepath),
+                )
+            expected_size = _HEADER.size + self.count * _RECORD_SIZE
+            if os.fstat(self._file.fileno()).st_size != expected_size:
+                raise ManifestError('Повреждён индекс {0}'.format(filepath))
+            self._data = mmap.mmap(
+                self._file.fileno(),
+                0,
+                access=mmap.ACCESS_READ,
+            )
+        except Exception:
+            self._file.close()
+            raise
+
+        if self.flags & FLAG_COARSE_MTIME:
+            self.tolerance = COARSE_MTIME_TOLERANCE
+        else:
+            self.tolerance = 0
+
+    def get(self, path):
+        """Возвращает (mtime_ns, size) для пути или None."""
+        key = path_hash(path)
+        data = self._data
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            offset = _HEADER.size + middle * _RECORD_SIZE
+            if data[offset:offset + _HASH_SIZE] < key:
+                low = middle + 1
+            else:
+                high = middle
+        offset = _HEADER.size + low * _RECORD_SIZE
+        if low < self.count and data[offset:offset + _HASH_SIZE] == key:
+            return _VALUE.unpack_from(data, offset + _HASH_SIZE)
+        return None
+
+    def is_unchanged(self, path, mtime_ns, size):
+        """Проверяет совпадение mtime и размера файла с манифестом."""
+        record = self.get(path)
+        if record is None:
+            return False
+        return record[1] == size and abs(record[0] - mtime_ns) <= self.tolerance
+
+    def close(self):
+        self._data.close()
+        self._file.close()
+
+    def __len__(self):
+        return self.count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def convert_listfile(list_filepath, manifest_filepath, logger=None):
+    """Создаёт манифест из list файла (CSV).
+
+    Первая строка list файла (путь к архиву) пропускается,
+    строки с ошибками пропускаются.
+
+    Returns:
+        Целое число, количество записей в манифесте.
+
+    """
+    writer = ManifestWriter(manifest_filepath, flags=FLAG_COARSE_MTIME)
+    with open(list_filepath, 'r') as lines:
+        lines.readline()
+        for line_num, line in enumerate(lines):
+            try:
+                mtime, size, filename = line.rstrip('\n').split(',', 2)
+                mtime_ns = int(Decimal(mtime) * 1000000000)
+                size = int(float(size))
+            except (ValueError, InvalidOperation):
+                if logger:
+                    logger.warning(
+                        'Ошибка в строке %s, файл будет пропущен: %s',
+                        line_num,
+                        line,
+                    )
+                continue
+            writer.add(filename, mtime_ns, size)
+    count = len(writer)
+    writer.close()
+    return count
+
+
+def merge_manifests(manifest_filepaths, dest_filepath):
+    """Объединяет манифесты с непересекающимися путями в один.
+
+    Записи манифестов уже отсортированы, поэтому они сливаются
+    потоково, без загрузки в память.
+
+    Returns:
+        Целое число, количество записей в манифесте.
+
+    """
+    manifests = []
+    try:
+        for filepath in manifest_filepaths:
+            manifests.append(Manifest(filepath))
+        flags = 0
+        for manifest in manifests:
+            flags |= manifest.flags
+        count = sum(manifest.count for manifest in manifests)
+        _write_manifest(dest_filepath, flags, count, heapq.merge(
+            *(_iter_records(manifest) for manifest in manifests)
+        ))
+    finally:
+        for manifest in manifests:
+            manifest.close()
+    return count
+
+
+def _iter_records(manifest):
+    data = manifest._data
+    end = _HEADER.size + manifest.count * _RECORD_SIZE
+    for offset in range(_HEADER.size, end, _RECORD_SIZE):
+        yield data[offset:offset + _RECORD_SIZE]
+
+
+def _write_manifest(filepath, flags, count, records):
+    tmp_filepath = '{0}.tmp'.format(filepath)
+    with open(tmp_filepath, 'wb') as manifest_file:
+        manifest_file.write(_HEADER.pack(MAGIC, VERSION, flags, count))
+        manifest_file.writelines(records)
+    os.replace(tmp_filepath, filepath)
@@ -0,0 +1,131 @@
+# -*- encoding: utf-8 -*-
+
+"""Упреждающее чтение файлов для записи в архив."""
+
+import collections
+from concurrent.futures import ThreadPoolExecutor
+
+MEMORY_LIMIT = 256 * 1024 * 1024  # объём прочитанных, но не записанных данных
+THRESHOLD = 16 * 1024 * 1024  # файлы больше не читаются заранее
+
+
+def read_file(filepath, size):
+    """Читает не больше size байт файла."""
+    with open(filepath, 'rb') as fileobj:
+        return fileobj.read(size)
+
+
+class ReadAhead:
+    """Очередь с упреждающим чтением файлов в пуле потоков.
+
+    Обработчики, переданные в submit, вызываются в том же потоке
+    и строго в порядке submit, поэтому запись в архив остаётся
+    последовательной, а результат - детерминированным. Пока
+    записывается текущий файл, следующие читаются в фоне.
+
+    Содержимое файла передаётся обработчику в аргументе content.
+    Файлы больше threshold не читаются заранее, для них, как и при
+    ошибке чтения, content равен None и обработчик читает файл сам.
+    Объём прочитанных, но ещё не обработанных данных ограничен
+    memory_limit: при его превышении submit ждёт записи первых
+    файлов очереди.
+
+    Attributes:
+        workers: Целое число, количество потоков чтения.
+        memory_limit: Целое число, ограничение памяти в байтах.
+        threshold: Целое число, максимальный размер файла для
+            упреждающего чтения.
+        reader: Функция чтения (filepath, size) -> bytes.
+
+    """
+
+    def __init__(
+        self,
+        workers=4,
+        memory_limit=MEMORY_LIMIT,
+        threshold=THRESHOLD,
+        reader=read_file,
+    ):
+        self.workers = workers
+        self.memory_limit = memory_limit
+        self.threshold = min(threshold, memory_limit)
+        self.reader = reader
+
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+        self._queue = collections.deque()
+        self._max_pending = workers * 64
+        self._pending_bytes = 0
+
+    def submit(self, handler, filepath=None, size=0):
+        """Ставит обработчик в очередь.
+
+        Args:
+            handler: Функция, вызывается как handler(content=...),
+                если задан filepath, иначе как handler().
+            filepath: Строка или None, путь к файлу для чтения.
+            size: Целое число, размер файла.
+
+        """
+        future = None
+        if filepath is not None:
+            if size <= self.threshold:
+                while self._queue and (
+                    self._pending_bytes + size > self.memory_limit
+                ):
+                    self._handle_first()
+                future = self._executor.submit(self.reader, filepath, size)
+                self._pending_bytes += size
+            else:
+                size = 0
+        self._queue.append((handler, filepath, future, size))
+
+        while self._queue and (
+            len(self._queue) > self._max_pending or self._is_first_ready()
+        ):
+            self._handle_first()
+
+    def close(self):
+        """Обрабатывает оставшуюся очередь и останавливает потоки."""
+        try:
+            while self._queue:
+                self._handle_first()
+        finally:
+            self._executor.shutdown(wait=True)
+
+    def cancel(self):
+        """Отбрасывает очередь без обработки."""
+        for _, _, future, _ in self._queue:
+            if future is not None:
+                future.cancel()
+        self._queue.clear()
+        self._pending_bytes = 0
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.cancel()
+
+    def _is_first_ready(self):
+        future = self._queue[0][2]
+        return future is None or future.done()
+
+    def _handle_first(self):
+        handler, filepath, future, size = self._queue.popleft()
+        self._pending_bytes -= size
+        if filepath is None:
+            handler()
+            return
+        content = None
+        if future is not None:
+            try:
+                content = future.result()
+            except OSError:
+                # Обработчик прочитает файл сам и обработает ошибку.
+                content = None
+        handler(content=content)
+
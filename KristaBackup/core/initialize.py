@@ -65,6 +65,64 @@ def _handle_run_option(args):
     Runner(args.unit, args.dry).start_task()
 
 
+def _handle_catalog_option(args):
+    """Обновляет кэш каталога баз для действий pgdump."""
+    from core.action_builder import ActionBuilder
+    from core.actions import PgDump
+
+    _initialize_configuration(args.unit)
+    _configure_logging(args.verbose)
+    logger = Logging.get_generic_logger()
+
+    actions_records = AppConfig.conf().setdefault('actions', {})
+    action_builder = ActionBuilder(actions_records)
+    found = False
+    for action_name in sorted(actions_records):
+        if args.unit not in (constants.ALL, action_name):
+            continue
+        action = action_builder(action_name)
+        if not isinstance(action, PgDump):
+            continue
+        found = True
+        catalog = action.get_catalog()
+        print('[*]', action_name, catalog.key)
+        for dbname, size, marker in catalog.refresh():
+            print('   ', dbname, size, marker)
+
+    if not found:
+        logger.error('Отсутствует действие pgdump %s', args.unit)
+        raise BaseException
+
+
+def _handle_restore_option(args):
+    """Восстанавливает файлы из снимка ArchiverDedup."""
+    from core.actions.utils.chunk_store import (
+        ChunkStoreError, restore_snapshot,
+    )
+
+    logger = Logging.get_generic_logger()
+    try:
+        restored = restore_snapshot(
+            args.snapshot,
+            args.target,
+            store_path=args.store_path,
+            prefix=args.restore_path,
+            logger=logger,
+        )
+    except (OSError, ChunkStoreError) as exc:
+        logger.error(
+            'Ошибка восстановления из снимка %s: %s',
+            args.snapshot,
+            exc,
+        )
+        raise BaseException
+    logger.info(
+        'Из снимка %s восстановлено записей: %s',
+        args.snapshot,
+        restored,
+    )
+
+
 def _handle_web_option(args):
     if args.command == constants.START_OPT_NAME:
         if args.api:
@@ -142,5 +200,9 @@ def switch_choice(args):
         crontab_manager.activate_task(args.unit)
     elif args.option in constants.DISABLE_OPTS_NAME:
         crontab_manager.deactivate_task(args.unit)
+    elif args.option == constants.CATALOG_OPT_NAME:
+        _handle_catalog_option(args)
+    elif args.option == constants.RESTORE_OPT_NAME:
+        _handle_restore_option(args)
     elif args.option == 'web':
         _handle_web_option(args)
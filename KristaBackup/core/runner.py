@@ -4,7 +4,8 @@ import logging
 import sys
 
 from common import arguments
-from common.procutil import check_process, get_executable_filename
+from common.Logging import flush_logging
+from common.proclock import ProcessLock
 from common.YamlConfig import AppConfig
 from core.action_builder import ActionBuilder
 from common.arguments import constants
@@ -49,6 +50,7 @@ class Runner:
         task_record = appconf.setdefault('schedule', {}).get(unit_name)
 
         if task_record is not None and not dry:
+            self.logger.info('Запускается задание %s', unit_name)
             self.action_records = task_record.get('actions')
             if not self.action_records:
                 self.logger.error(
@@ -113,32 +115,42 @@ class Runner:
         """Запускает последовательное выполнение сформированных действий.
 
         Если в конфигурации параметр allow_parallel имеет значение
-        False, то перед запуском сначала происходит проверка отсутствия
-        параллельных процессов выполнения заданий и только потом запуск.
+        False, то перед запуском захватывается общая блокировка
+        заданий. Если она занята, то задание ждёт её освобождения
+        lock_timeout секунд (по умолчанию не ждёт) и завершается.
         """
+        lock = None
         if not AppConfig.conf().get('allow_parallel', True):
-            keywords = [get_executable_filename(), constants.RUN_OPT_NAME]
-            pid = check_process(keywords)
-            if pid:
+            lock = ProcessLock(constants.RUN_OPT_NAME)
+            timeout = AppConfig.conf().get('lock_timeout', 0)
+            if not lock.acquire(timeout):
                 self.logger.error(
                     'Другое задание уже запущено: PID: %s',
-                    pid,
+                    lock.get_owner_pid(),
                 )
                 sys.exit(-1)
 
-        for action in self.actions:
-            self.logger.info('Запускается действие %s', action.name)
-            try:
-                success = action.start()
-            except KeyboardInterrupt:
-                self.logger.warning('Выполнение прервано нажатием Ctrl+C')
-                break
-
-            if success:
-                self.logger.info('Выполнено действие %s', action.name)
-            else:
-                self.logger.error(
-                    'Действие %s выполнено неудачно, выполнение остановлено',
-                    action.name,
-                )
-                break
+        try:
+            for action in self.actions:
+                self.logger.info('Запускается действие %s', action.name)
+                try:
+                    success = action.start()
+                except KeyboardInterrupt:
+                    self.logger.warning('Выполнение прервано нажатием Ctrl+C')
+                    break
+
+                if success:
+                    self.logger.info('Выполнено действие %s', action.name)
+                else:
+                    self.logger.error(
+                        'Действие %s выполнено неудачно, '
+                        'выполнение остановлено',
+                        action.name,
+                    )
+                    break
+        finally:
+            # Записи из очереди лога должны попасть в файлы и после
+            # прерывания по Ctrl+C.
+            flush_logging()
+            if lock is not None:
+                lock.release()
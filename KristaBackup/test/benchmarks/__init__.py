@@ -0,0 +1,6 @@
+"""Бенчмарки производительности.
+
+Не запускаются через unittest, пример запуска из каталога KristaBackup:
+    python3 -m test.benchmarks.bench_compression
+
+"""
@@ -0,0 +1,70 @@
+"""Бенчмарк алгоритмов хэширования файлов.
+
+Сравнивает прежний create_sha1sum_file (чтение по 64 Кб) и hash_file
+с разными алгоритмами и количеством потоков.
+
+"""
+
+import argparse
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+
+from core.actions.utils import get_hash_algorithms, hash_file
+
+
+def old_sha1(filepath):
+    sha1 = hashlib.sha1()
+    with open(filepath, 'rb') as file_content:
+        while True:
+            part = file_content.read(65536)
+            if not part:
+                break
+            sha1.update(part)
+    return sha1.hexdigest()
+
+
+def measure(func, *args):
+    started = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--size', type=int, default=512, help='Мб')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp()
+    try:
+        filepath = os.path.join(root, 'data.bin')
+        with open(filepath, 'wb') as file:
+            for _ in range(args.size):
+                file.write(os.urandom(1024 * 1024))
+        # Прогрев кэша страниц, чтобы сравнивать подсчёт, а не диск.
+        old_sha1(filepath)
+
+        results = [('sha1, 64 Кб read', measure(old_sha1, filepath))]
+        for algorithm in get_hash_algorithms():
+            results.append((
+                algorithm,
+                measure(hash_file, filepath, algorithm),
+            ))
+            if algorithm in ('blake2b-tree', 'blake3') and args.workers > 1:
+                results.append((
+                    '{0}, потоков {1}'.format(algorithm, args.workers),
+                    measure(hash_file, filepath, algorithm, args.workers),
+                ))
+    finally:
+        shutil.rmtree(root)
+
+    for name, elapsed in results:
+        print('{0}: {1:.3f} с, {2:.0f} Мб/с'.format(
+            name, elapsed, args.size / elapsed))
+
+
+if __name__ == '__main__':
+    main()
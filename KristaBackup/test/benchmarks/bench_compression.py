@@ -0,0 +1,72 @@
+"""Бенчмарк параллельного сжатия gzip.
+
+Показывает пропускную способность ParallelGzipWriter в зависимости
+от количества потоков сжатия.
+
+"""
+
+import argparse
+import gzip
+import io
+import os
+import random
+import time
+
+from core.actions.utils import ParallelGzipWriter
+
+
+def generate_data(size):
+    """Генерирует частично сжимаемые данные, похожие на текст."""
+    words = [os.urandom(random.randint(2, 10)).hex() for _ in range(4096)]
+    chunks = []
+    total = 0
+    while total < size:
+        chunk = ' '.join(random.choice(words) for _ in range(1024)).encode()
+        chunks.append(chunk)
+        total += len(chunk)
+    return b''.join(chunks)[:size]
+
+
+def measure(data, workers, compresslevel):
+    output = io.BytesIO()
+    started = time.perf_counter()
+    if workers == 0:
+        with gzip.GzipFile(fileobj=output, mode='wb',
+                           compresslevel=compresslevel) as archive:
+            archive.write(data)
+    else:
+        writer = ParallelGzipWriter(
+            output,
+            compresslevel=compresslevel,
+            workers=workers,
+        )
+        writer.write(data)
+        writer.close()
+    elapsed = time.perf_counter() - started
+    return elapsed, len(output.getvalue())
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--size', type=int, default=256, help='размер, МБ')
+    parser.add_argument('--level', type=int, default=5)
+    args = parser.parse_args()
+
+    data = generate_data(args.size * 1024 * 1024)
+    workers_list = [1]
+    while workers_list[-1] * 2 <= (os.cpu_count() or 1):
+        workers_list.append(workers_list[-1] * 2)
+
+    print('{0:>10} {1:>10} {2:>10} {3:>8}'.format(
+        'потоков', 'МБ/с', 'размер', 'ускор.'))
+    base_elapsed, size = measure(data, 0, args.level)
+    print('{0:>10} {1:>10.1f} {2:>10} {3:>8}'.format(
+        'gzip', args.size / base_elapsed, size, '1.00'))
+    for workers in workers_list:
+        elapsed, size = measure(data, workers, args.level)
+        print('{0:>10} {1:>10.1f} {2:>10} {3:>8.2f}'.format(
+            workers, args.size / elapsed, size, base_elapsed / elapsed))
+
+
+if __name__ == '__main__':
+    main()
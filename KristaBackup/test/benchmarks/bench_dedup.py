@@ -0,0 +1,122 @@
+"""Бенчмарк хранилища блоков с дедупликацией.
+
+Делает снимок каталога, меняет часть файлов (вставки и перезапись
+в середине) и делает второй снимок. Показывает скорость разбиения
+на блоки, скорость записи снимков и коэффициент дедупликации.
+
+"""
+
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from core.actions.utils.chunk_store import (
+    Chunker, ChunkStore, SnapshotWriter,
+)
+
+
+class _Reader:
+
+    def __init__(self, data):
+        self.data = data
+        self.offset = 0
+
+    def read(self, size):
+        part = self.data[self.offset:self.offset + size]
+        self.offset += size
+        return part
+
+
+def make_tree(root, files, size):
+    for index in range(files):
+        filepath = os.path.join(root, 'file{0}.bin'.format(index))
+        with open(filepath, 'wb') as file:
+            file.write(os.urandom(size))
+
+
+def mutate_tree(root, share):
+    rnd = random.Random(0)
+    filenames = sorted(os.listdir(root))
+    for filename in rnd.sample(filenames, max(int(len(filenames) * share), 1)):
+        filepath = os.path.join(root, filename)
+        with open(filepath, 'rb') as file:
+            data = file.read()
+        offset = rnd.randrange(len(data))
+        with open(filepath, 'wb') as file:
+            file.write(data[:offset] + os.urandom(100) + data[offset:])
+
+
+def snapshot(src, dest, name, chunk_size, workers):
+    store = ChunkStore(os.path.join(dest, 'pack'), workers=workers)
+    writer = SnapshotWriter(
+        open(os.path.join(dest, name), 'wb'),
+        store,
+        Chunker(chunk_size),
+        dest,
+        close_fileobj=True,
+    )
+    started = time.perf_counter()
+    for filename in sorted(os.listdir(src)):
+        writer.add(os.path.join(src, filename), filename)
+    writer.close()
+    store.close()
+    return time.perf_counter() - started, writer.stats, store.stats
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--files', type=int, default=64)
+    parser.add_argument('--size', type=int, default=4, help='Мб на файл')
+    parser.add_argument('--chunk', type=int, default=1024, help='Кб')
+    parser.add_argument('--changed', type=float, default=0.25)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    size = args.size * 1024 * 1024
+    chunk_size = args.chunk * 1024
+    root = tempfile.mkdtemp()
+    try:
+        src = os.path.join(root, 'src')
+        dest = os.path.join(root, 'dest')
+        os.makedirs(src)
+        os.makedirs(dest)
+        make_tree(src, args.files, size)
+
+        data = os.urandom(size * 4)
+        started = time.perf_counter()
+        for _ in Chunker(chunk_size).split(_Reader(data)):
+            pass
+        elapsed = time.perf_counter() - started
+        print('Разбиение на блоки: {0:.0f} Мб/с'.format(
+            len(data) / elapsed / 1024 / 1024))
+
+        total = args.files * size
+        for name in ('first.snap', 'second.snap'):
+            elapsed, stats, store_stats = snapshot(
+                src, dest, name, chunk_size, args.workers)
+            print(
+                '{0}: {1:.2f} с, {2:.0f} Мб/с, новых данных {3:.1f}%, '
+                'записано {4} байт'.format(
+                    name,
+                    elapsed,
+                    total / elapsed / 1024 / 1024,
+                    store_stats['new_bytes'] * 100 / stats['bytes'],
+                    store_stats['stored_bytes'],
+                ))
+            mutate_tree(src, args.changed)
+
+        stored = sum(
+            os.path.getsize(os.path.join(dirpath, filename))
+            for dirpath, _, filenames in os.walk(os.path.join(dest, 'pack'))
+            for filename in filenames
+        )
+        print('Коэффициент дедупликации: {0:.2f}'.format(total * 2 / stored))
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == '__main__':
+    main()
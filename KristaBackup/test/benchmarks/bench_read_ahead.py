@@ -0,0 +1,94 @@
+"""Бенчмарк упреждающего чтения при записи tar архива.
+
+Сетевой источник (NFS/CIFS) имитируется задержкой на каждое чтение
+файла. Сравнивается последовательная запись и запись через ReadAhead.
+
+"""
+
+import argparse
+import io
+import os
+import shutil
+import tarfile
+import tempfile
+import time
+
+from core.actions.utils import ReadAhead
+
+
+def create_files(root, files, size):
+    filepaths = []
+    for index in range(files):
+        filepath = os.path.join(root, 'f{0}'.format(index))
+        with open(filepath, 'wb') as file:
+            file.write(os.urandom(size))
+        filepaths.append(filepath)
+    return filepaths
+
+
+def throttled_reader(latency):
+    def reader(filepath, size):
+        time.sleep(latency)
+        with open(filepath, 'rb') as file:
+            return file.read(size)
+    return reader
+
+
+def add_content(archive, filepath, content):
+    tarinfo = archive.gettarinfo(filepath, os.path.basename(filepath))
+    archive.addfile(tarinfo, io.BytesIO(content))
+
+
+def sequential(filepaths, reader, output):
+    with tarfile.open(output, mode='w:gz', compresslevel=5) as archive:
+        for filepath in filepaths:
+            content = reader(filepath, os.path.getsize(filepath))
+            add_content(archive, filepath, content)
+
+
+def pipelined(filepaths, reader, output, workers):
+    with tarfile.open(output, mode='w:gz', compresslevel=5) as archive:
+        with ReadAhead(workers=workers, reader=reader) as read_ahead:
+            for filepath in filepaths:
+                read_ahead.submit(
+                    lambda filepath=filepath, content=None:
+                        add_content(archive, filepath, content),
+                    filepath,
+                    os.path.getsize(filepath),
+                )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--files', type=int, default=500)
+    parser.add_argument('--size', type=int, default=64 * 1024)
+    parser.add_argument('--latency', type=float, default=0.005)
+    parser.add_argument('--workers', type=int, default=8)
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp()
+    try:
+        filepaths = create_files(root, args.files, args.size)
+        reader = throttled_reader(args.latency)
+        output = os.path.join(root, 'out.tar.gz')
+
+        started = time.perf_counter()
+        sequential(filepaths, reader, output)
+        sequential_elapsed = time.perf_counter() - started
+
+        started = time.perf_counter()
+        pipelined(filepaths, reader, output, args.workers)
+        pipelined_elapsed = time.perf_counter() - started
+    finally:
+        shutil.rmtree(root)
+
+    print('задержка чтения {0} с, файлов {1} по {2} байт'.format(
+        args.latency, args.files, args.size))
+    print('последовательно: {0:.3f} с'.format(sequential_elapsed))
+    print('ReadAhead, потоков {0}: {1:.3f} с'.format(
+        args.workers, pipelined_elapsed))
+    print('ускорение: {0:.2f}x'.format(sequential_elapsed / pipelined_elapsed))
+
+
+if __name__ == '__main__':
+    main()
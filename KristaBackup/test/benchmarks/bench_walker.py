@@ -0,0 +1,93 @@
+"""Бенчмарк обхода дерева файлов архиватором.
+
+Сравнивает прежнюю схему (walk_apply + getmtime/getsize на каждый
+файл) и scan_apply, которому достаточно одного lstat на запись.
+
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from core.actions.mixins import WalkAppierMixin
+
+
+def create_tree(root, files, per_dir):
+    for index in range(files):
+        dirpath = os.path.join(
+            root,
+            'd{0}'.format(index // (per_dir * per_dir)),
+            'd{0}'.format(index // per_dir),
+        )
+        if index % per_dir == 0:
+            os.makedirs(dirpath, exist_ok=True)
+        with open(os.path.join(dirpath, 'f{0}'.format(index)), 'w') as file:
+            file.write('x' * (index % 97))
+
+
+def old_walker(root):
+    signatures = []
+
+    def apply(path):
+        try:
+            mtime = os.path.getmtime(path)
+            fsize = os.path.getsize(path)
+        except FileNotFoundError:
+            return
+        signatures.append((path, mtime, fsize))
+
+    current_dir = os.getcwd()
+    os.chdir(root)
+    try:
+        WalkAppierMixin().walk_apply('.', apply, apply_dirs=True)
+    finally:
+        os.chdir(current_dir)
+    return signatures
+
+
+def new_walker(root):
+    signatures = []
+
+    def apply(entry):
+        signatures.append((entry.path, entry.mtime, entry.size))
+
+    WalkAppierMixin().scan_apply(root, apply, apply_dirs=True)
+    return signatures
+
+
+def measure(walker, root, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        count = len(walker(root))
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, count
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--files', type=int, default=100000)
+    parser.add_argument('--per-dir', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp()
+    try:
+        create_tree(root, args.files, args.per_dir)
+        old_elapsed, old_count = measure(old_walker, root, args.repeat)
+        new_elapsed, new_count = measure(new_walker, root, args.repeat)
+    finally:
+        shutil.rmtree(root)
+
+    print('walk_apply + getmtime/getsize: {0:.3f} с, записей {1}'.format(
+        old_elapsed, old_count))
+    print('scan_apply: {0:.3f} с, записей {1}'.format(
+        new_elapsed, new_count))
+    print('ускорение: {0:.2f}x'.format(old_elapsed / new_elapsed))
+
+
+if __name__ == '__main__':
+    main()
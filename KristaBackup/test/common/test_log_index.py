@@ -0,0 +1,70 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from common import LogIndex as log_index
+from common.LogIndex import INDEX_FILENAME, LogIndex
+
+
+class LogIndexTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'task.log')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def write(self, *lines, mode='a'):
+        with open(self.path, mode) as log:
+            for line in lines:
+                log.write(line + '\n')
+
+    def test_update(self):
+        self.write(
+            '2020-01-02 03:04:05.1 srv INFO root Запускается задание daily',
+            '2020-01-02 03:04:06.1 srv WARNING root файл исчез',
+        )
+        entry = LogIndex(self.tmpdir.name).update()['task.log']
+        self.assertEqual(entry['task'], 'daily')
+        self.assertTrue(entry['warning'])
+        self.assertFalse(entry['error'])
+        self.assertEqual(entry['end'] - entry['start'], 1)
+        self.assertTrue(
+            os.path.exists(os.path.join(self.tmpdir.name, INDEX_FILENAME)),
+        )
+
+        self.write(
+            '2020-01-02 03:04:07.1 srv ERROR root первая ошибка',
+            '2020-01-02 03:04:08.1 srv ERROR root вторая ошибка',
+        )
+        entry = LogIndex(self.tmpdir.name).update()['task.log']
+        self.assertTrue(entry['error'])
+        self.assertIn('первая ошибка', entry['msg'])
+        self.assertEqual(entry['end'] - entry['start'], 3)
+
+    def test_unchanged(self):
+        self.write('2020-01-02 03:04:05.1 srv INFO root старт')
+        LogIndex(self.tmpdir.name).update()
+        with mock.patch.object(log_index, 'scan_log_file') as scan:
+            entries = LogIndex(self.tmpdir.name).update()
+        scan.assert_not_called()
+        self.assertEqual(list(entries), ['task.log'])
+
+    def test_rewritten(self):
+        self.write('2020-01-02 03:04:05.1 srv ERROR root ошибка', 'x' * 100)
+        LogIndex(self.tmpdir.name).update()
+        self.write('2020-01-02 03:04:05.1 srv INFO root старт', mode='w')
+        entry = LogIndex(self.tmpdir.name).update()['task.log']
+        self.assertFalse(entry['error'])
+
+    def test_removed(self):
+        self.write('2020-01-02 03:04:05.1 srv INFO root старт')
+        LogIndex(self.tmpdir.name).update()
+        os.remove(self.path)
+        self.assertEqual(LogIndex(self.tmpdir.name).update(), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import logging
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from common.LogPipeline import BatchFileHandler, LogPipeline
+
+
+class LogPipelineTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'test.log')
+        self.handler = BatchFileHandler(self.path)
+        self.handler.setFormatter(logging.Formatter('%(message)s'))
+        self.logger = logging.getLogger('test_log_pipeline')
+        self.logger.propagate = False
+        self.logger.setLevel(logging.DEBUG)
+
+    def tearDown(self):
+        for handler in list(self.logger.handlers):
+            self.logger.removeHandler(handler)
+        self.handler.close()
+        self.tmpdir.cleanup()
+
+    def read_lines(self):
+        with open(self.path) as log_file:
+            return log_file.read().splitlines()
+
+    def test_flush(self):
+        pipeline = LogPipeline([self.handler], batch_size=7)
+        pipeline.start(self.logger)
+        for num in range(100):
+            self.logger.info('запись %s', num)
+        pipeline.flush()
+        self.assertEqual(
+            self.read_lines(),
+            ['запись {0}'.format(num) for num in range(100)],
+        )
+        pipeline.stop()
+
+    def test_message_args(self):
+        pipeline = LogPipeline([self.handler])
+        pipeline.start(self.logger)
+        values = ['до']
+        self.logger.info('%s', values)
+        values[0] = 'после'
+        pipeline.stop()
+        self.assertEqual(self.read_lines(), ["['до']"])
+
+    def test_drop(self):
+        pipeline = LogPipeline([self.handler], queue_size=2, policy='drop')
+        # Поток записи не запущен, поэтому очередь заполняется.
+        self.logger.addHandler(pipeline.handler)
+        for num in range(5):
+            self.logger.debug('запись %s', num)
+        self.assertEqual(pipeline.dropped, 3)
+        pipeline.start(self.logger)
+        self.logger.error('ошибка')
+        pipeline.stop()
+        self.assertEqual(self.read_lines(), [
+            'запись 0',
+            'запись 1',
+            'Очередь лога заполнена, пропущено записей: 3',
+            'ошибка',
+        ])
+
+    def test_handler_error(self):
+        failing = logging.NullHandler()
+        failing.handle = mock.Mock(side_effect=OSError('нет доступа'))
+        failing.handleError = mock.Mock()
+        pipeline = LogPipeline([failing, self.handler], queue_size=2)
+        pipeline.start(self.logger)
+        for num in range(5):
+            self.logger.info('запись %s', num)
+        self.assertTrue(pipeline.flush(timeout=10))
+        pipeline.stop()
+        self.assertEqual(failing.handleError.call_count, 5)
+        self.assertEqual(
+            self.read_lines(),
+            ['запись {0}'.format(num) for num in range(5)],
+        )
+
+    def test_unknown_policy(self):
+        with self.assertRaises(ValueError):
+            LogPipeline([self.handler], policy='wait')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from common import LogReader
+from common.LogReader import read_log_page
+
+LEVELS = ('INFO', 'DEBUG', 'WARNING', 'ERROR')
+
+
+class LogReaderTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'task.log')
+        self.lines = []
+        for num in range(1000):
+            level = LEVELS[num % len(LEVELS)]
+            self.lines.append(
+                '2020-01-02 03:04:05.1   srv {0} root запись {1}\n'.format(
+                    level,
+                    num,
+                ),
+            )
+            if level == 'ERROR':
+                self.lines.append('Traceback {0}\n'.format(num))
+        with open(self.path, 'w') as log:
+            log.writelines(self.lines)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def read_backward(self, **kwargs):
+        lines = []
+        page = read_log_page(self.path, **kwargs)
+        lines[:0] = page['lines']
+        while page['offset'] > 0:
+            page = read_log_page(self.path, before=page['offset'], **kwargs)
+            lines[:0] = page['lines']
+        return lines
+
+    def read_forward(self, **kwargs):
+        lines = []
+        page = read_log_page(self.path, offset=0, **kwargs)
+        lines.extend(page['lines'])
+        while page['end'] < page['size']:
+            page = read_log_page(self.path, offset=page['end'], **kwargs)
+            lines.extend(page['lines'])
+        return lines
+
+    def test_tail(self):
+        page = read_log_page(self.path, limit=10)
+        self.assertEqual(page['lines'], self.lines[-10:])
+        self.assertEqual(page['end'], page['size'])
+
+    def test_backward(self):
+        with mock.patch.object(LogReader, 'BLOCK_SIZE', 13):
+            self.assertEqual(self.read_backward(limit=33), self.lines)
+        self.assertEqual(self.read_backward(limit=33), self.lines)
+
+    def test_forward(self):
+        self.assertEqual(self.read_forward(limit=33), self.lines)
+
+    def test_level(self):
+        expected = [
+            line for line in self.lines
+            if 'ERROR' in line or 'Traceback' in line
+        ]
+        self.assertEqual(self.read_backward(limit=7, level='error'), expected)
+        self.assertEqual(self.read_forward(limit=7, level='ERROR'), expected)
+
+    def test_unknown_level(self):
+        with self.assertRaises(ValueError):
+            read_log_page(self.path, level='LOUD')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import multiprocessing
+import os
+import tempfile
+import time
+import unittest
+
+from common.proclock import ProcessLock
+
+
+def hold_lock(dirpath, locked, release):
+    lock = ProcessLock('test', dirpath)
+    lock.acquire()
+    locked.set()
+    release.wait(10)
+    lock.release()
+
+
+class ProcessLockTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        context = multiprocessing.get_context('fork')
+        self.locked = context.Event()
+        self.release = context.Event()
+        self.holder = context.Process(
+            target=hold_lock,
+            args=(self.tmpdir.name, self.locked, self.release),
+        )
+
+    def tearDown(self):
+        # Event.set ждёт пробуждения ожидающих, поэтому для убитого
+        # владельца блокировки не вызывается.
+        if self.holder.is_alive():
+            self.release.set()
+            self.holder.join()
+        self.tmpdir.cleanup()
+
+    def start_holder(self):
+        self.holder.start()
+        self.assertTrue(self.locked.wait(10))
+
+    def test_acquire(self):
+        lock = ProcessLock('test', self.tmpdir.name)
+        self.assertIsNone(lock.get_owner_pid())
+        self.assertTrue(lock.acquire())
+        self.assertEqual(lock.get_owner_pid(), os.getpid())
+        lock.release()
+        self.assertIsNone(
+            ProcessLock('test', self.tmpdir.name).get_owner_pid(),
+        )
+
+    def test_locked(self):
+        self.start_holder()
+        lock = ProcessLock('test', self.tmpdir.name)
+        self.assertEqual(lock.get_owner_pid(), self.holder.pid)
+        started = time.monotonic()
+        self.assertFalse(lock.acquire(timeout=0.3))
+        self.assertGreaterEqual(time.monotonic() - started, 0.3)
+
+    def test_wait(self):
+        self.start_holder()
+        self.release.set()
+        lock = ProcessLock('test', self.tmpdir.name)
+        self.assertTrue(lock.acquire(timeout=10))
+        lock.release()
+
+    def test_released_on_exit(self):
+        self.start_holder()
+        self.holder.kill()
+        self.holder.join()
+        lock = ProcessLock('test', self.tmpdir.name)
+        self.assertTrue(lock.acquire())
+        lock.release()
+
+
+if __name__ == '__main__':
+    unittest.main()
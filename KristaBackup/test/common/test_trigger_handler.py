@@ -0,0 +1,92 @@
+import logging
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from common.TriggerHandler import TriggerHandler
+
+
+def make_record(level):
+    return logging.makeLogRecord({
+        'levelno': level,
+        'levelname': logging.getLevelName(level),
+    })
+
+
+class TriggerHandlerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'trigger')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def read_state(self):
+        with open(self.path) as trigger:
+            return trigger.read()
+
+    def test_init(self):
+        TriggerHandler(self.path)
+        self.assertEqual(self.read_state(), 'SUCCESS')
+
+    def test_highest_state(self):
+        handler = TriggerHandler(self.path)
+        handler.handle(make_record(logging.WARNING))
+        self.assertEqual(self.read_state(), 'WARNING')
+        handler.handle(make_record(logging.CRITICAL))
+        handler.handle(make_record(logging.WARNING))
+        self.assertEqual(self.read_state(), 'ERROR')
+        self.assertEqual(os.listdir(self.tmpdir.name), ['trigger'])
+
+    def test_write_on_transition(self):
+        handler = TriggerHandler(self.path)
+        with mock.patch.object(handler, 'emit', wraps=handler.emit) as emit:
+            for _ in range(100):
+                handler.handle(make_record(logging.WARNING))
+            handler.handle(make_record(logging.ERROR))
+        self.assertEqual(emit.call_count, 2)
+
+    def test_external_change(self):
+        handler = TriggerHandler(self.path)
+        handler.handle(make_record(logging.WARNING))
+        with open(self.path, 'w') as trigger:
+            trigger.write('ERROR\n')
+        mtime = time.time() + 1
+        os.utime(self.path, (mtime, mtime))
+
+        handler.checked_at -= handler.CHECK_INTERVAL
+        handler.handle(make_record(logging.WARNING))
+        self.assertEqual(handler.state_name_trigger, 'ERROR')
+        self.assertEqual(self.read_state(), 'ERROR\n')
+
+    def test_stale_state(self):
+        with open(self.path, 'w') as trigger:
+            trigger.write('ERROR')
+        mtime = time.time() - TriggerHandler.MAX_TIME_DIFF
+        os.utime(self.path, (mtime, mtime))
+
+        TriggerHandler(self.path)
+        self.assertEqual(self.read_state(), 'SUCCESS')
+
+    def test_replace_denied(self):
+        handler = TriggerHandler(self.path)
+        with mock.patch('os.replace', side_effect=PermissionError):
+            handler.handle(make_record(logging.WARNING))
+        self.assertEqual(self.read_state(), 'WARNING')
+        self.assertEqual(os.listdir(self.tmpdir.name), ['trigger'])
+
+    def test_write_error(self):
+        handler = TriggerHandler(self.path)
+        os.remove(self.path)
+        os.mkdir(self.path)
+        record = make_record(logging.ERROR)
+        with mock.patch.object(handler, 'handleError') as handle_error:
+            handler.handle(record)
+        handle_error.assert_called_once_with(record)
+
+
+if __name__ == '__main__':
+    unittest.main()
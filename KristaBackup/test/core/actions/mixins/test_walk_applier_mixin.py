@@ -0,0 +1,97 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from core.actions.mixins import WalkAppierMixin
+
+
+class TestScanApply(unittest.TestCase):
+    """
+    Проверяет, что scan_apply обходит дерево так же, как walk_apply,
+    и не меняет текущую директорию.
+
+    """
+
+    def setUp(self):
+        self.src = tempfile.mkdtemp()
+        for dirpath in ('a', 'a/b', 'c'):
+            os.makedirs(os.path.join(self.src, dirpath))
+        for filepath in ('1.txt', 'a/2.txt', 'a/b/3.txt', 'c/4.txt'):
+            with open(os.path.join(self.src, filepath), 'w') as file:
+                file.write(filepath)
+        self.walker = WalkAppierMixin()
+
+    def tearDown(self):
+        shutil.rmtree(self.src)
+
+    def collect(self, method, **kwargs):
+        result = []
+        method(self.src, result.append, **kwargs)
+        return result
+
+    def test_same_order_as_walk_apply(self):
+        cwd = os.getcwd()
+        for kwargs in (
+            {},
+            {'apply_dirs': True},
+            {'recursive': False},
+            {'recursive': False, 'apply_dirs': True},
+            {'recursive': False, 'top_dirs': True},
+        ):
+            walked = self.collect(self.walker.walk_apply, **kwargs)
+            scanned = self.collect(self.walker.scan_apply, **kwargs)
+            self.assertEqual(
+                sorted(walked),
+                sorted(entry.path for entry in scanned),
+            )
+        self.assertEqual(cwd, os.getcwd())
+
+    def test_top_dirs(self):
+        for method in (self.walker.walk_apply, self.walker.scan_apply):
+            result = self.collect(method, recursive=False, apply_dirs=True)
+            self.assertEqual(
+                ['1.txt'],
+                [getattr(item, 'path', item) for item in result],
+            )
+            result = self.collect(method, recursive=False, top_dirs=True)
+            self.assertEqual(
+                ['1.txt', 'a', 'c'],
+                sorted(getattr(item, 'path', item) for item in result),
+            )
+
+    def test_without_scandir(self):
+        expected = self.collect(self.walker.scan_apply, apply_dirs=True)
+        scandir = os.scandir
+        del os.scandir
+        try:
+            entries = self.collect(self.walker.scan_apply, apply_dirs=True)
+        finally:
+            os.scandir = scandir
+        # stat не сравнивается: atime директорий меняется при чтении.
+        self.assertEqual(
+            [entry[:-1] for entry in expected],
+            [entry[:-1] for entry in entries],
+        )
+
+    def test_entry_stat(self):
+        entries = self.collect(self.walker.scan_apply)
+        for entry in entries:
+            filepath = os.path.join(self.src, entry.path)
+            self.assertEqual(os.path.getsize(filepath), entry.size)
+            self.assertEqual(os.path.getmtime(filepath), entry.mtime)
+
+    def test_skip(self):
+        def apply(result, path):
+            result.append(path)
+            if path == 'a':
+                return WalkAppierMixin.SKIP
+
+        for method in (self.walker.walk_apply, self.walker.scan_apply):
+            result = []
+            method(
+                self.src,
+                lambda item: apply(result, getattr(item, 'path', item)),
+                apply_dirs=True,
+            )
+            self.assertEqual(sorted(result), ['1.txt', 'a', 'c', 'c/4.txt'])
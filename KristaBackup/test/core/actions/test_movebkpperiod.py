@@ -0,0 +1,43 @@
+import os
+import tempfile
+import unittest
+from test import utils
+
+from common import schemes
+from core.actions.archiver import ArchiverSnapshot
+from core.actions.movebkpperiod import MoveBkpPeriod
+
+
+class TestFillFiles(unittest.TestCase):
+    """Проверяет поиск бэкапов-файлов и бэкапов-директорий."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.source = ArchiverSnapshot(utils.get_random_string())
+        self.source.scheme = schemes.get_scheme()
+        self.source.basename = 'test'
+        self.source.dest_path = self.tmpdir.name
+        self.action = MoveBkpPeriod(utils.get_random_string())
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_directory_backup(self):
+        snapshot_path = self.source.generate_filepath()
+        os.makedirs(os.path.join(snapshot_path, 'nested'))
+        list_path = self.source.generate_filepath(
+            extension=self.source.list_extension,
+        )
+        with open(list_path, 'w') as list_file:
+            list_file.write(snapshot_path)
+
+        files = self.action._fill_files_by_action(self.source)
+        found = sorted(
+            filepath for group in files.values() for filepath in group
+        )
+        self.assertIn(snapshot_path, found)
+        self.assertNotIn(os.path.join(snapshot_path, 'nested'), found)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import os
+import stat
+import tempfile
+import threading
+import unittest
+from test import utils
+
+from common import schemes
+from core.actions.pgdump import PgDump
+
+FAKE_PG_DUMP = """#!/bin/sh
+echo "partial data"
+exit {0}
+"""
+
+
+class TestPgDumpFailure(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.action = PgDump(utils.get_random_string())
+        self.action.scheme = schemes.get_scheme()
+        self.action.basename = 'test'
+        self.action.dest_path = os.path.join(self.tmpdir.name, 'dest')
+        self.action.user = 'postgres'
+        self.action.format = 'plain'
+        self.action.checksum_file = True
+        self.action.skip_unchanged = True
+        self.action._markers = {'db': 'marker'}
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def set_exit_code(self, code):
+        command_path = os.path.join(self.tmpdir.name, 'pg_dump')
+        with open(command_path, 'w') as command:
+            command.write(FAKE_PG_DUMP.format(code))
+        os.chmod(command_path, stat.S_IRWXU)
+        self.action.command_path = command_path
+
+    def test_success(self):
+        self.set_exit_code(0)
+        self.assertFalse(self.action.backup_database('db'))
+        self.assertIn('db', self.action._dump_state)
+        self.assertTrue(
+            os.path.exists(self.action.generate_hash_filepath(dbname='db')),
+        )
+
+    def test_nonzero_exit(self):
+        self.set_exit_code(1)
+        self.assertTrue(self.action.backup_database('db'))
+        self.assertEqual(self.action._dump_state, {})
+        self.assertFalse(
+            os.path.exists(self.action.generate_hash_filepath(dbname='db')),
+        )
+        self.assertFalse(
+            os.path.exists(self.action.get_dump_filepath('db')),
+        )
+
+    def test_nonzero_exit_compressed(self):
+        self.set_exit_code(1)
+        self.action.compression_lib = 'gzip'
+        self.action.compression_workers = 2
+        self.action.configure_compression()
+        threads = threading.active_count()
+        self.assertTrue(self.action.backup_database('db'))
+        self.assertEqual(threading.active_count(), threads)
+        self.assertFalse(
+            os.path.exists(self.action.get_dump_filepath('db')),
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,11 @@
 import os
+import tarfile
+import tempfile
 import unittest
 from test import utils
 
+from common import schemes
+from core.actions.archiver import ArchiverTar
 from core.actions.archiver import ArchiverZip as TarArchiver
 
 
@@ -52,3 +56,50 @@ class TestActionNameGeneration(unittest.TestCase):
             self.action.level_folders[level],
         )
         self.assertEqual(random_test_path, self.action.generate_dirname(level=level))
+
+
+class TestConfigureLevel(unittest.TestCase):
+    """Проверяет допустимые значения уровня бэкапа."""
+
+    def setUp(self):
+        self.action = TarArchiver(utils.get_random_string())
+        self.action.src_path = os.path.dirname(__file__)
+
+    def test_max_level_without_folders(self):
+        self.action.level = TarArchiver.MAX_LEVEL
+        self.assertFalse(self.action.configure_parameters())
+        self.action.level = TarArchiver.MAX_LEVEL + 1
+        self.assertTrue(self.action.configure_parameters())
+
+    def test_negative_level(self):
+        self.action.level = -1
+        self.assertTrue(self.action.configure_parameters())
+        self.action.level_folders = ['0', '1']
+        self.assertTrue(self.action.configure_parameters())
+
+
+class TestArchiveInsideSource(unittest.TestCase):
+    """Проверяет, что архив в исходной папке не добавляется сам в себя."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        with open(os.path.join(self.tmpdir.name, 'data.txt'), 'w') as data:
+            data.write('data')
+        self.action = ArchiverTar(utils.get_random_string())
+        self.action.scheme = schemes.get_scheme()
+        self.action.basename = 'test'
+        self.action.src_path = self.tmpdir.name
+        self.action.dest_path = self.tmpdir.name
+        self.action.use_manifest = False
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_parallel_compression(self):
+        self.action.compression_workers = 2
+        self.assertTrue(self.action.start())
+        archive_filepath = self.action.generate_filepath()
+        with tarfile.open(archive_filepath) as archive:
+            names = archive.getnames()
+        self.assertIn('data.txt', names)
+        self.assertNotIn(os.path.basename(archive_filepath), names)
@@ -0,0 +1,123 @@
+import logging
+import os
+import shutil
+import tempfile
+import unittest
+
+from core.actions.utils.chunk_store import (
+    Chunker, ChunkStore, ChunkStoreError, SnapshotWriter,
+    collect_garbage, load_snapshot_files, restore_snapshot,
+)
+
+
+class TestChunkStore(unittest.TestCase):
+    """
+    Проверяет разбиение на блоки, снимки, восстановление и очистку.
+
+    """
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.src = os.path.join(self.tmpdir, 'src')
+        self.dest = os.path.join(self.tmpdir, 'dest')
+        self.store_path = os.path.join(self.dest, 'pack')
+        os.makedirs(os.path.join(self.src, 'sub'))
+        os.makedirs(self.dest)
+        self.data = os.urandom(3 * 1024 * 1024)
+        self.write('big.bin', self.data)
+        self.write(os.path.join('sub', 'small.txt'), b'small')
+        self.logger = logging.getLogger('test_chunk_store')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def write(self, relpath, data):
+        with open(os.path.join(self.src, relpath), 'wb') as file:
+            file.write(data)
+
+    def snapshot(self, name, previous=None):
+        store = ChunkStore(self.store_path, workers=2)
+        filepath = os.path.join(self.dest, name)
+        writer = SnapshotWriter(
+            open(filepath, 'wb'),
+            store,
+            Chunker(64 * 1024),
+            self.dest,
+            previous=previous,
+            close_fileobj=True,
+        )
+        for relpath in ('sub', os.path.join('sub', 'small.txt'), 'big.bin'):
+            writer.add(os.path.join(self.src, relpath), relpath)
+        writer.close()
+        store.close()
+        store.register_root(self.dest)
+        return filepath, store.stats
+
+    def test_chunks_shift_resistant(self):
+        chunker = Chunker(64 * 1024)
+        chunks = list(chunker.split(_Reader(self.data)))
+        self.assertEqual(self.data, b''.join(chunks))
+        self.assertLessEqual(max(map(len, chunks)), chunker.max_size)
+
+        shifted = Chunker(64 * 1024).split(_Reader(b'abc' + self.data))
+        common = set(chunks[1:]) & set(shifted)
+        self.assertGreater(len(common), len(chunks) // 2)
+
+    def test_roundtrip_and_dedup(self):
+        first, _ = self.snapshot('first.snap')
+        self.write('big.bin', self.data[:1000] + b'x' + self.data[1000:])
+        _, stats = self.snapshot('second.snap')
+        self.assertLess(stats['new_bytes'], len(self.data) // 2)
+
+        target = os.path.join(self.tmpdir, 'restored')
+        self.assertEqual(3, restore_snapshot(first, target))
+        with open(os.path.join(target, 'big.bin'), 'rb') as file:
+            self.assertEqual(self.data, file.read())
+        with open(os.path.join(target, 'sub', 'small.txt'), 'rb') as file:
+            self.assertEqual(b'small', file.read())
+
+    def test_unchanged_files_reused(self):
+        first, _ = self.snapshot('first.snap')
+        _, stats = self.snapshot('second.snap', load_snapshot_files(first))
+        self.assertEqual(0, stats['chunks'])
+
+    def test_garbage_collection(self):
+        first, _ = self.snapshot('first.snap')
+        self.write('big.bin', b'other')
+        second, _ = self.snapshot('second.snap')
+        store = ChunkStore(self.store_path)
+
+        removed, _ = collect_garbage(store, '.snap', self.logger)
+        self.assertEqual(0, removed)
+
+        os.remove(first)
+        removed, _ = collect_garbage(store, '.snap', self.logger)
+        self.assertGreater(removed, 0)
+        restore_snapshot(second, os.path.join(self.tmpdir, 'restored'))
+        with self.assertRaises(ChunkStoreError):
+            restore_snapshot(self.write_broken(), self.tmpdir)
+
+    def test_garbage_collection_without_roots(self):
+        self.snapshot('first.snap')
+        os.remove(os.path.join(self.store_path, 'roots'))
+        store = ChunkStore(self.store_path)
+        self.assertIsNone(collect_garbage(store, '.snap', self.logger))
+        self.assertTrue(list(store.iter_chunks()))
+
+    def write_broken(self):
+        filepath = os.path.join(self.dest, 'broken.snap')
+        with open(filepath, 'wb') as file:
+            file.write(b'not a snapshot')
+        return filepath
+
+
+class _Reader:
+
+    def __init__(self, data):
+        self.data = data
+        self.offset = 0
+
+    def read(self, size):
+        part = self.data[self.offset:self.offset + size]
+        self.offset += size
+        return part
@@ -0,0 +1,76 @@
+import bz2
+import gzip
+import io
+import os
+import tarfile
+import unittest
+
+from core.actions.utils import (
+    ParallelGzipWriter, get_stream_compressors, open_compressor,
+)
+
+
+class TestParallelGzipWriter(unittest.TestCase):
+    """
+    Проверяет, что результат параллельного сжатия читается
+    как обычный gzip.
+
+    """
+
+    def compress(self, data, **kwargs):
+        output = io.BytesIO()
+        writer = ParallelGzipWriter(output, **kwargs)
+        for start in range(0, len(data), 7000):
+            writer.write(data[start:start + 7000])
+        writer.close()
+        return output.getvalue()
+
+    def test_roundtrip(self):
+        data = os.urandom(1024) * 300
+        compressed = self.compress(data, workers=4, block_size=65536)
+        self.assertEqual(data, gzip.decompress(compressed))
+
+    def test_empty(self):
+        compressed = self.compress(b'', workers=2)
+        self.assertEqual(b'', gzip.decompress(compressed))
+
+    def test_tarfile(self):
+        output = io.BytesIO()
+        writer = ParallelGzipWriter(output, workers=3, block_size=4096)
+        payload = b'krista' * 10000
+        with tarfile.open(mode='w', fileobj=writer) as archive:
+            info = tarfile.TarInfo('data.bin')
+            info.size = len(payload)
+            archive.addfile(info, io.BytesIO(payload))
+        writer.close()
+
+        output.seek(0)
+        with tarfile.open(fileobj=output, mode='r:gz') as archive:
+            member = archive.extractfile('data.bin')
+            self.assertEqual(payload, member.read())
+
+
+class TestOpenCompressor(unittest.TestCase):
+    """
+    Проверяет потоковое сжатие поверх открытого файла.
+
+    """
+
+    def test_roundtrip(self):
+        data = os.urandom(1024) * 100
+        decompress = {'gzip': gzip.decompress, 'bzip': bz2.decompress}
+        for compression_lib, workers in (('gzip', 1), ('gzip', 3), ('bzip', 1)):
+            output = io.BytesIO()
+            compressor = open_compressor(output, compression_lib, 5, workers)
+            compressor.write(memoryview(data))
+            compressor.close()
+            self.assertFalse(output.closed)
+            self.assertEqual(
+                data,
+                decompress[compression_lib](output.getvalue()),
+            )
+
+    def test_unavailable(self):
+        self.assertNotIn('rar', get_stream_compressors())
+        with self.assertRaises(ValueError):
+            open_compressor(io.BytesIO(), 'rar')
@@ -0,0 +1,58 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from core.actions.utils import DatabaseCatalog
+
+
+class TestDatabaseCatalog(unittest.TestCase):
+    """
+    Проверяет кэширование каталога баз в памяти и на диске.
+
+    """
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.filepath = os.path.join(self.tmpdir, 'cache', 'catalog.json')
+        self.calls = 0
+        self.records = [('db1', 100, '1:0'), ('db2', 200, '5:0')]
+        DatabaseCatalog._loaded.clear()
+
+    def tearDown(self):
+        DatabaseCatalog._loaded.clear()
+        shutil.rmtree(self.tmpdir)
+
+    def loader(self):
+        self.calls += 1
+        return self.records
+
+    def catalog(self, ttl=3600):
+        return DatabaseCatalog(self.filepath, 'u@h:5432', self.loader, ttl=ttl)
+
+    def test_loaded_once(self):
+        self.assertEqual(['db1', 'db2'], self.catalog().get_databases())
+        self.assertEqual({'db1': 100, 'db2': 200}, self.catalog().get_sizes())
+        self.assertEqual(1, self.calls)
+
+        self.catalog().refresh()
+        self.assertEqual(2, self.calls)
+
+    def test_persisted_with_ttl(self):
+        self.catalog().get()
+        DatabaseCatalog._loaded.clear()
+        self.assertEqual(
+            {'db1': '1:0', 'db2': '5:0'},
+            self.catalog().get_markers(),
+        )
+        self.assertEqual(1, self.calls)
+
+        DatabaseCatalog._loaded.clear()
+        self.catalog(ttl=0).get()
+        self.assertEqual(2, self.calls)
+
+    def test_stale_on_error(self):
+        self.catalog().get()
+        DatabaseCatalog._loaded.clear()
+        self.records = []
+        self.assertEqual(['db1', 'db2'], self.catalog(ttl=0).get_databases())
@@ -0,0 +1,68 @@
+import re
+import unittest
+
+from core.actions.utils import ExclusionMatcher, get_tree_pattern
+
+
+def _prepare_shell(pattern):
+    translated = r'(?s:{0})'.format(
+        ''.join('.*' if char == '*' else re.escape(char) for char in pattern),
+    )
+    return r'\A{0}\Z'.format(translated)
+
+
+class TestExclusionMatcher(unittest.TestCase):
+    """
+    Проверяет совпадение результатов с поочерёдным re.match.
+
+    """
+
+    paths = (
+        'var/log/syslog',
+        'var/cache/apt/pkg.bin',
+        'home/user/.cache',
+        'home/user/file.tmp',
+        'home/user/file.txt',
+        'aa',
+        'abab',
+    )
+
+    def assert_same_as_loop(self, patterns):
+        matcher = ExclusionMatcher([re.compile(pat) for pat in patterns])
+        for path in self.paths:
+            expected = any(re.match(pat, path) for pat in patterns)
+            self.assertEqual(expected, matcher.match(path), path)
+
+    def test_combined(self):
+        self.assert_same_as_loop([
+            _prepare_shell('*.tmp'),
+            _prepare_shell('var/cache/*'),
+            r'home/\w+/\.cache',
+        ])
+
+    def test_non_combinable(self):
+        self.assert_same_as_loop([
+            r'(a)\1',
+            r'(?i)HOME/.*\.TXT',
+            r'(?P<x>ab)(?P=x)',
+        ])
+
+    def test_empty(self):
+        matcher = ExclusionMatcher()
+        self.assertFalse(matcher)
+        self.assertFalse(matcher.match('any'))
+        self.assertFalse(matcher.excludes_tree('any'))
+
+    def test_tree_patterns(self):
+        shell = get_tree_pattern('var/cache/*', False, _prepare_shell)
+        regex = get_tree_pattern(r'home/\w+/\.cache/.*', True, None)
+        matcher = ExclusionMatcher(tree_patterns=[shell, regex])
+
+        self.assertTrue(matcher.excludes_tree('var/cache'))
+        self.assertTrue(matcher.excludes_tree('home/user/.cache'))
+        self.assertFalse(matcher.excludes_tree('var/cache2'))
+        self.assertFalse(matcher.excludes_tree('var'))
+
+        self.assertIsNone(get_tree_pattern('*.tmp', False, _prepare_shell))
+        self.assertIsNone(get_tree_pattern(r'var/.*\.log$/.*', True, None))
+        self.assertIsNone(get_tree_pattern(r'var\/.*', True, None))
@@ -0,0 +1,122 @@
+import hashlib
+import os
+import shutil
+import tarfile
+import tempfile
+import unittest
+
+from core.actions.utils import (
+    Blake2bTree, HashingWriter, create_hash_file,
+    create_sha1sum_file,
+)
+
+
+class TestHashingWriter(unittest.TestCase):
+    """
+    Проверяет, что хэш при записи совпадает с хэшем готового файла.
+
+    """
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_tar_checksum(self):
+        src = os.path.join(self.tmpdir, 'src')
+        with open(src, 'wb') as file:
+            file.write(os.urandom(300000))
+
+        archive_filepath = os.path.join(self.tmpdir, 'test.tar.gz')
+        writer = HashingWriter(open(archive_filepath, 'wb'), close_fileobj=True)
+        with tarfile.open(archive_filepath, 'w:gz', fileobj=writer) as archive:
+            archive.add(src, arcname='src')
+        writer.close()
+
+        hash_value = create_sha1sum_file(
+            archive_filepath,
+            os.path.join(self.tmpdir, 'test.hash'),
+        )
+        self.assertEqual(hash_value, writer.hexdigest())
+        self.assertEqual(os.path.getsize(archive_filepath), writer.tell())
+
+
+class TestHashAlgorithms(unittest.TestCase):
+    """
+    Проверяет формат файла с хэшсуммой и дерево BLAKE2b.
+
+    """
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.src = os.path.join(self.tmpdir, 'src.bin')
+        self.data = os.urandom(100000)
+        with open(self.src, 'wb') as file:
+            file.write(self.data)
+        self.dest = os.path.join(self.tmpdir, 'src.hash')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def read_dest(self):
+        with open(self.dest) as file:
+            return file.read()
+
+    def test_sha1_legacy_format(self):
+        hash_value = create_sha1sum_file(self.src, self.dest)
+        self.assertEqual(hashlib.sha1(self.data).hexdigest(), hash_value)
+        self.assertEqual(hash_value, self.read_dest())
+
+    def test_tagged_format(self):
+        hash_value = create_hash_file(self.src, self.dest, 'sha256')
+        self.assertEqual(hashlib.sha256(self.data).hexdigest(), hash_value)
+        self.assertEqual(
+            'SHA256 (src.bin) = {0}\n'.format(hash_value),
+            self.read_dest(),
+        )
+
+    def test_blake2b_tree(self):
+        leaf_size = 4096
+        params = {
+            'fanout': 0,
+            'depth': 2,
+            'leaf_size': leaf_size,
+            'inner_size': 64,
+        }
+        leaves = [
+            self.data[offset:offset + leaf_size]
+            for offset in range(0, len(self.data), leaf_size)
+        ]
+        root = hashlib.blake2b(node_depth=1, last_node=True, **params)
+        for index, leaf in enumerate(leaves):
+            root.update(hashlib.blake2b(
+                leaf,
+                node_offset=index,
+                node_depth=0,
+                last_node=index == len(leaves) - 1,
+                **params,
+            ).digest())
+
+        for workers in (1, 4):
+            tree = Blake2bTree(workers=workers, leaf_size=leaf_size)
+            for offset in range(0, len(self.data), 1000):
+                tree.update(self.data[offset:offset + 1000])
+            self.assertEqual(root.hexdigest(), tree.hexdigest())
+
+    def test_directory(self):
+        src_dir = os.path.join(self.tmpdir, 'dump')
+        os.makedirs(os.path.join(src_dir, 'sub'))
+        files = {'toc.dat': b'toc', os.path.join('sub', '1.dat'): b'data'}
+        for relpath, data in files.items():
+            with open(os.path.join(src_dir, relpath), 'wb') as file:
+                file.write(data)
+
+        create_hash_file(src_dir, self.dest, workers=2)
+        self.assertEqual(
+            ''.join(
+                '{0}  {1}\n'.format(hashlib.sha1(files[relpath]).hexdigest(), relpath)
+                for relpath in sorted(files)
+            ),
+            self.read_dest(),
+        )
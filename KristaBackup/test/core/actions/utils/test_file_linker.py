@@ -0,0 +1,63 @@
+import errno
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from core.actions.utils import FileLinker
+
+
+class TestFileLinker(unittest.TestCase):
+    """
+    Проверяет связывание файлов и откат к копированию.
+
+    """
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.src = os.path.join(self.tmpdir, 'src')
+        with open(self.src, 'wb') as file:
+            file.write(b'data')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_hardlink(self):
+        dst = os.path.join(self.tmpdir, 'dst')
+        self.assertEqual('hardlink', FileLinker('hardlink').link(self.src, dst))
+        self.assertTrue(os.path.samefile(self.src, dst))
+
+    def test_copy_required(self):
+        linker = FileLinker('hardlink')
+        dst = os.path.join(self.tmpdir, 'dst')
+        self.assertIsNone(linker.link(self.src, dst, shared_attributes=False))
+        self.assertIsNone(FileLinker('copy').link(self.src, dst))
+        self.assertFalse(os.path.exists(dst))
+
+    def test_auto(self):
+        dst = os.path.join(self.tmpdir, 'dst')
+        self.assertIn(FileLinker().link(self.src, dst), ('reflink', 'hardlink'))
+        with open(dst, 'rb') as file:
+            self.assertEqual(b'data', file.read())
+
+    def test_file_error(self):
+        linker = FileLinker('hardlink')
+        dst = os.path.join(self.tmpdir, 'dst')
+        denied = OSError(errno.EPERM, 'Operation not permitted')
+        with mock.patch('os.link', side_effect=denied):
+            self.assertIsNone(linker.link(self.src, dst))
+        self.assertEqual('hardlink', linker.link(self.src, dst))
+
+    def test_unsupported(self):
+        linker = FileLinker('hardlink')
+        dst = os.path.join(self.tmpdir, 'dst')
+        cross_device = OSError(errno.EXDEV, 'Invalid cross-device link')
+        with mock.patch('os.link', side_effect=cross_device):
+            self.assertIsNone(linker.link(self.src, dst))
+        self.assertIsNone(linker.link(self.src, dst))
+        self.assertFalse(os.path.exists(dst))
+
+    def test_unknown_mode(self):
+        with self.assertRaises(ValueError):
+            FileLinker('symlink')
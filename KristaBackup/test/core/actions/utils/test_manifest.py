@@ -0,0 +1,97 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from core.actions.utils import (
+    Manifest, ManifestWriter, convert_listfile, merge_manifests,
+)
+from core.actions.utils import manifest as manifest_module
+
+
+class TestManifest(unittest.TestCase):
+    """
+    Проверяет запись, поиск и конвертацию бинарного индекса.
+
+    """
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.filepath = os.path.join(self.tmpdir, 'test.idx')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_lookup(self):
+        records = {
+            'dir/file{0}'.format(index): (index * 1000000007, index)
+            for index in range(500)
+        }
+        with ManifestWriter(self.filepath) as writer:
+            for path, (mtime_ns, size) in records.items():
+                writer.add(path, mtime_ns, size)
+
+        with Manifest(self.filepath) as manifest:
+            self.assertEqual(len(records), len(manifest))
+            for path, record in records.items():
+                self.assertEqual(record, manifest.get(path))
+                self.assertTrue(manifest.is_unchanged(path, *record))
+            self.assertIsNone(manifest.get('dir/missing'))
+            self.assertFalse(manifest.is_unchanged('dir/file1', 0, 1))
+
+    def test_without_blake2b(self):
+        with mock.patch.object(manifest_module, 'hashlib') as hashlib_mock:
+            hashlib_mock.sha1 = hashlib.sha1
+            del hashlib_mock.blake2b
+            with ManifestWriter(self.filepath) as writer:
+                writer.add('dir/file', 1, 2)
+            with Manifest(self.filepath) as manifest:
+                self.assertEqual((1, 2), manifest.get('dir/file'))
+
+    def test_spilled_runs(self):
+        with mock.patch.object(manifest_module, 'RUN_RECORDS', 7):
+            with ManifestWriter(self.filepath) as writer:
+                for index in range(100):
+                    writer.add('file{0}'.format(index), index, index)
+                self.assertEqual(100, len(writer))
+
+        self.assertEqual(['test.idx'], os.listdir(self.tmpdir))
+        with Manifest(self.filepath) as manifest:
+            self.assertEqual(100, len(manifest))
+            for index in range(100):
+                self.assertEqual(
+                    (index, index),
+                    manifest.get('file{0}'.format(index)),
+                )
+
+    def test_convert_listfile(self):
+        list_filepath = os.path.join(self.tmpdir, 'test.list')
+        with open(list_filepath, 'w') as list_file:
+            list_file.write('/backup/test.tar.gz\n')
+            list_file.write('1600000000.1234567,10,a,b.txt\n')
+            list_file.write('broken line\n')
+
+        self.assertEqual(1, convert_listfile(list_filepath, self.filepath))
+        with Manifest(self.filepath) as manifest:
+            self.assertTrue(
+                manifest.is_unchanged('a,b.txt', 1600000000123456700, 10),
+            )
+
+    def test_merge(self):
+        filepaths = []
+        for shard in range(3):
+            filepath = os.path.join(self.tmpdir, '{0}.idx'.format(shard))
+            with ManifestWriter(filepath) as writer:
+                for index in range(shard, 300, 3):
+                    writer.add('file{0}'.format(index), index, index)
+            filepaths.append(filepath)
+
+        self.assertEqual(300, merge_manifests(filepaths, self.filepath))
+        with Manifest(self.filepath) as manifest:
+            for index in range(300):
+                self.assertEqual(
+                    (index, index),
+                    manifest.get('file{0}'.format(index)),
+                )
@@ -0,0 +1,95 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from core.actions.utils import ReadAhead
+
+
+class TestReadAhead(unittest.TestCase):
+    """
+    Проверяет порядок обработки, ограничение памяти и ошибки чтения.
+
+    """
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.files = []
+        for index in range(50):
+            filepath = os.path.join(self.tmpdir, str(index))
+            with open(filepath, 'wb') as file:
+                file.write(bytes([index]) * (index * 10))
+            self.files.append(filepath)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_order(self):
+        def slow_reader(filepath, size):
+            # Первые файлы читаются дольше последних.
+            time.sleep((50 - int(os.path.basename(filepath))) * 0.0005)
+            with open(filepath, 'rb') as file:
+                return file.read(size)
+
+        result = []
+        with ReadAhead(workers=8, reader=slow_reader) as read_ahead:
+            for index, filepath in enumerate(self.files):
+                read_ahead.submit(
+                    lambda index=index, content=None:
+                        result.append((index, content)),
+                    filepath,
+                    index * 10,
+                )
+                read_ahead.submit(lambda: result.append('dir'))
+
+        expected = []
+        for index in range(50):
+            expected.append((index, bytes([index]) * (index * 10)))
+            expected.append('dir')
+        self.assertEqual(expected, result)
+
+    def test_memory_limit(self):
+        pending = []
+        max_pending = [0]
+        lock = threading.Lock()
+
+        def reader(filepath, size):
+            with lock:
+                pending.append(size)
+                max_pending[0] = max(max_pending[0], sum(pending))
+            return b'x' * size
+
+        def handler(size, content=None):
+            if content is not None:
+                with lock:
+                    pending.remove(size)
+
+        with ReadAhead(
+            workers=4,
+            memory_limit=100,
+            threshold=60,
+            reader=reader,
+        ) as read_ahead:
+            for size in (50, 40, 30, 60, 70, 20):
+                read_ahead.submit(
+                    lambda size=size, content=None: handler(size, content),
+                    'file',
+                    size,
+                )
+        self.assertLessEqual(max_pending[0], 100)
+
+    def test_large_and_missing_files(self):
+        result = []
+        with ReadAhead(workers=2, threshold=100) as read_ahead:
+            for filepath, size in (
+                (self.files[20], 200),
+                (os.path.join(self.tmpdir, 'missing'), 10),
+            ):
+                read_ahead.submit(
+                    lambda content=None: result.append(content),
+                    filepath,
+                    size,
+                )
+        self.assertEqual([None, None], result)
@@ -0,0 +1,122 @@
+import gzip
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from common import Logging
+from common.YamlConfig import AppConfig
+from web import RemoteServerApi
+
+
+class DeltaTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        os.mkdir(os.path.join(self.tmpdir.name, '2020'))
+        self.write_log('a-20200102_030405.log')
+        patches = [
+            mock.patch.object(
+                Logging,
+                'get_log_dirpath',
+                lambda subdir=None: self.tmpdir.name,
+            ),
+            mock.patch.object(
+                RemoteServerApi,
+                'get_trigger_filepath',
+                lambda: os.path.join(self.tmpdir.name, 'trigger'),
+            ),
+            mock.patch.object(
+                RemoteServerApi.crontab_manager,
+                'get_tasks_with_info',
+                lambda: {},
+            ),
+            mock.patch.object(
+                AppConfig,
+                'conf',
+                lambda: {'actions': {'action': {'descr': 'x' * 2048}}},
+            ),
+            mock.patch.object(AppConfig, 'get_server_name', lambda: 'srv'),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def write_log(self, name, mtime=1e9):
+        path = os.path.join(self.tmpdir.name, '2020', name)
+        with open(path, 'w') as log:
+            log.write('2020-01-02 03:04:05.1 srv INFO root старт\n')
+        os.utime(path, (mtime, mtime))
+
+    def test_delta(self):
+        full = RemoteServerApi.get_server_delta()
+        self.assertTrue(full['full'])
+        self.assertIn('info', full)
+        self.assertEqual(full['config']['full_name'], 'srv')
+        self.assertEqual(full['log_count'], 1)
+
+        delta = RemoteServerApi.get_server_delta(full['cursor'])
+        self.assertFalse(delta['full'])
+        self.assertNotIn('info', delta)
+        self.assertNotIn('config', delta)
+        self.assertEqual(delta['cursor'], full['cursor'])
+
+        self.write_log('b-20200102_040405.log', mtime=2e9)
+        delta = RemoteServerApi.get_server_delta(full['cursor'])
+        # Логи с mtime, равным курсору, передаются повторно.
+        self.assertEqual(
+            [log['name'] for log in delta['logs']['2020']],
+            ['b-20200102_040405.log', 'a-20200102_030405.log'],
+        )
+        delta = RemoteServerApi.get_server_delta(delta['cursor'])
+        self.assertEqual(
+            [log['name'] for log in delta['logs']['2020']],
+            ['b-20200102_040405.log'],
+        )
+        self.assertEqual(delta['log_count'], 2)
+
+    def test_cursor_mtime(self):
+        for mtime in (1e-05, None):
+            with mock.patch.object(
+                RemoteServerApi,
+                'get_logs_changes',
+                lambda since: ({}, mtime, 0),
+            ):
+                cursor = RemoteServerApi.get_server_delta()['cursor']
+                delta = RemoteServerApi.get_server_delta(cursor)
+            self.assertFalse(delta['full'])
+            self.assertEqual(delta['cursor'], cursor)
+
+    def test_removed_log_changes_cursor(self):
+        cursor = RemoteServerApi.get_server_delta()['cursor']
+        os.remove(
+            os.path.join(self.tmpdir.name, '2020', 'a-20200102_030405.log'),
+        )
+        self.assertNotEqual(
+            RemoteServerApi.get_server_delta()['cursor'],
+            cursor,
+        )
+
+    def test_response(self):
+        status, body, headers = RemoteServerApi.get_delta_response(
+            None,
+            accept_encoding='gzip, deflate',
+        )
+        self.assertEqual(status, 200)
+        self.assertEqual(headers['Content-Encoding'], 'gzip')
+        delta = json.loads(gzip.decompress(body).decode('utf-8'))
+
+        status, body, _ = RemoteServerApi.get_delta_response(
+            delta['cursor'],
+            if_none_match=headers['ETag'],
+        )
+        self.assertEqual(status, 304)
+        self.assertEqual(body, b'')
+
+
+if __name__ == '__main__':
+    unittest.main()
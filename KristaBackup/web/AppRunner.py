@@ -4,8 +4,7 @@ import logging
 import os
 import signal
 
-from common.procutil import check_process, get_executable_filename
-from common.arguments import constants
+from common.proclock import ProcessLock
 
 
 class AppRunner():
@@ -21,23 +20,27 @@ class AppRunner():
         return False
 
     @property
-    def keywords(self):
-        exe_filename = get_executable_filename()
-        return [self.name, constants.START_OPT_NAME, exe_filename]
+    def lock(self):
+        # Блокировка удерживается всё время работы приложения.
+        if getattr(self, '_lock', None) is None:
+            self._lock = ProcessLock(self.name)
+        return self._lock
 
     def run(self):
-        pid = check_process(self.keywords)
-        if pid:
+        if not self.lock.acquire():
             logging.warning(
                 'Процесс %s уже запущен! PID: %s',
                 self.name,
-                pid,
+                self.lock.get_owner_pid(),
             )
             return
 
-        self.run_app()
+        try:
+            self.run_app()
+        finally:
+            self.lock.release()
 
     def stop(self):
-        pid = check_process(self.keywords)
+        pid = self.lock.get_owner_pid()
         if pid:
             os.kill(pid, signal.SIGINT)
@@ -1,10 +1,19 @@
 #  -*- coding: UTF-8 -*-
 
+import gzip
+import hashlib
+import json
 import os
 from common.daemon_managers import crontab_manager
-from common.Logging import get_trigger_filepath, get_logs_list
+from common.Logging import (get_logs_changes, get_logs_list,
+                            get_trigger_filepath)
 from common.YamlConfig import AppConfig
 
+DELTA_VERSION = 1
+
+# Ответы меньше этого размера не сжимаются.
+GZIP_MIN_SIZE = 1024
+
 
 def get_server_info():
     result = {}
@@ -32,3 +41,113 @@ def get_server_config():
     result = {'full_name': AppConfig.get_server_name(), 'schedules': crontab_manager.get_tasks_with_info(),
               'actions': AppConfig.conf().get('actions'), 'logs': get_logs_list()}
     return result
+
+
+def _get_hash(obj):
+    data = json.dumps(obj, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.md5(data).hexdigest()[:12]
+
+
+def _parse_cursor(cursor):
+    """Разбирает курсор из get_server_delta.
+
+    Курсор имеет вид <версия>_<mtime>_<количество логов>_<хэш info>_
+    <хэш config>. mtime записан через repr, поэтому восстанавливается
+    точно, а разделитель не встречается в записи числа (в отличие
+    от '-' в 1e-05). Количество логов нужно, чтобы курсор менялся
+    при удалении логов.
+
+    Returns:
+        Кортеж (mtime, хэш info, хэш config) или None, если курсор
+        не указан, некорректен или другой версии.
+
+    """
+    if not cursor:
+        return None
+    parts = cursor.strip('"').split('_')
+    if len(parts) != 5 or parts[0] != str(DELTA_VERSION):
+        return None
+    try:
+        return float(parts[1]), parts[3], parts[4]
+    except ValueError:
+        return None
+
+
+def get_server_delta(cursor=None):
+    """Возвращает изменения состояния сервера с момента cursor.
+
+    В ответ входят info (как в /api/si) и config (имя сервера,
+    задания и действия) - только если они изменились, и описания
+    логов, изменившихся после cursor. По log_count клиент проверяет,
+    что после применения изменений список логов совпадает с
+    серверным, иначе (логи были удалены) запрашивает всё заново.
+
+    Args:
+        cursor: Строка или None, курсор из предыдущего ответа.
+            Если None, то возвращается полное состояние.
+
+    Returns:
+        Словарь, новый курсор в ключе cursor.
+
+    """
+    previous = _parse_cursor(cursor)
+    since, info_hash, config_hash = previous or (None, None, None)
+
+    info = get_server_info()
+    config = {
+        'full_name': AppConfig.get_server_name(),
+        'schedules': crontab_manager.get_tasks_with_info(),
+        'actions': AppConfig.conf().get('actions'),
+    }
+    logs, latest_mtime, log_count = get_logs_changes(since)
+
+    new_info_hash, new_config_hash = _get_hash(info), _get_hash(config)
+    result = {
+        'version': DELTA_VERSION,
+        'full': previous is None,
+        'cursor': '{0}_{1!r}_{2}_{3}_{4}'.format(
+            DELTA_VERSION,
+            float(latest_mtime or 0),
+            log_count,
+            new_info_hash,
+            new_config_hash,
+        ),
+        'logs': logs,
+        'log_count': log_count,
+    }
+    if new_info_hash != info_hash:
+        result['info'] = info
+    if new_config_hash != config_hash:
+        result['config'] = config
+    return result
+
+
+def get_delta_response(cursor, if_none_match=None, accept_encoding=None):
+    """Формирует HTTP ответ для /api/delta.
+
+    Если курсор из If-None-Match совпадает с текущим, то возвращается
+    304 без тела. Тело сжимается gzip, если клиент его поддерживает.
+
+    Args:
+        cursor: Строка или None, курсор из параметров запроса.
+        if_none_match: Строка или None, заголовок If-None-Match.
+        accept_encoding: Строка или None, заголовок Accept-Encoding.
+
+    Returns:
+        Кортеж (код ответа, тело в байтах, словарь заголовков).
+
+    """
+    delta = get_server_delta(cursor)
+    etag = '"{0}"'.format(delta['cursor'])
+    headers = {'ETag': etag, 'Vary': 'Accept-Encoding'}
+    if if_none_match and etag in [
+        tag.strip() for tag in if_none_match.split(',')
+    ]:
+        return 304, b'', headers
+
+    body = json.dumps(delta, default=str).encode('utf-8')
+    headers['Content-Type'] = 'application/json'
+    if len(body) >= GZIP_MIN_SIZE and 'gzip' in (accept_encoding or ''):
+        body = gzip.compress(body)
+        headers['Content-Encoding'] = 'gzip'
+    return 200, body, headers
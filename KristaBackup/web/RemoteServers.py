@@ -1,8 +1,56 @@
 #  -*- coding: UTF-8 -*-
+"""Список удалённых серверов и опрос их состояния.
+
+Состояние серверов опрашивается фоновым потоком (Poller) параллельно
+в пуле потоков и хранится в объектах Server, поэтому страницы
+отображают последнее известное состояние и не ждут сети. Все запросы
+к серверам идут через общую requests.Session с таймаутами.
+
+"""
 import hashlib
 import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
 import requests
-from common.YamlConfig import YamlConfigMapper
+from requests.adapters import HTTPAdapter
+
+from common.Logging import retrieve_seconds_from_name
+from common.YamlConfig import AppConfig, YamlConfigMapper
+
+POLL_INTERVAL = 30  # секунд, время жизни состояния сервера
+POLL_WORKERS = 8
+REQUEST_TIMEOUT = (3.05, 10)  # секунд на подключение и на ответ
+
+
+def _get_web_conf():
+    try:
+        return AppConfig.conf().get('web') or {}
+    except Exception:
+        return {}
+
+
+def _create_session():
+    session = requests.Session()
+    workers = _get_web_conf().get('poll_workers', POLL_WORKERS)
+    adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+_session = _create_session()
+
+
+def request(url, **kwargs):
+    """Выполняет GET запрос к удалённому серверу через общую сессию."""
+    kwargs.setdefault(
+        'timeout',
+        _get_web_conf().get('poll_timeout', REQUEST_TIMEOUT),
+    )
+    return _session.get(url, **kwargs)
 
 
 class Server:
@@ -11,28 +59,33 @@ class Server:
     hash = ''
 
     flask = False
-    msg = ''
+    state = False
+    msg = 'состояние неизвестно'
     errors = ''
-    msg = ''
+    updated_at = 0
+
+    # Состояние, полученное через /api/delta: курсор последнего ответа,
+    # конфигурация и логи {директория: {имя файла: описание}}.
+    # supports_delta становится False для серверов без /api/delta.
+    supports_delta = True
+    cursor = None
+    config = None
+    logs = None
 
 
+    def is_stale(self, ttl):
+        return time.monotonic() - self.updated_at >= ttl
+
     def update(self):
-        print(self.url)
         status_url = '/'.join(map(lambda x: str(x).strip('/'), [self.url, 'api/si']))
         try:
-            r = requests.get(status_url)
-            print(r.content)
+            if self.supports_delta and self.update_delta():
+                self.updated_at = time.monotonic()
+                return
+            r = request(status_url)
             if (r.ok):
                 self.state = True
-                try:
-                    jr = json.loads(r.content)
-                except TypeError:
-                    # python3.5 support
-                    jr = json.loads(r.content.decode('utf-8'))
-                self.name = jr.get('name', 'неизвестно')
-                self.flask = jr.get('flask', False)
-                self.msg = jr.get('msg', '')
-                self.errors = jr.get('errors', '')
+                self.apply_info(_load_json(r))
             else:
                 self.state = False
                 self.msg = 'ошибка при обращении к серверу'
@@ -41,12 +94,101 @@ class Server:
             self.state = False
             self.msg = 'исключение при обращении к серверу'
             self.errors = ex.__repr__()
+        self.updated_at = time.monotonic()
+
+
+    def apply_info(self, jr):
+        self.name = jr.get('name', 'неизвестно')
+        self.flask = jr.get('flask', False)
+        self.msg = jr.get('msg', '')
+        self.errors = jr.get('errors', '')
+
+    def update_delta(self):
+        """Обновляет состояние по изменениям с последнего курсора.
+
+        Returns:
+            True, если сервер ответил на /api/delta, иначе False.
+
+        Raises:
+            requests.RequestException при ошибке запроса.
+
+        """
+        delta = self._request_delta(self.cursor)
+        if delta is None:
+            return False
+        if not delta:
+            # 304: с прошлого опроса ничего не изменилось.
+            self.state = True
+            return True
+        if 'cursor' not in delta:
+            # Ошибка на сервере, состояние запрашивается через /api/si.
+            return False
 
+        logs = _merge_logs({} if delta['full'] else self.logs, delta)
+        if sum(map(len, logs.values())) != delta['log_count']:
+            # На сервере удалены логи, нужно полное состояние.
+            delta = self._request_delta(None)
+            if not delta:
+                return False
+            logs = _merge_logs({}, delta)
+
+        self.state = True
+        if 'info' in delta:
+            self.apply_info(delta['info'])
+        if 'config' in delta:
+            self.config = delta['config']
+        self.logs = logs
+        self.cursor = delta['cursor']
+        return True
+
+    def _request_delta(self, cursor):
+        delta_url = '/'.join(map(lambda x: str(x).strip('/'), [self.url, 'api/delta']))
+        params, headers = {}, {}
+        if cursor is not None:
+            params['cursor'] = cursor
+            headers['If-None-Match'] = '"{0}"'.format(cursor)
+        r = request(delta_url, params=params, headers=headers)
+        if r.status_code == 304:
+            return {}
+        if r.status_code == 404:
+            self.supports_delta = False
+            return None
+        r.raise_for_status()
+        return _load_json(r)
+
+    def get_logs(self):
+        """Возвращает логи в формате Logging.get_logs_list."""
+        res = OrderedDict()
+        for dir in sorted(self.logs or {}, reverse=True):
+            res[dir] = sorted(
+                self.logs[dir].values(),
+                key=lambda entry: retrieve_seconds_from_name(entry['name']),
+                reverse=True,
+            )
+        return res
 
     def __repr__(self):
         return "Server(%s, %s, %s, %s, %s)" % (self.url, self.name, self.errors, self.state)
 
 
+def _merge_logs(logs, delta):
+    """Возвращает логи logs с применёнными изменениями из delta."""
+    merged = dict(logs or {})
+    for dir, entries in delta.get('logs', {}).items():
+        merged[dir] = dict(merged.get(dir, {}))
+        for entry in entries:
+            merged[dir][entry['name']] = entry
+    return merged
+
+
+def _load_json(r):
+    try:
+        return json.loads(r.content)
+    except TypeError:
+        # python3.5 support
+        return json.loads(r.content.decode('utf-8'))
+
+
 def get_hash(url):
     if url is None:
         return None
@@ -56,24 +198,76 @@ def get_hash(url):
 
 _servers_config_filename = 'servers.yaml'
 _servers_conf = YamlConfigMapper(_servers_config_filename)
+# Серверы загружаются без опроса, состояние заполняет Poller.
 servers = []
 for s_conf in _servers_conf.config.get('servers'):
     s = Server()
     s.url = s_conf
     s.hash = get_hash(s.url)
-    s.update()
     servers.append(s)
-    print(s_conf, s.url, s.hash)
-servers = sorted(servers, key=lambda x: x.name)
 
 
 def get_all():
-    return servers
+    return sorted(servers, key=lambda x: x.name)
+
+
+class Poller:
+    """Фоновый опрос серверов.
+
+    Серверы, состояние которых старше interval секунд, опрашиваются
+    параллельно в пуле из workers потоков.
+
+    """
+
+    def __init__(self, interval=POLL_INTERVAL, workers=POLL_WORKERS):
+        self.interval = interval
+        self.workers = workers
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(
+                target=self._run,
+                name='RemoteServersPoller',
+                daemon=True,
+            )
+            self._thread.start()
+
+    def wakeup(self):
+        """Запускает внеочередной опрос устаревших серверов."""
+        self.start()
+        self._wakeup.set()
+
+    def poll(self, executor):
+        stale = [s for s in list(servers) if s.is_stale(self.interval)]
+        list(executor.map(Server.update, stale))
+
+    def _run(self):
+        with ThreadPoolExecutor(self.workers) as executor:
+            while True:
+                self._wakeup.clear()
+                self.poll(executor)
+                self._wakeup.wait(self.interval)
+
+
+poller = Poller(
+    interval=_get_web_conf().get('poll_interval', POLL_INTERVAL),
+    workers=_get_web_conf().get('poll_workers', POLL_WORKERS),
+)
+
+
+def start():
+    """Запускает фоновый опрос серверов."""
+    poller.wakeup()
 
 
 def updateAll():
-    for s in servers:
-        s.update()
+    """Запускает фоновый опрос серверов, не дожидаясь его окончания."""
+    poller.wakeup()
 
 
 def isRegistred(url):
@@ -87,10 +281,10 @@ def add(url):
     s = Server()
     s.url = url
     s.hash = get_hash(s.url)
-    s.update()
     servers.append(s)
     _servers_conf.config['servers'].append(url)
     _servers_conf.storeAll()
+    poller.wakeup()
 
 
 def find_server(hash):
@@ -113,21 +307,21 @@ def get_remote_server_config(surl):
     status_url = '/'.join(map(lambda x: str(x).strip('/'), [surl, 'api/cf']))
     print('status_url', surl, status_url)
     try:
-        r = requests.get(status_url)
+        r = request(status_url)
         if (r.ok):
             try:
                 return json.loads(r.content)
             except TypeError:
                 return json.loads(r.content.decode('utf-8'))
     except Exception as ex:
-        return json.loads({'state': 'Ошибка доступа: %s, %s' % (type(ex).__name__, str(ex))})
+        return {'state': 'Ошибка доступа: %s, %s' % (type(ex).__name__, str(ex))}
 
 
-def get_remote_server_logs(surl, dir, name):
+def get_remote_server_logs(surl, dir, name, params=None):
     url = '/'.join(map(lambda x: str(x).strip('/'), [surl, 'api', 'rl', dir, name]))
     print('url:', surl, dir, name, url)
     try:
-        r = requests.get(url)
+        r = request(url, params=params)
         if r.ok:
             res = json.loads(r.content)
             return res
@@ -1,14 +1,17 @@
 #!/usr/bin/python3
 # -*- coding: UTF-8 -*-
+import os
 from functools import wraps
 
 from common import Logging
 from common.Logging import get_generic_logger
 from common.YamlConfig import AppConfig
-from lib.bottle import Bottle, request, response
+from lib.bottle import (Bottle, HTTPError, HTTPResponse, request, response,
+                        static_file)
 
 from ..AppRunner import AppRunner
-from ..RemoteServerApi import get_server_config, get_server_info
+from ..RemoteServerApi import (get_delta_response, get_server_config,
+                               get_server_info)
 
 app = Bottle()
 
@@ -29,14 +32,44 @@ def si():
     except Exception as e:
         return {'status': e}
 
+@app.route('/delta', method=['GET'])
+def delta():
+    try:
+        status, body, headers = get_delta_response(
+            request.query.get('cursor'),
+            request.get_header('If-None-Match'),
+            request.get_header('Accept-Encoding'),
+        )
+    except Exception as e:
+        return {'status': str(e)}
+    return HTTPResponse(body, status=status, headers=headers)
+
+
 @app.route('/rl/:dir/:name', method=['GET'])
 def get_rl(dir, name):
     try:
-        return Logging.get_log_content(dir, name)
+        return Logging.get_log_content(
+            dir,
+            name,
+            **Logging.parse_log_page_args(request.query),
+        )
     except Exception as e:
         return {'status': e}
 
 
+@app.route('/rf/:dir/:name', method=['GET'])
+def get_rf(dir, name):
+    # Файл отдаётся потоком, поддерживаются запросы Range.
+    filepath = Logging.get_log_filepath(dir, name)
+    if filepath is None:
+        return HTTPError(404, 'Файл не найден')
+    return static_file(
+        name,
+        root=os.path.dirname(filepath),
+        mimetype='text/plain',
+    )
+
+
 def log_to_logger(fn):
     @wraps(fn)
     def _log_to_logger(*args, **kwargs):
@@ -2,6 +2,7 @@
 # -*- coding: UTF-8 -*-
 from common.Logging import get_generic_logger
 
+from .. import RemoteServers
 from ..AppRunner import AppRunner
 from .app import app
 from .WebAppConfig import webappconf
@@ -15,6 +16,7 @@ class WebApp(AppRunner):
         app.logger = get_generic_logger()
         app.config.from_object(webappconf)
         app.logger.debug('App configured')
+        RemoteServers.start()
         print("To open APP go to: http://%s:%d/" % (webappconf.HOST, webappconf.PORT))
         app.run(host=webappconf.HOST, port=webappconf.PORT)
 
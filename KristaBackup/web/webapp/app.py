@@ -138,7 +138,11 @@ def info(hash):
         s = RemoteServers.find_server(hash)
         if s is None or not s.state:
             return redirect(url_for('servers'))
-        resp = RemoteServers.get_remote_server_config(s.url)
+        if s.config is not None:
+            # Состояние, полученное фоновым опросом через /api/delta.
+            resp = dict(s.config, logs=s.get_logs())
+        else:
+            resp = RemoteServers.get_remote_server_config(s.url)
         if len(resp) < 2:
             from collections import defaultdict
             flash(resp.get('status', 'Возникла неизвестная ошибка'))
@@ -242,8 +246,25 @@ def disableSchedule(name):
 @app.route('/logs/<dir>/<name>', methods=['GET'])
 @login_required
 def get_log(dir, name):
+    try:
+        page_args = Logging.parse_log_page_args(request.args)
+        log = Logging.get_log_content(dir, name, **page_args)
+    except ValueError as exc:
+        flash(str(exc))
+        return redirect(url_for('get_log', dir=dir, name=name))
     return render_template('log.html', full_name=AppConfig.get_server_name(),
-                           dir=dir, log=Logging.get_log_content(dir, name))
+                           dir=dir, log=log,
+                           page_url=url_for('get_log_page', dir=dir, name=name))
+
+
+@app.route('/logs-page/<dir>/<name>', methods=['GET'])
+@login_required
+def get_log_page(dir, name):
+    try:
+        page_args = Logging.parse_log_page_args(request.args)
+        return Logging.get_log_content(dir, name, **page_args)
+    except ValueError as exc:
+        return {'status': str(exc)}, 400
 
 
 @app.route('/rlogs/<shash>/<dir>/<name>', methods=['GET'])
@@ -252,8 +273,21 @@ def get_remote_log(shash, dir, name):
     s = RemoteServers.find_server(shash)
     if s is None or not s.state:
         return redirect(url_for('servers'))
-    logs = RemoteServers.get_remote_server_logs(s.url, dir, name)
-    return render_template('log.html', full_name=s.name, dir=dir, log=logs)
+    logs = RemoteServers.get_remote_server_logs(
+        s.url, dir, name, params=request.args.to_dict())
+    return render_template('log.html', full_name=s.name, dir=dir, log=logs,
+                           page_url=url_for('get_remote_log_page', shash=shash,
+                                            dir=dir, name=name))
+
+
+@app.route('/rlogs-page/<shash>/<dir>/<name>', methods=['GET'])
+@login_required
+def get_remote_log_page(shash, dir, name):
+    s = RemoteServers.find_server(shash)
+    if s is None or not s.state:
+        return {'status': 'Сервер не найден в списке'}, 404
+    return RemoteServers.get_remote_server_logs(
+        s.url, dir, name, params=request.args.to_dict())
 
 
 @app.route('/logp/<dir>/<name>', methods=['GET'])
@@ -348,9 +382,35 @@ def si():
         return {'status': str(e)}
 
 
+@app.route('/api/delta', methods=['GET'])
+def delta():
+    try:
+        status, body, headers = RemoteServerApi.get_delta_response(
+            request.args.get('cursor'),
+            request.headers.get('If-None-Match'),
+            request.headers.get('Accept-Encoding'),
+        )
+    except Exception as e:
+        return {'status': str(e)}
+    return app.response_class(body, status=status, headers=headers)
+
+
 @app.route('/api/rl/<dir>/<name>', methods=['GET'])
 def get_logapi(dir, name):
     try:
-        return Logging.get_log_content(dir, name)
+        return Logging.get_log_content(
+            dir,
+            name,
+            **Logging.parse_log_page_args(request.args),
+        )
     except Exception as e:
         return {'status': e}
+
+
+@app.route('/api/rf/<dir>/<name>', methods=['GET'])
+def get_logfileapi(dir, name):
+    # Файл отдаётся потоком, поддерживаются запросы Range.
+    if Logging.get_log_filepath(dir, name) is None:
+        return {'status': 'Файл не найден'}, 404
+    return send_from_directory(directory=os.path.join(Logging.get_log_dirpath(), dir),
+                               filename=name, mimetype='text/plain', conditional=True)
@@ -0,0 +1,44 @@
+// Постраничная подгрузка лога: страницы запрашиваются по смещениям,
+// которые вернул сервер для уже показанного участка.
+var log = document.getElementById("log");
+var logLines = document.getElementById("log-lines");
+var beforeButton = document.getElementById("log-before");
+var afterButton = document.getElementById("log-after");
+
+function loadLogPage(params, callback) {
+  if (log.dataset.level) {
+    params.level = log.dataset.level;
+  }
+  var query = Object.keys(params).map(function(key) {
+    return encodeURIComponent(key) + "=" + encodeURIComponent(params[key]);
+  }).join("&");
+  var request = new XMLHttpRequest();
+  request.open("GET", log.dataset.pageUrl + "?" + query);
+  request.onload = function() {
+    if (request.status === 200) {
+      var page = JSON.parse(request.responseText);
+      if (page.offset !== undefined) {
+        callback(page);
+      }
+    }
+  };
+  request.send();
+}
+
+beforeButton.addEventListener("click", function() {
+  loadLogPage({before: log.dataset.offset}, function(page) {
+    logLines.insertBefore(
+      document.createTextNode(page.lines.join("")),
+      logLines.firstChild
+    );
+    log.dataset.offset = page.offset;
+    beforeButton.hidden = page.offset === 0;
+  });
+});
+
+afterButton.addEventListener("click", function() {
+  loadLogPage({offset: log.dataset.end}, function(page) {
+    logLines.appendChild(document.createTextNode(page.lines.join("")));
+    log.dataset.end = page.end;
+  });
+});